@@ -1,27 +1,50 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
-from supabase import create_client, Client
 from datetime import datetime
 import os
-from config import SUPABASE_URL, SUPABASE_KEY, SUPABASE_SERVICE_KEY
+import time
+from config import NOTIFICATIONS_PAGE_SIZE, DATABASE_BACKEND, MAX_FILE_SIZE_BYTES, PHOTO_KEEP_SOURCE
 from database.supabase_only_connection import db
+from utils.api_metrics import init_request_metrics, render_prometheus
+from utils.image_renditions import normalize_photo, rendition_path, source_path
+from utils.chunked_upload import copy_stream, validate_image_stream, UploadTooLarge
 import bcrypt
 
 app = Flask(__name__)
+# Corpo acima do limite é recusado (413) pelo Content-Length, antes de ser lido;
+# arquivos do multipart vão para arquivo temporário em disco, não para a memória
+app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE_BYTES + 1024 * 1024
 CORS(app)
+# Latência, status, tamanhos e requisições em andamento por rota (expostos em /metrics)
+init_request_metrics(app)
 
-# Configuração Supabase - usar service key se disponível
-supabase_key = SUPABASE_SERVICE_KEY if SUPABASE_SERVICE_KEY else SUPABASE_KEY
-supabase: Client = create_client(SUPABASE_URL, supabase_key)
-
+# Consultas diretas usam db.client (service key se disponível), criado no primeiro request
 @app.route('/api/test', methods=['GET'])
 def test():
     return jsonify({'success': True, 'message': 'API funcionando!'})
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    # Mede a latência de uma consulta mínima ao backend (Supabase ou memória)
+    started = time.perf_counter()
+    try:
+        db.client.table('companies').select('id').limit(1).execute()
+        latency_ms = round((time.perf_counter() - started) * 1000, 1)
+        return jsonify({'status': 'ok', 'backend': DATABASE_BACKEND, 'latency_ms': latency_ms})
+    except Exception as e:
+        latency_ms = round((time.perf_counter() - started) * 1000, 1)
+        return jsonify({
+            'status': 'error', 'backend': DATABASE_BACKEND, 'latency_ms': latency_ms, 'message': str(e)
+        }), 503
+
 @app.route('/api/users', methods=['GET'])
 def get_users():
     try:
-        response = supabase.table('users').select('username, full_name, role').eq('active', True).order('username').execute()
+        response = db.client.table('users').select('username, full_name, role').eq('active', True).order('username').execute()
         return jsonify({'success': True, 'users': response.data})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
@@ -67,9 +90,10 @@ def update_push_token(user_id):
         push_token = data.get('push_token')
         
         # Atualizar no Supabase via db
-        response = supabase.table('users').update({
+        response = db.client.table('users').update({
             'push_token': push_token
         }).eq('id', user_id).execute()
+        db.invalidate_user_cache(user_id=user_id)
         
         return jsonify({'success': True})
         
@@ -99,12 +123,11 @@ def update_task_status(task_id):
         new_status = data.get('status')
         notes = data.get('notes', '')
         
-        # Atualizar status usando db
-        success, message = db.update_task_status(task_id, new_status, notes)
-        
+        # Atualizar status usando db (retorna a linha atualizada)
+        success, message, task = db.update_task_status_returning(task_id, new_status, notes)
+
         if success:
-            # Buscar tarefa para criar notificação
-            task = db.get_task_assignment_by_id(task_id)
+            # Reaproveita a linha atualizada para criar a notificação
             if task:
                 status_messages = {
                     'em_andamento': 'iniciou',
@@ -127,20 +150,6 @@ def update_task_status(task_id):
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
 
-if __name__ == '__main__':
-    port = int(os.environ.get('PORT', 5000))
-    print(f"API rodando na porta: {port}")
-    print("Endpoints disponíveis:")
-    print("- POST /api/login")
-    print("- PUT /api/users/<user_id>/push-token")
-    print("- GET /api/tasks/<user_id>")
-    print("- PUT /api/tasks/<task_id>/status")
-    print("- POST /api/tasks/<task_id>/photos")
-    print("- GET /api/tasks/<task_id>/photos")
-    print("- GET /api/notifications/<user_id>")
-    print("- PUT /api/notifications/<notification_id>/read")
-    app.run(debug=False, host='0.0.0.0', port=port)
-
 @app.route('/api/tasks/<int:task_id>/photos', methods=['POST'])
 def upload_task_photo(task_id):
     try:
@@ -150,6 +159,11 @@ def upload_task_photo(task_id):
         file = request.files['photo']
         if file.filename == '':
             return jsonify({'success': False, 'message': 'Arquivo vazio'})
+
+        # Tipo real pelos primeiros bytes, antes de gravar qualquer coisa
+        valid, message = validate_image_stream(file.stream, file.filename)
+        if not valid:
+            return jsonify({'success': False, 'message': message}), 400
         
         # Gerar nome único para o arquivo
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -163,17 +177,56 @@ def upload_task_photo(task_id):
             os.makedirs(upload_folder)
         
         file_path = os.path.join(upload_folder, file_name)
-        file.save(file_path)
-        
+        # Gravado em blocos, com o limite conferido sobre os bytes de fato recebidos
+        try:
+            copy_stream(file.stream, file_path, MAX_FILE_SIZE_BYTES)
+        except UploadTooLarge:
+            return jsonify({'success': False, 'message': 'Arquivo excede o tamanho máximo'}), 413
+
+        # Normalização (orientação, sem EXIF, tamanho limitado, recodificada); a
+        # empresa da tarefa só é usada nas estatísticas de compressão
+        task = db.get_task_assignment_by_id(task_id, profile='list')
+        with open(file_path, 'rb') as uploaded:
+            photo = normalize_photo(uploaded, task['company_id'] if task else None)
+
+        renditions = {}
+        if photo is not None:
+            received_path = file_path
+            file_name = f"{timestamp}_{task_id}.{photo.ext}"
+            file_path = os.path.join(upload_folder, file_name)
+            if not photo.reencoded:
+                # Mantida como veio (recodificar não reduzia): o arquivo recebido só troca de nome
+                os.replace(received_path, file_path)
+            else:
+                if PHOTO_KEEP_SOURCE:
+                    kept = source_path(file_path, file.filename)
+                    os.replace(received_path, kept)
+                    renditions['source'] = (f"/uploads/{os.path.basename(kept)}", kept)
+                elif received_path != file_path:
+                    os.remove(received_path)
+                with open(file_path, 'wb') as f:
+                    f.write(photo.content)
+
+            # Miniatura e versão média ao lado da foto (as grades carregam a miniatura)
+            for name, rendition in photo.renditions.items():
+                path = rendition_path(file_path, name)
+                with open(path, 'wb') as f:
+                    f.write(rendition)
+                renditions[name] = (f"/uploads/{os.path.basename(path)}", path)
+
         # Registrar no banco
         photo_url = f"/uploads/{file_name}"
-        success, message = db.create_assignment_photo(task_id, photo_url, file_path, file.filename)
+        success, message = db.create_assignment_photo(
+            task_id, photo_url, file_path, file.filename, renditions=renditions
+        )
         
         if success:
             return jsonify({
                 'success': True, 
                 'photo_url': photo_url,
-                'file_path': file_path
+                'file_path': file_path,
+                'thumb_url': renditions.get('thumb', (None, None))[0],
+                'medium_url': renditions.get('medium', (None, None))[0],
             })
         else:
             return jsonify({'success': False, 'message': message})
@@ -194,9 +247,12 @@ def get_task_photos(task_id):
 @app.route('/api/notifications/<int:user_id>', methods=['GET'])
 def get_user_notifications(user_id):
     try:
-        notifications = db.get_notifications(user_id)
+        # Paginação: ?cursor=<next_cursor da página anterior>&limit=<até NOTIFICATIONS_PAGE_SIZE>
+        cursor = request.args.get('cursor')
+        limit = request.args.get('limit', NOTIFICATIONS_PAGE_SIZE, type=int)
+        notifications, next_cursor = db.get_notifications_page(user_id, cursor=cursor, page_size=limit)
         
-        return jsonify({'success': True, 'notifications': notifications})
+        return jsonify({'success': True, 'notifications': notifications, 'next_cursor': next_cursor})
         
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
@@ -205,7 +261,7 @@ def get_user_notifications(user_id):
 def mark_notification_read(notification_id):
     try:
         # Buscar notificação para obter user_id
-        notification = supabase.table('notifications').select('user_id').eq('id', notification_id).execute()
+        notification = db.client.table('notifications').select('user_id').eq('id', notification_id).execute()
         if not notification.data:
             return jsonify({'success': False, 'message': 'Notificação não encontrada'})
         
@@ -215,4 +271,37 @@ def mark_notification_read(notification_id):
         return jsonify({'success': success})
         
     except Exception as e:
-        return jsonify({'success': False, 'message': str(e)})
\ No newline at end of file
+        return jsonify({'success': False, 'message': str(e)})
+
+@app.route('/api/notifications/<int:user_id>/read-all', methods=['PUT'])
+def mark_all_notifications_read(user_id):
+    try:
+        # Opcional: só marca as criadas até `before` (ISO 8601)
+        data = request.get_json(silent=True) or {}
+        before = data.get('before')
+        if before:
+            before = datetime.fromisoformat(before.replace('Z', '+00:00'))
+
+        count = db.mark_all_notifications_read(user_id, before)
+
+        return jsonify({'success': True, 'count': count})
+
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+if __name__ == '__main__':
+    port = int(os.environ.get('PORT', 5000))
+    print(f"API rodando na porta: {port}")
+    print("Endpoints disponíveis:")
+    print("- GET /metrics")
+    print("- GET /healthz")
+    print("- POST /api/login")
+    print("- PUT /api/users/<user_id>/push-token")
+    print("- GET /api/tasks/<user_id>")
+    print("- PUT /api/tasks/<task_id>/status")
+    print("- POST /api/tasks/<task_id>/photos")
+    print("- GET /api/tasks/<task_id>/photos")
+    print("- GET /api/notifications/<user_id>")
+    print("- PUT /api/notifications/<notification_id>/read")
+    print("- PUT /api/notifications/<user_id>/read-all")
+    app.run(debug=False, host='0.0.0.0', port=port)
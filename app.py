@@ -5,7 +5,9 @@ ISP Manager — Sistema de Gerenciamento de Tarefas para Provedores de Internet
 import streamlit as st
 import sys
 import os
+import time
 import base64
+from importlib import import_module
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
@@ -36,14 +38,41 @@ from auth.authentication import (
     get_current_user,
 )
 from auth.session_cookie import init_cookie_manager, get_session_from_cookie
-from views.login import render_login_page
-from views.dashboard_supabase import render_dashboard_page
-from views.admin import render_admin_page
-from views.task_details import render_task_details_page
-from views.task_management import render_task_management_page
-from views.notifications import render_notifications_page, get_unread_count
-from views.assignment_details import render_assignment_details_page
-from views.completed_tasks_manager import show_completed_tasks_manager
+from views.notifications import get_unread_count
+from utils.render_profiler import (
+    profiling_requested, start_rerun, finish_rerun, checkpoint, render_profile_panel,
+)
+from database.identity_map import rerun_scope
+from utils.instrumentation import record_page_import
+
+
+# ── Registro de páginas: a view só é importada na primeira renderização ─────
+# página → (módulo, função de renderização, somente admin)
+PAGE_REGISTRY = {
+    "login":              ("views.login", "render_login_page", False),
+    "dashboard":          ("views.dashboard_supabase", "render_dashboard_page", False),
+    "notifications":      ("views.notifications", "render_notifications_page", False),
+    "task_management":    ("views.task_management", "render_task_management_page", True),
+    "completed_tasks":    ("views.completed_tasks_manager", "show_completed_tasks_manager", True),
+    "admin":              ("views.admin", "render_admin_page", True),
+    "task_details":       ("views.task_details", "render_task_details_page", False),
+    "assignment_details": ("views.assignment_details", "render_assignment_details_page", False),
+    "manager_dashboard":  ("views.manager_dashboard", "render_manager_dashboard", True),
+}
+
+
+def load_page(page: str):
+    """Retorna a função de renderização da página, importando o módulo no primeiro uso.
+
+    O custo de cada import entra em `page_import_report()` (aba Diagnóstico do admin).
+    """
+    module_name, func_name, _ = PAGE_REGISTRY[page]
+    if module_name not in sys.modules:
+        checkpoint(f"import: {module_name}")
+        start = time.perf_counter()
+        import_module(module_name)
+        record_page_import(page, time.perf_counter() - start)
+    return getattr(sys.modules[module_name], func_name)
 
 
 # ── Páginas que não têm item próprio na nav (acessadas via link) ───────────
@@ -507,6 +536,25 @@ def _restore_session_from_cookie() -> None:
 def main():
     configure_page()
 
+    # Identity map do rerun: leituras idênticas ao banco são feitas uma única vez
+    # Profiler opcional do rerun (RENDER_PROFILE ou ?profile=1 para admins)
+    if not profiling_requested(is_logged_in() and is_admin()):
+        with rerun_scope():
+            render_app()
+        return
+
+    token = start_rerun(st.session_state.get("current_page", "login"))
+    try:
+        with rerun_scope() as scope:
+            render_app()
+    finally:
+        profile = finish_rerun(token)
+    if is_logged_in() and is_admin():
+        render_profile_panel(profile, scope.duplicates)
+
+
+def render_app():
+    checkpoint("sessão")
     # ── Cookie manager deve ser inicializado ANTES de qualquer UI condicional ──
     # O CookieManager é um iframe que carrega de forma assíncrona:
     # - Run 1 (pós-refresh): componente renderiza mas os dados do cookie ainda
@@ -530,16 +578,18 @@ def main():
         _restore_session_from_cookie()
 
     if not is_logged_in():
-        render_login_page()
+        load_page("login")()
         return
 
     if "current_page" not in st.session_state:
         st.session_state["current_page"] = "dashboard"
 
     user = get_current_user()
+    checkpoint("badge de não lidas")
     unread = get_unread_count(user["id"])
 
     # ── Header + Navbar ────────────────────────────────────────────────────
+    checkpoint("topbar/navbar")
     render_topbar(user, unread)
     render_navbar(user, unread)
 
@@ -548,25 +598,13 @@ def main():
 
     current_page = st.session_state.get("current_page", "dashboard")
 
-    if current_page == "dashboard":
-        render_dashboard_page()
-    elif current_page == "notifications":
-        render_notifications_page()
-    elif current_page == "task_management" and is_admin():
-        render_task_management_page()
-    elif current_page == "completed_tasks" and is_admin():
-        show_completed_tasks_manager()
-    elif current_page == "admin" and is_admin():
-        render_admin_page()
-    elif current_page == "task_details":
-        render_task_details_page()
-    elif current_page == "assignment_details":
-        render_assignment_details_page()
-    elif current_page == "manager_dashboard" and is_admin():
-        from views.manager_dashboard import render_manager_dashboard
-        render_manager_dashboard()
-    else:
-        render_dashboard_page()
+    if current_page not in PAGE_REGISTRY or current_page == "login":
+        current_page = "dashboard"
+    elif PAGE_REGISTRY[current_page][2] and not is_admin():
+        current_page = "dashboard"
+    render_page = load_page(current_page)
+    checkpoint(f"página: {current_page}")
+    render_page()
 
     st.markdown('</div>', unsafe_allow_html=True)
 
@@ -173,7 +173,7 @@ def get_company_stats(company_id: int) -> dict:
     """Retorna estatísticas de uma empresa via Supabase."""
     try:
         users = db.get_all_users(company_id)
-        tasks = db.get_task_assignments(company_id)
+        tasks = db.get_task_assignments(company_id, profile='list')
         return {
             "users": len(users),
             "tasks": len(tasks),
@@ -194,6 +194,7 @@ def update_company(company_id: int, name: str = None, active: bool = None) -> tu
         
         if update_data:
             db.client.table('companies').update(update_data).eq('id', company_id).execute()
+            db.invalidate_company_cache()
         
         return True, "Empresa atualizada com sucesso!"
     except Exception as e:
@@ -210,10 +211,17 @@ def delete_company(company_id: int) -> tuple[bool, str]:
         db.client.table('task_assignments').delete().eq('company_id', company_id).execute()
         
         # Excluir usuários
-        db.client.table('users').delete().eq('company_id', company_id).execute()
+        deleted_users = db.client.table('users').delete().eq('company_id', company_id).execute()
         
         # Excluir empresa
         db.client.table('companies').delete().eq('id', company_id).execute()
+
+        db.cache.invalidate(company_id)
+        # Buscas só por id (get_user_by_id sem empresa) ficam no tenant None
+        for user in deleted_users.data or []:
+            db.invalidate_user_cache(company_id, user['id'])
+            db.unread_counts.invalidate(None, user['id'])
+        db.invalidate_company_cache()
         
         return True, "Empresa excluída com sucesso!"
     except Exception as e:
@@ -1,47 +1,362 @@
+"""
+Configuração do sistema.
+
+Os valores são lidos uma única vez de fontes plugáveis, em ordem de prioridade:
+    1. Streamlit secrets (somente quando rodando sob `streamlit run`)
+    2. Variáveis de ambiente
+    3. Arquivo .env
+    4. Arquivo TOML (CONFIG_FILE ou .streamlit/secrets.toml)
+e consolidados no objeto imutável `settings`. As constantes do módulo
+(SUPABASE_URL, CACHE_TTL_SECONDS, ...) continuam disponíveis para os imports existentes.
+
+A API Flask não importa o Streamlit: a fonte de secrets só é usada quando o
+runtime do Streamlit já está ativo.
+"""
 import os
+import sys
+from dataclasses import dataclass
+from typing import Any, List, Optional
 from urllib.parse import quote_plus
-from dotenv import load_dotenv
 
-load_dotenv()
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 
-def get_secret(key: str, default: str = None) -> str:
-    """Obtém secret do Streamlit Cloud ou variável de ambiente."""
+# === FONTES ===
+class EnvSource:
+    """Variáveis de ambiente do processo."""
+
+    name = "env"
+
+    def get(self, key: str) -> Optional[Any]:
+        return os.environ.get(key)
+
+
+class DotEnvSource:
+    """Arquivo .env (python-dotenv), sem sobrescrever o ambiente."""
+
+    name = ".env"
+
+    def __init__(self, path: str = None):
+        self._values = {}
+        path = path or os.path.join(_BASE_DIR, ".env")
+        if os.path.isfile(path):
+            from dotenv import dotenv_values
+            self._values = {k: v for k, v in dotenv_values(path).items() if v is not None}
+            # Compatibilidade com código que lê os.environ diretamente (ex.: FCM_SERVER_KEY)
+            for key, value in self._values.items():
+                os.environ.setdefault(key, value)
+
+    def get(self, key: str) -> Optional[Any]:
+        return self._values.get(key)
+
+
+class TomlSource:
+    """Arquivo TOML com chaves no nível raiz (mesmo formato do secrets.toml)."""
+
+    name = "toml"
+
+    def __init__(self, path: str):
+        self._values = {}
+        if os.path.isfile(path):
+            try:
+                import tomllib
+            except ModuleNotFoundError:  # Python < 3.11
+                try:
+                    import tomli as tomllib
+                except ModuleNotFoundError:
+                    return
+            with open(path, "rb") as f:
+                self._values = {k: v for k, v in tomllib.load(f).items() if not isinstance(v, dict)}
+
+    def get(self, key: str) -> Optional[Any]:
+        return self._values.get(key)
+
+
+class StreamlitSecretsSource:
+    """st.secrets do Streamlit Cloud / .streamlit/secrets.toml."""
+
+    name = "streamlit"
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            import streamlit as st
+            if key in st.secrets:
+                return st.secrets[key]
+        except Exception:
+            pass
+        return None
+
+
+def running_under_streamlit() -> bool:
+    """True quando o processo é um `streamlit run` (sem importar o Streamlit à toa)."""
+    if "streamlit" not in sys.modules:
+        return False
     try:
-        import streamlit as st
-        if hasattr(st, 'secrets') and key in st.secrets:
-            return st.secrets[key]
+        from streamlit import runtime
+        return runtime.exists()
     except Exception:
-        pass
-    return os.getenv(key, default)
+        return False
+
+
+def default_sources() -> List[Any]:
+    """Fontes padrão, da maior para a menor prioridade."""
+    sources = []
+    if running_under_streamlit():
+        sources.append(StreamlitSecretsSource())
+    sources.append(EnvSource())
+    sources.append(DotEnvSource())
+    toml_path = os.environ.get("CONFIG_FILE") or os.path.join(_BASE_DIR, ".streamlit", "secrets.toml")
+    sources.append(TomlSource(toml_path))
+    return sources
+
+
+_sources = default_sources()
+
+
+def get_secret(key: str, default: str = None) -> str:
+    """Obtém um valor da primeira fonte que o define (Streamlit secrets, env, .env, TOML)."""
+    for source in _sources:
+        value = source.get(key)
+        if value is not None:
+            return value
+    return default
+
+
+def _bool(value: Any) -> bool:
+    return str(value).lower() in ("1", "true", "yes")
+
+
+# === SETTINGS ===
+@dataclass(frozen=True)
+class Settings:
+    """Configuração consolidada e imutável (carregada uma vez por processo)."""
+
+    db_host: str
+    db_port: str
+    db_name: str
+    db_user: str
+    db_password: str
+    supabase_url: str
+    supabase_key: str
+    supabase_service_key: str
+    supabase_bucket: str
+    database_backend: str
+    memory_backend_synthetic: bool
+    memory_backend_faults: str
+    google_maps_api_key: str
+    upload_folder: str
+    max_file_size_gb: float
+    max_files_per_task: int
+    upload_concurrency: int
+    upload_chunk_mb: float
+    photo_thumb_size: int
+    photo_medium_size: int
+    photo_rendition_quality: int
+    photo_max_edge: int
+    photo_quality: int
+    photo_format: str
+    photo_keep_source: bool
+    signed_url_expires_seconds: int
+    signed_url_refresh_margin_seconds: int
+    signed_url_cache_max_entries: int
+    cache_ttl_seconds: float
+    cache_max_entries: int
+    cache_stale_seconds: float
+    strict_task_projections: bool
+    notifications_page_size: int
+    notifications_retention_days: int
+    unread_count_ttl_seconds: float
+    http_max_connections: int
+    http_max_keepalive: int
+    http_keepalive_expiry: float
+    http2: bool
+    http_connect_timeout: float
+    http_timeout: float
+    slow_call_threshold_ms: float
+    slow_call_log: str
+    render_profile: bool
+    render_profile_dir: str
+    retry_attempts: int
+    retry_base_delay_ms: float
+    retry_max_delay_ms: float
+    hedge_after_ms: float
+    breaker_failure_threshold: int
+    breaker_reset_seconds: float
+    fallback_max_age_seconds: float
+
+    @property
+    def database_url(self) -> str:
+        return f"postgresql://{self.db_user}:{quote_plus(self.db_password)}@{self.db_host}:{self.db_port}/{self.db_name}"
+
+
+def load_settings() -> Settings:
+    """Lê e converte todos os valores das fontes configuradas."""
+    return Settings(
+        db_host=get_secret("DB_HOST", "localhost"),
+        db_port=str(get_secret("DB_PORT", "5432")),
+        db_name=get_secret("DB_NAME", "task_manager"),
+        db_user=get_secret("DB_USER", "postgres"),
+        db_password=get_secret("DB_PASSWORD", "postgres"),
+        supabase_url=get_secret("SUPABASE_URL", ""),
+        supabase_key=get_secret("SUPABASE_KEY", ""),
+        supabase_service_key=get_secret("SUPABASE_SERVICE_KEY", ""),
+        supabase_bucket=get_secret("SUPABASE_BUCKET", "task-photos"),
+        database_backend=str(get_secret("DATABASE_BACKEND", "supabase")).lower(),
+        memory_backend_synthetic=_bool(get_secret("MEMORY_BACKEND_SYNTHETIC", "false")),
+        memory_backend_faults=get_secret("MEMORY_BACKEND_FAULTS", ""),
+        google_maps_api_key=get_secret("GOOGLE_MAPS_API_KEY", ""),
+        upload_folder=get_secret("UPLOAD_FOLDER", "uploads"),
+        max_file_size_gb=float(get_secret("MAX_FILE_SIZE_GB", "1")),
+        max_files_per_task=int(get_secret("MAX_FILES_PER_TASK", "10")),
+        upload_concurrency=int(get_secret("UPLOAD_CONCURRENCY", "4")),
+        upload_chunk_mb=float(get_secret("UPLOAD_CHUNK_MB", "6")),
+        photo_thumb_size=int(get_secret("PHOTO_THUMB_SIZE", "320")),
+        photo_medium_size=int(get_secret("PHOTO_MEDIUM_SIZE", "1280")),
+        photo_rendition_quality=int(get_secret("PHOTO_RENDITION_QUALITY", "80")),
+        photo_max_edge=int(get_secret("PHOTO_MAX_EDGE", "2560")),
+        photo_quality=int(get_secret("PHOTO_QUALITY", "82")),
+        photo_format=str(get_secret("PHOTO_FORMAT", "jpeg")).lower(),
+        photo_keep_source=_bool(get_secret("PHOTO_KEEP_SOURCE", "false")),
+        signed_url_expires_seconds=int(get_secret("SIGNED_URL_EXPIRES_SECONDS", "3600")),
+        signed_url_refresh_margin_seconds=int(get_secret("SIGNED_URL_REFRESH_MARGIN_SECONDS", "300")),
+        signed_url_cache_max_entries=int(get_secret("SIGNED_URL_CACHE_MAX_ENTRIES", "2048")),
+        cache_ttl_seconds=float(get_secret("CACHE_TTL_SECONDS", "60")),
+        cache_max_entries=int(get_secret("CACHE_MAX_ENTRIES", "512")),
+        cache_stale_seconds=float(get_secret("CACHE_STALE_SECONDS", "0")),
+        strict_task_projections=_bool(get_secret("STRICT_TASK_PROJECTIONS", "false")),
+        notifications_page_size=int(get_secret("NOTIFICATIONS_PAGE_SIZE", "50")),
+        notifications_retention_days=int(get_secret("NOTIFICATIONS_RETENTION_DAYS", "90")),
+        unread_count_ttl_seconds=float(get_secret("UNREAD_COUNT_TTL_SECONDS", "30")),
+        http_max_connections=int(get_secret("HTTP_MAX_CONNECTIONS", "20")),
+        http_max_keepalive=int(get_secret("HTTP_MAX_KEEPALIVE", "10")),
+        http_keepalive_expiry=float(get_secret("HTTP_KEEPALIVE_EXPIRY", "60")),
+        http2=_bool(get_secret("HTTP2", "true")),
+        http_connect_timeout=float(get_secret("HTTP_CONNECT_TIMEOUT", "5")),
+        http_timeout=float(get_secret("HTTP_TIMEOUT", "60")),
+        slow_call_threshold_ms=float(get_secret("SLOW_CALL_THRESHOLD_MS", "500")),
+        slow_call_log=get_secret("SLOW_CALL_LOG", ""),
+        render_profile=_bool(get_secret("RENDER_PROFILE", "false")),
+        render_profile_dir=get_secret("RENDER_PROFILE_DIR", ""),
+        retry_attempts=int(get_secret("RETRY_ATTEMPTS", "3")),
+        retry_base_delay_ms=float(get_secret("RETRY_BASE_DELAY_MS", "100")),
+        retry_max_delay_ms=float(get_secret("RETRY_MAX_DELAY_MS", "1000")),
+        hedge_after_ms=float(get_secret("HEDGE_AFTER_MS", "300")),
+        breaker_failure_threshold=int(get_secret("BREAKER_FAILURE_THRESHOLD", "5")),
+        breaker_reset_seconds=float(get_secret("BREAKER_RESET_SECONDS", "30")),
+        fallback_max_age_seconds=float(get_secret("FALLBACK_MAX_AGE_SECONDS", "300")),
+    )
+
+
+settings = load_settings()
 
 
 # Configurações do Banco de Dados
 DB_CONFIG = {
-    "host": get_secret("DB_HOST", "localhost"),
-    "port": get_secret("DB_PORT", "5432"),
-    "database": get_secret("DB_NAME", "task_manager"),
-    "user": get_secret("DB_USER", "postgres"),
-    "password": get_secret("DB_PASSWORD", "postgres"),
+    "host": settings.db_host,
+    "port": settings.db_port,
+    "database": settings.db_name,
+    "user": settings.db_user,
+    "password": settings.db_password,
 }
 
-DATABASE_URL = f"postgresql://{DB_CONFIG['user']}:{quote_plus(DB_CONFIG['password'])}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
+DATABASE_URL = settings.database_url
 
 # Configurações do Supabase Storage
-SUPABASE_URL = get_secret("SUPABASE_URL", "")
-SUPABASE_KEY = get_secret("SUPABASE_KEY", "")
-SUPABASE_SERVICE_KEY = get_secret("SUPABASE_SERVICE_KEY", "")
-SUPABASE_BUCKET = get_secret("SUPABASE_BUCKET", "task-photos")
+SUPABASE_URL = settings.supabase_url
+SUPABASE_KEY = settings.supabase_key
+SUPABASE_SERVICE_KEY = settings.supabase_service_key
+SUPABASE_BUCKET = settings.supabase_bucket
+
+# Backend de dados: "supabase" (PostgREST real) ou "memory" (database/memory_backend.py)
+DATABASE_BACKEND = settings.database_backend
+# Com backend "memory": popular com dados sintéticos ao iniciar
+MEMORY_BACKEND_SYNTHETIC = settings.memory_backend_synthetic
+# Falhas injetadas no backend em memória, ex.: "error_rate=0.3,latency_ms=200,seed=1"
+MEMORY_BACKEND_FAULTS = settings.memory_backend_faults
 
 # Google Maps API Key
-GOOGLE_MAPS_API_KEY = get_secret("GOOGLE_MAPS_API_KEY", "")
+GOOGLE_MAPS_API_KEY = settings.google_maps_api_key
 
 # Configurações de Upload
-UPLOAD_FOLDER = get_secret("UPLOAD_FOLDER", "uploads")
-MAX_FILE_SIZE_GB = float(get_secret("MAX_FILE_SIZE_GB", "1"))
+UPLOAD_FOLDER = settings.upload_folder
+MAX_FILE_SIZE_GB = settings.max_file_size_gb
 MAX_FILE_SIZE_BYTES = int(MAX_FILE_SIZE_GB * 1024 * 1024 * 1024)
-MAX_FILES_PER_TASK = int(get_secret("MAX_FILES_PER_TASK", "10"))
-ALLOWED_EXTENSIONS = {"jpg", "jpeg", "png"}
+MAX_FILES_PER_TASK = settings.max_files_per_task
+ALLOWED_EXTENSIONS = {"jpg", "jpeg", "png", "webp", "heic", "heif"}
+# Uploads simultâneos ao storage em save_uploaded_files
+UPLOAD_CONCURRENCY = max(1, settings.upload_concurrency)
+# Tamanho do bloco dos uploads em streaming (utils/chunked_upload.py); arquivos
+# maiores que um bloco vão por upload resumível (TUS), que no Supabase exige 6 MB
+UPLOAD_CHUNK_MB = settings.upload_chunk_mb
+
+# Renditions geradas no upload (utils/image_renditions.py): lado maior em pixels
+# da miniatura (grades) e da média (visualização), e qualidade JPEG
+PHOTO_THUMB_SIZE = settings.photo_thumb_size
+PHOTO_MEDIUM_SIZE = settings.photo_medium_size
+PHOTO_RENDITION_QUALITY = settings.photo_rendition_quality
+
+# Normalização das fotos na ingestão (utils/image_renditions.py): HEIC/WebP/PNG/JPEG
+# são decodificados, orientados pelo EXIF (que é removido), limitados a
+# PHOTO_MAX_EDGE px no lado maior e recodificados em PHOTO_FORMAT ("jpeg" ou
+# "webp") com PHOTO_QUALITY. Com PHOTO_KEEP_SOURCE o arquivo enviado também é guardado
+PHOTO_MAX_EDGE = settings.photo_max_edge
+PHOTO_QUALITY = settings.photo_quality
+PHOTO_FORMAT = settings.photo_format if settings.photo_format in ("jpeg", "webp") else "jpeg"
+PHOTO_KEEP_SOURCE = settings.photo_keep_source
+
+# URLs assinadas das fotos (utils/file_handler.py): validade, antecedência com que
+# são renovadas antes de expirar e limite de caminhos guardados no cache
+SIGNED_URL_EXPIRES_SECONDS = settings.signed_url_expires_seconds
+SIGNED_URL_REFRESH_MARGIN_SECONDS = settings.signed_url_refresh_margin_seconds
+SIGNED_URL_CACHE_MAX_ENTRIES = settings.signed_url_cache_max_entries
+
+# Cache de leituras do Supabase (usuários/empresas)
+CACHE_TTL_SECONDS = settings.cache_ttl_seconds
+CACHE_MAX_ENTRIES = settings.cache_max_entries
+# Janela extra em que um valor expirado ainda é servido enquanto recarrega (0 = desligado)
+CACHE_STALE_SECONDS = settings.cache_stale_seconds
+
+# Modo estrito de projeções: ler campo de tarefa fora do perfil buscado gera KeyError
+STRICT_TASK_PROJECTIONS = settings.strict_task_projections
+
+# Feed de notificações: tamanho máximo de página e retenção das já lidas
+NOTIFICATIONS_PAGE_SIZE = settings.notifications_page_size
+NOTIFICATIONS_RETENTION_DAYS = settings.notifications_retention_days
+# Contador de não lidas (badge): ajustado em memória e ressincronizado após o TTL
+UNREAD_COUNT_TTL_SECONDS = settings.unread_count_ttl_seconds
+
+# Transporte HTTP compartilhado (utils/http_transport.py): pool, keep-alive e timeouts
+HTTP_MAX_CONNECTIONS = settings.http_max_connections
+HTTP_MAX_KEEPALIVE = settings.http_max_keepalive
+HTTP_KEEPALIVE_EXPIRY = settings.http_keepalive_expiry
+HTTP2 = settings.http2
+HTTP_CONNECT_TIMEOUT = settings.http_connect_timeout
+# Timeout de leitura/escrita/espera por conexão do pool
+HTTP_TIMEOUT = settings.http_timeout
+
+# Instrumentação (utils/instrumentation.py): chamadas acima do limite vão para o
+# log de chamadas lentas; SLOW_CALL_LOG opcional grava também em arquivo JSONL
+SLOW_CALL_THRESHOLD_MS = settings.slow_call_threshold_ms
+SLOW_CALL_LOG = settings.slow_call_log
+
+# Profiler de rerun do Streamlit (utils/render_profiler.py): ligado para todos com
+# RENDER_PROFILE ou, para admins, com ?profile=1 na URL. Com RENDER_PROFILE_DIR,
+# cada rerun perfilado grava um arquivo .prof do cProfile nesse diretório
+RENDER_PROFILE = settings.render_profile
+RENDER_PROFILE_DIR = settings.render_profile_dir
+
+# Resiliência das leituras (database/resilience.py): tentativas com backoff
+# exponencial e jitter para falhas transitórias, requisição duplicada (hedge)
+# após HEDGE_AFTER_MS nas leituras críticas (0 = desligado) e circuit breaker
+# por endpoint, que abre após BREAKER_FAILURE_THRESHOLD falhas seguidas
+RETRY_ATTEMPTS = settings.retry_attempts
+RETRY_BASE_DELAY_MS = settings.retry_base_delay_ms
+RETRY_MAX_DELAY_MS = settings.retry_max_delay_ms
+HEDGE_AFTER_MS = settings.hedge_after_ms
+BREAKER_FAILURE_THRESHOLD = settings.breaker_failure_threshold
+BREAKER_RESET_SECONDS = settings.breaker_reset_seconds
+# Idade máxima da última resposta boa servida com o backend indisponível (0 = nunca servir)
+FALLBACK_MAX_AGE_SECONDS = settings.fallback_max_age_seconds
 
 # Tipos de Fibra disponíveis
 TIPOS_FIBRA = ["F.06", "F.08", "F.12", "Outro"]
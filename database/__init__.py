@@ -1,4 +1,21 @@
-from .connection import get_engine, get_session, SessionLocal
-from .models import Base, User, Task, TaskPhoto
+# Exports carregados sob demanda: importar database.supabase_only_connection
+# não deve carregar SQLAlchemy nem criar a engine do Postgres local.
+_LAZY_EXPORTS = {
+    "get_engine": "connection",
+    "get_session": "connection",
+    "SessionLocal": "connection",
+    "Base": "models",
+    "User": "models",
+    "Task": "models",
+    "TaskPhoto": "models",
+}
 
 __all__ = ["get_engine", "get_session", "SessionLocal", "Base", "User", "Task", "TaskPhoto"]
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        from importlib import import_module
+        module = import_module(f".{_LAZY_EXPORTS[name]}", __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,254 @@
+"""
+Camada de dados assíncrona (supabase AsyncClient / httpx) para buscas concorrentes.
+
+As views do Streamlit rodam em threads síncronas: `gather()` envia as corrotinas
+para um event loop dedicado (thread em background) e devolve os resultados na
+ordem pedida. O tempo total fica próximo ao da consulta mais lenta, não à soma.
+
+    from database.async_connection import adb, gather
+    aggregates, users = gather(
+        adb.get_dashboard_aggregates(company_id, 'mes'),
+        adb.get_all_users(company_id),
+    )
+
+Leituras de usuários/empresas usam o mesmo TenantCache do `db` síncrono,
+então as invalidações feitas pelas escritas continuam valendo. Dentro de um
+rerun, as leituras passam pelo mesmo identity map do `db`
+(database/identity_map.py): a mesma leitura não vai duas vezes ao backend.
+"""
+import asyncio
+import contextvars
+import threading
+import sys
+import os
+from datetime import datetime
+from typing import Optional, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import SUPABASE_URL, SUPABASE_KEY, SUPABASE_SERVICE_KEY, DATABASE_BACKEND, STRICT_TASK_PROJECTIONS
+from database.projections import projection_select, apply_projection
+from utils.instrumentation import instrumented, record_error
+from database.identity_map import identity_mapped, reads
+from database.resilience import resilience
+from database.supabase_only_connection import (
+    db, get_client, task_list_query, dashboard_aggregates_params, parse_dashboard_aggregates,
+)
+
+
+# === EVENT LOOP DEDICADO ===
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Event loop em background onde vivem o AsyncClient e suas conexões."""
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="async-db", daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+def run(coro):
+    """Executa uma corrotina no loop dedicado e espera o resultado (chamável de qualquer thread).
+
+    A corrotina roda numa cópia do contexto de quem chamou: o identity map do
+    rerun e a instrumentação valem também para as leituras feitas dentro dela.
+    """
+    context = contextvars.copy_context()
+    return context.run(asyncio.run_coroutine_threadsafe, coro, get_event_loop()).result()
+
+
+def gather(*coros) -> list:
+    """Executa as corrotinas concorrentemente e retorna os resultados na mesma ordem."""
+    async def _gather():
+        return await asyncio.gather(*coros)
+    return run(_gather())
+
+
+# === CLIENTE ===
+_async_client = None
+_async_client_lock: Optional[asyncio.Lock] = None
+
+
+async def create_async_backend_client():
+    """Cria o cliente assíncrono conforme DATABASE_BACKEND.
+
+    "supabase": AsyncClient (pool httpx assíncrono compartilhado) com service key para bypass RLS.
+    "memory": o mesmo MemoryClient do `db` síncrono (execute() síncrono e local).
+    """
+    if DATABASE_BACKEND == 'memory':
+        return get_client()
+    if DATABASE_BACKEND != 'supabase':
+        raise ValueError(f"DATABASE_BACKEND inválido: {DATABASE_BACKEND}")
+
+    from supabase import acreate_client
+    from utils.http_transport import supabase_options
+    return await acreate_client(SUPABASE_URL, SUPABASE_SERVICE_KEY or SUPABASE_KEY, supabase_options(is_async=True))
+
+
+async def get_async_client():
+    """Retorna o cliente assíncrono compartilhado, criando-o na primeira chamada."""
+    global _async_client, _async_client_lock
+    if _async_client is None:
+        # Todas as corrotinas rodam no loop dedicado, então o lock é criado nele
+        if _async_client_lock is None:
+            _async_client_lock = asyncio.Lock()
+        async with _async_client_lock:
+            if _async_client is None:
+                _async_client = await create_async_backend_client()
+    return _async_client
+
+
+@identity_mapped("adb")
+@instrumented("adb")
+class AsyncSupabaseDatabase:
+    """Contraparte assíncrona das leituras de SupabaseDatabase usadas pelos dashboards."""
+
+    def __init__(self, client=None, cache=None):
+        # `client` permite injetar outro backend; `cache` é o TenantCache compartilhado com `db`
+        self._client = client
+        self.cache = cache if cache is not None else db.cache
+
+    async def _get_client(self):
+        """Cliente assíncrono, resolvido sob demanda."""
+        if self._client is None:
+            self._client = await get_async_client()
+        return self._client
+
+    # === USUÁRIOS ===
+    @reads('users', registers='users')
+    async def get_all_users(self, company_id: int) -> List[dict]:
+        """Retorna usuários de uma empresa (cacheado por empresa)"""
+        users = self.cache.get(company_id, 'users')
+        if users is not None:
+            return users
+        try:
+            client = await self._get_client()
+            query = client.table('users').select('*').eq('company_id', company_id).order('full_name')
+            result = await resilience.aexecute('users', query, key=('get_all_users', company_id))
+            users = result.data or []
+            self.cache.set(company_id, 'users', users)
+            return users
+        except Exception as e:
+            record_error(e)
+            print(f"Erro ao buscar usuários: {e}")
+            return []
+
+    @reads('users', registers='users', lookup='users')
+    async def get_user_by_id(self, user_id: int, company_id: int = None) -> Optional[dict]:
+        """Retorna usuário por ID (cacheado)"""
+        user = self.cache.get(company_id or None, ('user', user_id))
+        if user is not None:
+            return user
+        try:
+            client = await self._get_client()
+            query = client.table('users').select('*').eq('id', user_id)
+            if company_id:
+                query = query.eq('company_id', company_id)
+            result = await resilience.aexecute('users', query, key=('get_user_by_id', user_id, company_id))
+            if not result.data:
+                return None
+            self.cache.set(company_id or None, ('user', user_id), result.data[0])
+            return result.data[0]
+        except Exception as e:
+            record_error(e)
+            print(f"Erro ao buscar usuário: {e}")
+            return None
+
+    # === EMPRESAS ===
+    @reads('companies')
+    async def get_all_companies(self) -> List[dict]:
+        """Retorna todas as empresas (cacheado)"""
+        companies = self.cache.get(None, 'companies')
+        if companies is not None:
+            return companies
+        try:
+            client = await self._get_client()
+            query = client.table('companies').select('*').order('name')
+            result = await resilience.aexecute('companies', query, key=('get_all_companies',))
+            companies = result.data or []
+            self.cache.set(None, 'companies', companies)
+            return companies
+        except Exception as e:
+            record_error(e)
+            print(f"Erro ao buscar empresas: {e}")
+            return []
+
+    # === TAREFAS ===
+    @reads('task_assignments', 'users')
+    async def get_task_assignments(
+        self,
+        company_id: int,
+        user_id: int = None,
+        status: str = None,
+        created_from: datetime = None,
+        created_to: datetime = None,
+        completed_from: datetime = None,
+        completed_to: datetime = None,
+        empresa_nome: str = None,
+        assigned_by: int = None,
+        assigned_to_name: str = None,
+        limit: int = None,
+        profile: str = 'detail',
+    ) -> List[dict]:
+        """Mesmos filtros e perfis de SupabaseDatabase.get_task_assignments."""
+        try:
+            assigned_to_ids = None
+            if assigned_to_name:
+                users = await self.get_all_users(company_id)
+                assigned_to_ids = [u['id'] for u in users if u.get('full_name') == assigned_to_name]
+                if not assigned_to_ids:
+                    return []
+
+            query = task_list_query(
+                await self._get_client(),
+                projection_select(profile),
+                company_id,
+                user_id=user_id,
+                status=status,
+                assigned_to_ids=assigned_to_ids,
+                created_from=created_from,
+                created_to=created_to,
+                completed_from=completed_from,
+                completed_to=completed_to,
+                empresa_nome=empresa_nome,
+                assigned_by=assigned_by,
+            )
+            query = query.order('created_at', desc=True)
+            if limit:
+                query = query.limit(limit)
+
+            key = (
+                'get_task_assignments', company_id, user_id, status, created_from, created_to,
+                completed_from, completed_to, empresa_nome, assigned_by, assigned_to_name, limit, profile,
+            )
+            result = await resilience.aexecute('task_assignments', query, key=key)
+            return apply_projection(result.data or [], profile, STRICT_TASK_PROJECTIONS)
+        except Exception as e:
+            record_error(e)
+            print(f"Erro ao buscar tarefas: {e}")
+            return []
+
+    @reads('task_assignments', 'users')
+    async def get_dashboard_aggregates(self, company_id: int, period=None, empresa: str = None) -> dict:
+        """Agregados do dashboard (RPC dashboard_aggregates), no formato de SupabaseDatabase."""
+        try:
+            client = await self._get_client()
+            params = dashboard_aggregates_params(company_id, period, empresa)
+            result = await resilience.aexecute(
+                'rpc.dashboard_aggregates', client.rpc('dashboard_aggregates', params),
+                key=('get_dashboard_aggregates',) + tuple(sorted(params.items())), hedge=True,
+            )
+            return parse_dashboard_aggregates(result.data or [])
+        except Exception as e:
+            record_error(e)
+            print(f"Erro ao buscar agregados do dashboard: {e}")
+            return parse_dashboard_aggregates([])
+
+
+# Instância global (mesmo padrão de `db`)
+adb = AsyncSupabaseDatabase()
@@ -0,0 +1,189 @@
+"""
+Cache em memória por empresa (tenant) para leituras do Supabase.
+TTL + LRU, com modo stale-while-revalidate opcional.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class _Load:
+    """Carga em andamento de uma chave: as outras chamadas esperam por ela (single-flight)."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[Exception] = None
+        # Invalidada durante a carga: o resultado não vai para o cache
+        self.invalidated = False
+
+
+class TenantCache:
+    """Cache read-through indexado por (company_id, chave).
+
+    - Entradas expiram após `ttl` segundos.
+    - Quando o número de entradas passa de `max_entries`, a menos usada é descartada.
+    - Com `stale_seconds > 0`, uma entrada expirada ainda é servida por até
+      `stale_seconds` enquanto é recarregada em background; se a recarga
+      falhar, o valor antigo continua sendo servido dentro dessa janela.
+    - Misses simultâneos da mesma chave fazem uma só carga; uma invalidação
+      durante a carga impede que o valor anterior à escrita volte ao cache.
+    """
+
+    def __init__(self, ttl: float = 60, max_entries: int = 512, stale_seconds: float = 0):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stale_seconds = stale_seconds
+        self._entries: "OrderedDict[tuple, tuple[float, Any]]" = OrderedDict()
+        self._loading: dict = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+
+    # === LEITURA ===
+    def get_or_load(self, tenant: Optional[Hashable], key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Retorna o valor em cache ou chama `loader()` e armazena o resultado.
+
+        Exceções do loader são propagadas quando não há valor antigo utilizável.
+        """
+        full_key = (tenant, key)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(full_key)
+            if entry is not None:
+                stored_at, value = entry
+                age = now - stored_at
+                if age < self.ttl:
+                    self._entries.move_to_end(full_key)
+                    self.hits += 1
+                    return value
+                if age < self.ttl + self.stale_seconds:
+                    self._entries.move_to_end(full_key)
+                    self.stale_hits += 1
+                    self._schedule_refresh(full_key, loader)
+                    return value
+            self.misses += 1
+            load = self._loading.get(full_key)
+            leader = load is None
+            if leader:
+                load = self._loading[full_key] = _Load()
+
+        if leader:
+            try:
+                load.value = loader()
+            except Exception as e:
+                load.error = e
+            finally:
+                with self._lock:
+                    if self._loading.get(full_key) is load:
+                        del self._loading[full_key]
+                    if load.error is None and not load.invalidated:
+                        self.set(tenant, key, load.value)
+                load.done.set()
+        else:
+            load.done.wait()
+
+        if load.error is not None:
+            # Supabase lento/instável: serve o último valor se ainda estiver na janela stale
+            with self._lock:
+                entry = self._entries.get(full_key)
+                if entry is not None and now - entry[0] < self.ttl + self.stale_seconds:
+                    return entry[1]
+            raise load.error
+        return load.value
+
+    def get(self, tenant: Optional[Hashable], key: Hashable, default: Any = None) -> Any:
+        """Retorna o valor dentro do TTL, ou `default` (para loaders que não cabem em get_or_load)."""
+        with self._lock:
+            entry = self._entries.get((tenant, key))
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self._entries.move_to_end((tenant, key))
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return default
+
+    def set(self, tenant: Optional[Hashable], key: Hashable, value: Any) -> None:
+        """Armazena um valor, aplicando o limite LRU."""
+        with self._lock:
+            full_key = (tenant, key)
+            self._entries[full_key] = (time.monotonic(), value)
+            self._entries.move_to_end(full_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def adjust(self, tenant: Optional[Hashable], key: Hashable, fn: Callable[[Any], Any]) -> bool:
+        """Aplica `fn` ao valor em cache, se houver, sem renovar o TTL.
+
+        Usado para manter contadores atualizados incrementalmente entre recargas.
+        Retorna False quando a chave não está em cache (nada a ajustar).
+        """
+        with self._lock:
+            full_key = (tenant, key)
+            entry = self._entries.get(full_key)
+            if entry is None:
+                return False
+            stored_at, value = entry
+            self._entries[full_key] = (stored_at, fn(value))
+            return True
+
+    def _schedule_refresh(self, full_key: tuple, loader: Callable[[], Any]) -> None:
+        """Recarrega uma entrada em background (uma carga por chave por vez; chamado com o lock)."""
+        if full_key in self._loading:
+            return
+        load = self._loading[full_key] = _Load()
+
+        def _refresh():
+            try:
+                load.value = loader()
+            except Exception as e:
+                load.error = e
+                print(f"Erro ao revalidar cache {full_key}: {e}")
+            finally:
+                with self._lock:
+                    if self._loading.get(full_key) is load:
+                        del self._loading[full_key]
+                    # Só grava se a entrada não foi invalidada durante a recarga
+                    if load.error is None and not load.invalidated:
+                        self.set(*full_key, load.value)
+                load.done.set()
+
+        threading.Thread(target=_refresh, daemon=True).start()
+
+    # === INVALIDAÇÃO ===
+    def invalidate(self, tenant: Optional[Hashable], key: Hashable = None) -> None:
+        """Remove uma chave de um tenant, ou todas as chaves do tenant se `key` for None."""
+        if key is not None:
+            self._drop(lambda k: k == (tenant, key))
+        else:
+            self._drop(lambda k: k[0] == tenant)
+
+    def invalidate_everywhere(self, key: Hashable) -> None:
+        """Remove `key` de todos os tenants (quando o tenant do registro não é conhecido)."""
+        self._drop(lambda k: k[1] == key)
+
+    def clear(self) -> None:
+        """Esvazia o cache."""
+        self._drop(lambda k: True)
+
+    def _drop(self, matches: Callable[[tuple], bool]) -> None:
+        """Remove as entradas e descarta o resultado das cargas em andamento das chaves que casam."""
+        with self._lock:
+            for full_key in [k for k in self._entries if matches(k)]:
+                del self._entries[full_key]
+            for full_key in [k for k in self._loading if matches(k)]:
+                # Quem chegar depois da escrita começa uma carga nova
+                self._loading.pop(full_key).invalidated = True
+
+    def stats(self) -> dict:
+        """Retorna contadores de uso do cache."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+            }
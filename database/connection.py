@@ -1,30 +1,22 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
 from contextlib import contextmanager
-import psycopg2
+import threading
 import sys
 import os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import DATABASE_URL, DB_CONFIG
 
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=300,
-    pool_size=5,
-    max_overflow=10,
-    connect_args={
-        "sslmode": "require",
-        "connect_timeout": 10,
-    }
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Engine criada sob demanda: páginas que não usam o Postgres local não pagam por ela
+_engine = None
+_engine_lock = threading.Lock()
 
 
 def get_connection():
     """Retorna uma conexão psycopg2 para operações diretas."""
     try:
+        import psycopg2
         return psycopg2.connect(
             host=DB_CONFIG["host"],
             port=DB_CONFIG["port"],
@@ -38,8 +30,47 @@ def get_connection():
 
 
 def get_engine():
-    """Retorna a engine do SQLAlchemy."""
-    return engine
+    """Retorna a engine do SQLAlchemy (criada no primeiro uso, thread-safe)."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_engine(
+                    DATABASE_URL,
+                    pool_pre_ping=True,
+                    pool_recycle=300,
+                    pool_size=5,
+                    max_overflow=10,
+                    connect_args={
+                        "sslmode": "require",
+                        "connect_timeout": 10,
+                    }
+                )
+    return _engine
+
+
+class _LazySessionLocal:
+    """Fábrica de sessões compatível com sessionmaker; vincula a engine na primeira sessão."""
+
+    def __init__(self):
+        self._factory = sessionmaker(autocommit=False, autoflush=False)
+        self._bound = False
+
+    def __call__(self, **kwargs) -> Session:
+        if not self._bound:
+            self._factory.configure(bind=get_engine())
+            self._bound = True
+        return self._factory(**kwargs)
+
+
+SessionLocal = _LazySessionLocal()
+
+
+def __getattr__(name):
+    # Compatibilidade: `from database.connection import engine`
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 @contextmanager
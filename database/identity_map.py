@@ -0,0 +1,227 @@
+"""
+Identity map por rerun do Streamlit (unit of work de leitura).
+
+Dentro de `rerun_scope()`, leituras idênticas de SupabaseDatabase (mesmo
+método e mesmos argumentos) devolvem o mesmo objeto, sem nova consulta. As
+leituras assíncronas (AsyncSupabaseDatabase, mesmos nomes de método) usam o
+mesmo map: o que `adb` buscou no rerun atende `db`, e vice-versa.
+Linhas de usuários já carregadas também atendem `get_user_by_id`. Escritas
+descartam as leituras das tabelas que alteram, e as chamadas repetidas
+evitadas são contadas para o diagnóstico (por rerun e no processo).
+
+Fora de um escopo (API Flask, scripts) nada muda: cada chamada consulta.
+
+    @identity_mapped("db")
+    @instrumented("db")
+    class SupabaseDatabase:
+        @reads('users', registers='users')
+        def get_all_users(self, company_id): ...
+
+        @writes('users')
+        def update_password(self, ...): ...
+"""
+import contextlib
+import contextvars
+import functools
+import inspect
+import threading
+from collections import Counter
+from typing import Optional
+
+_scope: contextvars.ContextVar[Optional["IdentityMap"]] = contextvars.ContextVar("identity_map", default=None)
+
+# Chamadas repetidas evitadas desde o início do processo, por método
+_duplicate_totals: Counter = Counter()
+_totals_lock = threading.Lock()
+
+
+class IdentityMap:
+    """Resultados e entidades carregados durante um rerun."""
+
+    def __init__(self):
+        self.results: dict = {}
+        self.entities: dict = {}
+        self.duplicates: Counter = Counter()
+
+    def get(self, key: tuple):
+        return self.results.get(key)
+
+    def store(self, key: tuple, tables: tuple, value) -> None:
+        self.results[key] = (tables, value)
+
+    def register(self, table: str, rows) -> None:
+        """Registra linhas com 'id' como entidades da tabela."""
+        for row in rows or []:
+            if isinstance(row, dict) and 'id' in row:
+                self.entities[(table, row['id'])] = row
+
+    def entity(self, table: str, entity_id):
+        return self.entities.get((table, entity_id))
+
+    def invalidate(self, tables: tuple) -> None:
+        """Descarta leituras e entidades das tabelas alteradas por uma escrita."""
+        affected = set(tables)
+        for key in [k for k, (t, _) in self.results.items() if affected & set(t)]:
+            del self.results[key]
+        for key in [k for k in self.entities if k[0] in affected]:
+            del self.entities[key]
+
+
+@contextlib.contextmanager
+def rerun_scope():
+    """Abre um identity map para o rerun atual e soma as repetições ao total do processo."""
+    identity_map = IdentityMap()
+    token = _scope.set(identity_map)
+    try:
+        yield identity_map
+    finally:
+        _scope.reset(token)
+        if identity_map.duplicates:
+            with _totals_lock:
+                _duplicate_totals.update(identity_map.duplicates)
+
+
+def duplicate_totals() -> list:
+    """[(método, chamadas repetidas evitadas)] do processo, da maior para a menor."""
+    with _totals_lock:
+        return _duplicate_totals.most_common()
+
+
+# === MARCAÇÃO DOS MÉTODOS ===
+def reads(*tables: str, registers: str = None, lookup: str = None):
+    """Marca um método de leitura que depende de `tables`.
+
+    registers: tabela cujas linhas retornadas (lista ou registro) viram entidades.
+    lookup: tabela em que o primeiro argumento (id) é procurado antes de consultar;
+            se `company_id` for informado, a entidade precisa ser da mesma empresa.
+    """
+    def decorator(func):
+        func._identity_reads = (tables, registers, lookup)
+        return func
+    return decorator
+
+
+def writes(*tables: str):
+    """Marca um método de escrita que altera `tables`."""
+    def decorator(func):
+        func._identity_writes = tables
+        return func
+    return decorator
+
+
+def _freeze(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+def _read_wrapper(name: str, func, tables: tuple, registers: str, lookup: str):
+    method = name.split('.', 1)[1]
+    signature = inspect.signature(func)
+
+    def _find(identity_map: IdentityMap, args, kwargs):
+        """(True, valor) se a leitura já está no map; senão (False, chave ou None se não hasheável)."""
+        # Argumentos normalizados pela assinatura: posicional ou nomeado dá a mesma chave
+        try:
+            bound = signature.bind(None, *args, **kwargs)
+        except TypeError:
+            return False, None
+        bound.apply_defaults()
+        arguments = dict(list(bound.arguments.items())[1:])
+
+        if lookup and arguments:
+            entity = identity_map.entity(lookup, next(iter(arguments.values())))
+            company_id = arguments.get('company_id')
+            if entity is not None and (not company_id or entity.get('company_id') == company_id):
+                identity_map.duplicates[name] += 1
+                return True, entity
+
+        # Sem o prefixo: `db` e `adb` compartilham as leituras do rerun
+        key = (method, _freeze(arguments))
+        try:
+            hash(key)
+        except TypeError:
+            return False, None
+
+        cached = identity_map.get(key)
+        if cached is not None:
+            identity_map.duplicates[name] += 1
+            return True, cached[1]
+        return False, key
+
+    def _store(identity_map: IdentityMap, key: tuple, value) -> None:
+        identity_map.store(key, tables, value)
+        if registers:
+            identity_map.register(registers, value if isinstance(value, list) else [value])
+
+    if inspect.iscoroutinefunction(inspect.unwrap(func)):
+        async def _ready(value):
+            return value
+
+        async def _load(identity_map, key, coro):
+            value = await coro
+            _store(identity_map, key, value)
+            return value
+
+        @functools.wraps(func)
+        def async_wrapper(self, *args, **kwargs):
+            # O map é resolvido ao criar a corrotina, na thread do rerun (ela roda depois, no loop dedicado)
+            identity_map = _scope.get()
+            if identity_map is None:
+                return func(self, *args, **kwargs)
+            found, value = _find(identity_map, args, kwargs)
+            if found:
+                return _ready(value)
+            if value is None:
+                return func(self, *args, **kwargs)
+            return _load(identity_map, value, func(self, *args, **kwargs))
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        identity_map = _scope.get()
+        if identity_map is None:
+            return func(self, *args, **kwargs)
+        found, value = _find(identity_map, args, kwargs)
+        if found:
+            return value
+        if value is None:
+            return func(self, *args, **kwargs)
+        result = func(self, *args, **kwargs)
+        _store(identity_map, value, result)
+        return result
+    return wrapper
+
+
+def _write_wrapper(func, tables: tuple):
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            identity_map = _scope.get()
+            if identity_map is not None:
+                identity_map.invalidate(tables)
+    return wrapper
+
+
+def identity_mapped(prefix: str):
+    """Decorator de classe: aplica o identity map aos métodos marcados com @reads/@writes.
+
+    Deve ficar acima de @instrumented, para que leituras repetidas não contem como chamadas.
+    As repetições são contadas como f"{prefix}.{método}" (mesmos nomes da instrumentação).
+    """
+    def decorator(cls):
+        for attr, value in list(vars(cls).items()):
+            if not callable(value):
+                continue
+            read = getattr(value, '_identity_reads', None)
+            written = getattr(value, '_identity_writes', None)
+            if read is not None:
+                setattr(cls, attr, _read_wrapper(f"{prefix}.{attr}", value, *read))
+            elif written is not None:
+                setattr(cls, attr, _write_wrapper(value, written))
+        return cls
+    return decorator
@@ -0,0 +1,691 @@
+"""
+Backend local em memória que imita o cliente Supabase (PostgREST) usado por SupabaseDatabase.
+Selecionado com DATABASE_BACKEND=memory; permite importar, testar e medir o
+sistema sem um Supabase real.
+
+Suporta o subconjunto da API usado no projeto: select (com embeds como
+`assigned_to_user:users!assigned_to(full_name)` e `companies(name)`), insert,
+upsert, update, delete, filtros eq/neq/gt/gte/lt/lte/in_/is_/like/ilike/not_/or_,
+order, limit, range, count e as funções RPC das migrations.
+
+Com um `FaultInjector` em `client.faults` (MEMORY_BACKEND_FAULTS), cada
+execute() pode atrasar ou falhar como um Supabase instável, de forma
+reprodutível (seed), para exercitar database/resilience.py.
+"""
+import copy
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+# Coluna de chave estrangeira usada em embeds sem hint (ex.: `companies(name)` em users)
+DEFAULT_FOREIGN_KEYS = {
+    'companies': 'company_id',
+    'users': 'user_id',
+    'task_assignments': 'assignment_id',
+}
+
+# Valores padrão das colunas (equivalentes aos DEFAULT do schema)
+TABLE_DEFAULTS = {
+    'companies': {'active': True},
+    'users': {'active': True, 'role': 'user', 'is_super_admin': False, 'push_token': None, 'team': None},
+    'task_assignments': {
+        'assigned_to': None, 'description': None, 'address': None, 'latitude': None, 'longitude': None,
+        'status': 'pendente', 'priority': 'media', 'due_date': None, 'observations': None,
+        'materials': None, 'empresa_nome': None, 'started_at': None, 'completed_at': None,
+        'updated_at': None, 'quantidade_cto': None, 'quantidade_cx_emenda': None, 'fibra_lancada': None,
+        'abertura_fechamento_cx_emenda': None, 'abertura_fechamento_cto': None,
+        'abertura_fechamento_rozeta': None,
+    },
+    'notifications': {'read': False, 'message': None, 'reference_id': None},
+    'task_materials': {'unit': None, 'quantity': None},
+    'assignment_photos': {
+        'original_name': None, 'thumb_url': None, 'thumb_path': None, 'medium_url': None, 'medium_path': None,
+        'source_url': None, 'source_path': None,
+    },
+}
+
+# Coluna de data de criação preenchida automaticamente por tabela
+TIMESTAMP_COLUMNS = {'assignment_photos': 'uploaded_at'}
+
+
+class FaultInjector:
+    """Falhas e latência injetadas antes de cada execute() do backend em memória.
+
+    error_rate: fração das chamadas que falham com ConnectionError (transitória).
+    latency_ms: atraso aplicado a uma fração `slow_rate` das chamadas.
+    seed: torna a sequência de falhas reprodutível.
+    Para cenários exatos, `fail_next(n)` derruba as próximas n chamadas e
+    `down = True` derruba todas até voltar a False.
+    """
+
+    def __init__(self, error_rate: float = 0.0, latency_ms: float = 0.0, slow_rate: float = 1.0,
+                 seed: Optional[int] = None):
+        self.error_rate = error_rate
+        self.latency_ms = latency_ms
+        self.slow_rate = slow_rate
+        self.down = False
+        self.calls = 0
+        self.injected_errors = 0
+        self._forced_failures = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_spec(cls, spec: str) -> 'FaultInjector':
+        """Cria a partir de "error_rate=0.3,latency_ms=200,slow_rate=0.1,seed=1"."""
+        options = {}
+        for item in filter(None, (part.strip() for part in spec.split(','))):
+            name, _, value = item.partition('=')
+            options[name.strip()] = int(value) if name.strip() == 'seed' else float(value)
+        return cls(**options)
+
+    def fail_next(self, count: int = 1) -> None:
+        with self._lock:
+            self._forced_failures += count
+
+    def before_execute(self, target: str) -> None:
+        with self._lock:
+            self.calls += 1
+            fail = self.down or self._forced_failures > 0 or self._rng.random() < self.error_rate
+            if self._forced_failures > 0:
+                self._forced_failures -= 1
+            slow = self.latency_ms > 0 and self._rng.random() < self.slow_rate
+            if fail:
+                self.injected_errors += 1
+        if slow:
+            time.sleep(self.latency_ms / 1000)
+        if fail:
+            raise ConnectionError(f"falha injetada em {target}")
+
+
+class MemoryResponse:
+    """Resposta no mesmo formato de postgrest APIResponse (`data` e `count`)."""
+
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+# === PARSING DE SELECT / FILTROS ===
+def _split_top_level(text: str) -> List[str]:
+    """Divide por vírgulas fora de parênteses e aspas."""
+    parts, depth, quoted, current = [], 0, False, []
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        if char == ',' and depth == 0 and not quoted:
+            parts.append(''.join(current).strip())
+            current = []
+        else:
+            current.append(char)
+    if ''.join(current).strip():
+        parts.append(''.join(current).strip())
+    return parts
+
+
+def _parse_select(columns: str) -> List[tuple]:
+    """Converte o select do PostgREST em [('column', nome) | ('embed', alias, tabela, fk, filhos)]."""
+    fields = []
+    for item in _split_top_level(columns or '*'):
+        if '(' not in item:
+            fields.append(('column', item))
+            continue
+        head, inner = item.split('(', 1)
+        inner = inner[:inner.rindex(')')]
+        alias, _, target = head.partition(':') if ':' in head else (None, '', head)
+        table, _, hint = target.partition('!')
+        table = table.strip()
+        fk = hint.strip() or DEFAULT_FOREIGN_KEYS.get(table, f'{table}_id')
+        fields.append(('embed', (alias or table).strip(), table, fk, _parse_select(inner)))
+    return fields
+
+
+def _coerce(row_value: Any, value: Any) -> Any:
+    """Converte o valor do filtro (texto na URL do PostgREST) para o tipo da coluna."""
+    if not isinstance(value, str) or row_value is None or isinstance(row_value, str):
+        return value
+    if isinstance(row_value, bool):
+        return value.lower() == 'true'
+    if isinstance(row_value, int):
+        return int(value)
+    if isinstance(row_value, float):
+        return float(value)
+    return value
+
+
+def _like(pattern: str, value: Any, ignore_case: bool) -> bool:
+    if value is None:
+        return False
+    regex = '^' + re.escape(pattern).replace('%', '.*').replace(r'\*', '.*').replace('_', '.') + '$'
+    return re.match(regex, str(value), re.IGNORECASE if ignore_case else 0) is not None
+
+
+def _compare(op: str, row_value: Any, value: Any) -> bool:
+    """Avalia um operador PostgREST com a semântica de NULL do SQL."""
+    if op == 'is':
+        if isinstance(value, str):
+            value = {'null': None, 'true': True, 'false': False}[value.lower()]
+        return row_value is value
+    if op == 'in':
+        return row_value is not None and any(row_value == _coerce(row_value, v) for v in value)
+    if row_value is None:
+        return False
+    if op in ('like', 'ilike'):
+        return _like(value, row_value, op == 'ilike')
+    value = _coerce(row_value, value)
+    if op == 'eq':
+        return row_value == value
+    if op == 'neq':
+        return row_value != value
+    if op == 'gt':
+        return row_value > value
+    if op == 'gte':
+        return row_value >= value
+    if op == 'lt':
+        return row_value < value
+    if op == 'lte':
+        return row_value <= value
+    raise ValueError(f"Operador não suportado no backend em memória: {op}")
+
+
+def _parse_condition(term: str) -> Callable[[dict], bool]:
+    """Converte um termo de or_()/and() (`col.op.valor`, `not.`, `and(...)`, `or(...)`) em predicado."""
+    term = term.strip()
+    for group, combine in (('and(', all), ('or(', any)):
+        if term.startswith(group):
+            inner = [_parse_condition(t) for t in _split_top_level(term[len(group):-1])]
+            return lambda row, inner=inner, combine=combine: combine(p(row) for p in inner)
+    if term.startswith('not.'):
+        predicate = _parse_condition(term[4:])
+        return lambda row: not predicate(row)
+
+    column, op, value = term.split('.', 2)
+    if op == 'not':
+        predicate = _parse_condition(f'{column}.{value}')
+        return lambda row: not predicate(row)
+    if op == 'in':
+        value = [v.strip().strip('"') for v in _split_top_level(value.strip('()'))]
+    else:
+        value = value.strip('"')
+    return lambda row: _compare(op, row.get(column), value)
+
+
+def _sort_key(value: Any, nulls_first: bool) -> tuple:
+    return (0 if nulls_first else 1, 0) if value is None else (1 if nulls_first else 0, value)
+
+
+class _NotFilter:
+    """Implementa `query.not_.<filtro>(...)`."""
+
+    def __init__(self, query: 'MemoryQuery'):
+        self._query = query
+
+    def __getattr__(self, name):
+        method = getattr(self._query, name)
+
+        def negated(*args, **kwargs):
+            self._query._negate_next = True
+            return method(*args, **kwargs)
+        return negated
+
+
+class MemoryQuery:
+    """Query builder com a mesma interface encadeável do postgrest-py."""
+
+    def __init__(self, client: 'MemoryClient', table: str):
+        self._client = client
+        self._table = table
+        self._operation = 'select'
+        self._columns = '*'
+        self._payload = None
+        self._count = None
+        self._returning = 'representation'
+        self._on_conflict = 'id'
+        self._filters: List[Callable[[dict], bool]] = []
+        self._orders: List[tuple] = []
+        self._limit = None
+        self._offset = 0
+        self._negate_next = False
+
+    # === OPERAÇÕES ===
+    def select(self, *columns: str, count: str = None) -> 'MemoryQuery':
+        self._columns = ', '.join(columns) if columns else '*'
+        self._count = count
+        return self
+
+    def insert(self, json, count: str = None, returning: str = 'representation', upsert: bool = False) -> 'MemoryQuery':
+        self._operation = 'upsert' if upsert else 'insert'
+        self._payload = json
+        self._count = count
+        self._returning = str(getattr(returning, 'value', returning))
+        return self
+
+    def upsert(self, json, count: str = None, returning: str = 'representation', on_conflict: str = 'id', **_) -> 'MemoryQuery':
+        self._on_conflict = on_conflict or 'id'
+        return self.insert(json, count=count, returning=returning, upsert=True)
+
+    def update(self, json: dict, count: str = None, returning: str = 'representation') -> 'MemoryQuery':
+        self._operation = 'update'
+        self._payload = json
+        self._count = count
+        self._returning = str(getattr(returning, 'value', returning))
+        return self
+
+    def delete(self, count: str = None, returning: str = 'representation') -> 'MemoryQuery':
+        self._operation = 'delete'
+        self._count = count
+        self._returning = str(getattr(returning, 'value', returning))
+        return self
+
+    # === FILTROS ===
+    def _add_filter(self, predicate: Callable[[dict], bool]) -> 'MemoryQuery':
+        if self._negate_next:
+            self._negate_next = False
+            self._filters.append(lambda row: not predicate(row))
+        else:
+            self._filters.append(predicate)
+        return self
+
+    def _op(self, op: str, column: str, value: Any) -> 'MemoryQuery':
+        return self._add_filter(lambda row: _compare(op, row.get(column), value))
+
+    def eq(self, column: str, value: Any) -> 'MemoryQuery':
+        return self._op('eq', column, value)
+
+    def neq(self, column: str, value: Any) -> 'MemoryQuery':
+        return self._op('neq', column, value)
+
+    def gt(self, column: str, value: Any) -> 'MemoryQuery':
+        return self._op('gt', column, value)
+
+    def gte(self, column: str, value: Any) -> 'MemoryQuery':
+        return self._op('gte', column, value)
+
+    def lt(self, column: str, value: Any) -> 'MemoryQuery':
+        return self._op('lt', column, value)
+
+    def lte(self, column: str, value: Any) -> 'MemoryQuery':
+        return self._op('lte', column, value)
+
+    def like(self, column: str, pattern: str) -> 'MemoryQuery':
+        return self._op('like', column, pattern)
+
+    def ilike(self, column: str, pattern: str) -> 'MemoryQuery':
+        return self._op('ilike', column, pattern)
+
+    def is_(self, column: str, value: Any) -> 'MemoryQuery':
+        return self._op('is', column, value)
+
+    def in_(self, column: str, values) -> 'MemoryQuery':
+        return self._op('in', column, list(values))
+
+    def match(self, query: dict) -> 'MemoryQuery':
+        for column, value in query.items():
+            self.eq(column, value)
+        return self
+
+    def or_(self, filters: str) -> 'MemoryQuery':
+        return self._add_filter(_parse_condition(f'or({filters})'))
+
+    @property
+    def not_(self) -> _NotFilter:
+        return _NotFilter(self)
+
+    # === ORDENAÇÃO / PAGINAÇÃO ===
+    def order(self, column: str, desc: bool = False, nullsfirst: bool = None) -> 'MemoryQuery':
+        # Padrão do Postgres: NULLS LAST em ASC e NULLS FIRST em DESC
+        self._orders.append((column, desc, desc if nullsfirst is None else nullsfirst))
+        return self
+
+    def limit(self, size: int) -> 'MemoryQuery':
+        self._limit = size
+        return self
+
+    def range(self, start: int, end: int) -> 'MemoryQuery':
+        self._offset = start
+        self._limit = end - start + 1
+        return self
+
+    # === EXECUÇÃO ===
+    def execute(self) -> MemoryResponse:
+        if self._client.faults is not None:
+            self._client.faults.before_execute(self._table)
+        with self._client.lock:
+            if self._operation in ('insert', 'upsert'):
+                rows = self._client._insert(self._table, self._payload, self._operation == 'upsert', self._on_conflict)
+                return self._response(rows)
+
+            rows = [row for row in self._client.tables.setdefault(self._table, []) if all(f(row) for f in self._filters)]
+            if self._operation == 'update':
+                for row in rows:
+                    row.update(copy.deepcopy(self._payload))
+                return self._response(rows)
+            if self._operation == 'delete':
+                ids = {id(row) for row in rows}
+                self._client.tables[self._table] = [r for r in self._client.tables[self._table] if id(r) not in ids]
+                return self._response(rows)
+
+            total = len(rows) if self._count else None
+            for column, desc, nulls_first in reversed(self._orders):
+                rows.sort(key=lambda r: _sort_key(r.get(column), nulls_first != desc), reverse=desc)
+            end = None if self._limit is None else self._offset + self._limit
+            rows = rows[self._offset:end]
+            fields = _parse_select(self._columns)
+            return MemoryResponse([self._client._project(self._table, row, fields) for row in rows], total)
+
+    def _response(self, rows: List[dict]) -> MemoryResponse:
+        count = len(rows) if self._count else None
+        if self._returning == 'minimal':
+            return MemoryResponse([], count)
+        return MemoryResponse([copy.deepcopy(row) for row in rows], count)
+
+
+class _RpcCall:
+    def __init__(self, client: 'MemoryClient', name: str, params: dict):
+        self._client = client
+        self._name = name
+        self._params = params or {}
+
+    def execute(self) -> MemoryResponse:
+        if self._client.faults is not None:
+            self._client.faults.before_execute(f"rpc.{self._name}")
+        function = self._client.functions.get(self._name)
+        if function is None:
+            raise ValueError(f"Função RPC não encontrada no backend em memória: {self._name}")
+        with self._client.lock:
+            return MemoryResponse(function(self._client, **self._params))
+
+
+class MemoryClient:
+    """Substituto local do supabase.Client: tabelas em listas de dicts, protegidas por lock."""
+
+    def __init__(self):
+        self.tables: Dict[str, List[dict]] = {}
+        self.lock = threading.RLock()
+        self._next_ids: Dict[str, int] = {}
+        # FaultInjector opcional (None = sem falhas)
+        self.faults: Optional[FaultInjector] = None
+        self.functions: Dict[str, Callable] = {
+            'dashboard_aggregates': _rpc_dashboard_aggregates,
+            'completed_tasks_totals': _rpc_completed_tasks_totals,
+            'toggle_user_active': _rpc_toggle_user_active,
+            'toggle_company_active': _rpc_toggle_company_active,
+        }
+
+    def table(self, name: str) -> MemoryQuery:
+        return MemoryQuery(self, name)
+
+    def from_(self, name: str) -> MemoryQuery:
+        return self.table(name)
+
+    def rpc(self, name: str, params: dict = None) -> _RpcCall:
+        return _RpcCall(self, name, params)
+
+    def _insert(self, table: str, payload, upsert: bool, on_conflict: str) -> List[dict]:
+        rows = self.tables.setdefault(table, [])
+        inserted = []
+        for item in payload if isinstance(payload, list) else [payload]:
+            item = copy.deepcopy(item)
+            if upsert and item.get(on_conflict) is not None:
+                existing = next((r for r in rows if r.get(on_conflict) == item[on_conflict]), None)
+                if existing is not None:
+                    existing.update(item)
+                    inserted.append(existing)
+                    continue
+            row = dict(TABLE_DEFAULTS.get(table, {}))
+            row[TIMESTAMP_COLUMNS.get(table, 'created_at')] = datetime.utcnow().isoformat()
+            row.update(item)
+            if row.get('id') is None:
+                row['id'] = self._next_ids.get(table, 1)
+            self._next_ids[table] = max(self._next_ids.get(table, 1), row['id'] + 1)
+            rows.append(row)
+            inserted.append(row)
+        return inserted
+
+    def _project(self, table: str, row: dict, fields: List[tuple]) -> dict:
+        """Monta a linha no formato do PostgREST, incluindo embeds muitos-para-um."""
+        result = {}
+        for field in fields:
+            if field[0] == 'column':
+                if field[1] == '*':
+                    result.update(copy.deepcopy(row))
+                else:
+                    result[field[1]] = copy.deepcopy(row.get(field[1]))
+                continue
+            _, alias, target, fk, children = field
+            key = row.get(fk)
+            related = None
+            if key is not None:
+                related = next((r for r in self.tables.get(target, []) if r.get('id') == key), None)
+            result[alias] = self._project(target, related, children) if related is not None else None
+        return result
+
+
+# === FUNÇÕES RPC (equivalentes às migrations) ===
+_CTO_PATTERN = re.compile(r'(\d+)\s*(?:cto|cts)')
+_METROS_PATTERN = re.compile(r'(\d+)\s*(?:m|metro)')
+
+
+def _rpc_toggle_user_active(client: MemoryClient, p_user_id: int, p_company_id: int) -> List[dict]:
+    for row in client.tables.get('users', []):
+        if row['id'] == p_user_id and row['company_id'] == p_company_id:
+            row['active'] = not row['active']
+            return [copy.deepcopy(row)]
+    return []
+
+
+def _rpc_toggle_company_active(client: MemoryClient, p_company_id: int) -> List[dict]:
+    for row in client.tables.get('companies', []):
+        if row['id'] == p_company_id:
+            row['active'] = not row['active']
+            return [copy.deepcopy(row)]
+    return []
+
+
+def _rpc_dashboard_aggregates(
+    client: MemoryClient,
+    p_company_id: int,
+    p_created_from: str = None,
+    p_created_to: str = None,
+    p_empresa: str = None,
+) -> List[dict]:
+    """Mesmo resultado de migrations/006_dashboard_aggregates.sql."""
+    empresas_ativas = {c['name'] for c in client.tables.get('companies', []) if c.get('active')}
+    users = {u['id']: u for u in client.tables.get('users', [])}
+    ativas = [
+        t for t in client.tables.get('task_assignments', [])
+        if t['company_id'] == p_company_id
+        and (not t.get('empresa_nome') or t['empresa_nome'] in empresas_ativas)
+    ]
+
+    groups: Dict[tuple, dict] = {}
+
+    def _add(dim: str, key: Optional[str], task: dict, values: dict) -> None:
+        group = groups.setdefault((dim, key), {
+            'dim': dim, 'dim_key': key, 'total_tasks': 0, 'total_concluida': 0,
+            'total_em_andamento': 0, 'total_pendente': 0, 'sum_quantidade_cto': 0,
+            'sum_quantidade_cx_emenda': 0, 'sum_fibra_lancada': 0,
+            'sum_abertura_fechamento_cx_emenda': 0, 'sum_abertura_fechamento_cto': 0,
+            'sum_abertura_fechamento_rozeta': 0,
+        })
+        group['total_tasks'] += 1
+        if task['status'] in ('concluida', 'em_andamento', 'pendente'):
+            group[f"total_{task['status']}"] += 1
+        for column, value in values.items():
+            group[column] += value
+
+    for task in ativas:
+        if p_empresa is not None and task.get('empresa_nome') != p_empresa:
+            continue
+        if p_created_from is not None and task['created_at'] < p_created_from:
+            continue
+        if p_created_to is not None and task['created_at'] >= p_created_to:
+            continue
+
+        materials = (task.get('materials') or '').lower()
+        values = {
+            'sum_quantidade_cto': (task.get('quantidade_cto') or 0) + sum(int(x) for x in _CTO_PATTERN.findall(materials)),
+            'sum_quantidade_cx_emenda': task.get('quantidade_cx_emenda') or 0,
+            'sum_fibra_lancada': float(task.get('fibra_lancada') or 0) + sum(int(x) for x in _METROS_PATTERN.findall(materials)),
+            'sum_abertura_fechamento_cx_emenda': task.get('abertura_fechamento_cx_emenda') or 0,
+            'sum_abertura_fechamento_cto': task.get('abertura_fechamento_cto') or 0,
+            'sum_abertura_fechamento_rozeta': task.get('abertura_fechamento_rozeta') or 0,
+        }
+        assignee = users.get(task.get('assigned_to'))
+        team = assignee['team'] if assignee and assignee.get('role') != 'admin' else None
+
+        _add('total', None, task, values)
+        _add('status', task['status'], task, values)
+        _add('team', team, task, values)
+        _add('empresa', task.get('empresa_nome') or None, task, values)
+        _add('user', str(task['assigned_to']) if task.get('assigned_to') is not None else None, task, values)
+
+    if ('total', None) not in groups:
+        groups[('total', None)] = {
+            'dim': 'total', 'dim_key': None, 'total_tasks': 0, 'total_concluida': 0,
+            'total_em_andamento': 0, 'total_pendente': 0, 'sum_quantidade_cto': None,
+            'sum_quantidade_cx_emenda': None, 'sum_fibra_lancada': None,
+            'sum_abertura_fechamento_cx_emenda': None, 'sum_abertura_fechamento_cto': None,
+            'sum_abertura_fechamento_rozeta': None,
+        }
+
+    rows = list(groups.values())
+    empresa_counts: Dict[str, int] = {}
+    for task in ativas:
+        if task.get('empresa_nome'):
+            empresa_counts[task['empresa_nome']] = empresa_counts.get(task['empresa_nome'], 0) + 1
+    for name, total in empresa_counts.items():
+        rows.append({
+            'dim': 'empresa_option', 'dim_key': name, 'total_tasks': total, 'total_concluida': 0,
+            'total_em_andamento': 0, 'total_pendente': 0, 'sum_quantidade_cto': 0,
+            'sum_quantidade_cx_emenda': 0, 'sum_fibra_lancada': 0,
+            'sum_abertura_fechamento_cx_emenda': 0, 'sum_abertura_fechamento_cto': 0,
+            'sum_abertura_fechamento_rozeta': 0,
+        })
+    return rows
+
+
+def _rpc_completed_tasks_totals(
+    client: MemoryClient,
+    p_company_id: int,
+    p_completed_from: str = None,
+    p_completed_to: str = None,
+    p_assigned_to: list = None,
+) -> List[dict]:
+    """Mesmo resultado de migrations/012_completed_tasks_totals.sql."""
+    row = {
+        'total_tasks': 0, 'sum_quantidade_cto': 0, 'sum_quantidade_cx_emenda': 0, 'sum_fibra_lancada': 0,
+        'sum_abertura_fechamento_cx_emenda': 0, 'sum_abertura_fechamento_cto': 0,
+        'sum_abertura_fechamento_rozeta': 0,
+    }
+    for task in client.tables.get('task_assignments', []):
+        if task['company_id'] != p_company_id or task['status'] != 'concluida':
+            continue
+        completed_at = task.get('completed_at')
+        if p_completed_from is not None and (completed_at is None or completed_at < p_completed_from):
+            continue
+        if p_completed_to is not None and (completed_at is None or completed_at >= p_completed_to):
+            continue
+        if p_assigned_to is not None and task.get('assigned_to') not in p_assigned_to:
+            continue
+        row['total_tasks'] += 1
+        for column in (
+            'quantidade_cto', 'quantidade_cx_emenda', 'fibra_lancada',
+            'abertura_fechamento_cx_emenda', 'abertura_fechamento_cto', 'abertura_fechamento_rozeta',
+        ):
+            row[f'sum_{column}'] += task.get(column) or 0
+    return [row]
+
+
+# === DADOS SINTÉTICOS ===
+def generate_synthetic_data(
+    client: MemoryClient,
+    companies: int = 3,
+    users_per_company: int = 20,
+    tasks_per_company: int = 1000,
+    notifications_per_user: int = 20,
+    days: int = 120,
+    seed: int = 42,
+    password: str = 'senha123',
+) -> dict:
+    """Popula o backend em memória com empresas, usuários, tarefas e notificações.
+
+    Cada empresa recebe um admin (`admin{n}`) e colaboradores (`user{n}_{i}`),
+    todos com a senha `password`. Retorna a quantidade de linhas criadas por tabela.
+    """
+    import bcrypt
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=4)).decode('utf-8')
+    statuses = ('pendente', 'em_andamento', 'concluida')
+    teams = ('fusao', 'infraestrutura')
+
+    company_rows = client.table('companies').insert([
+        {'name': f'Empresa {n}', 'slug': f'empresa-{n}', 'created_at': (now - timedelta(days=days)).isoformat()}
+        for n in range(1, companies + 1)
+    ]).execute().data
+    empresa_nomes = [c['name'] for c in company_rows]
+
+    counts = {'companies': len(company_rows), 'users': 0, 'task_assignments': 0, 'notifications': 0}
+    for n, company in enumerate(company_rows, start=1):
+        user_rows = [{
+            'company_id': company['id'], 'username': f'admin{n}', 'password_hash': password_hash,
+            'full_name': f'Gerente {n}', 'team': 'fusao', 'role': 'admin',
+        }] + [{
+            'company_id': company['id'], 'username': f'user{n}_{i}', 'password_hash': password_hash,
+            'full_name': f'Colaborador {n}.{i}', 'team': rng.choice(teams), 'role': 'user',
+        } for i in range(1, users_per_company)]
+        users = client.table('users').insert(user_rows).execute().data
+        admin, technicians = users[0], users[1:] or users
+        counts['users'] += len(users)
+
+        tasks = []
+        for i in range(tasks_per_company):
+            created_at = now - timedelta(seconds=rng.randint(0, days * 86400))
+            status = rng.choice(statuses)
+            assigned_to = rng.choice(technicians)['id'] if rng.random() > 0.1 else None
+            tasks.append({
+                'company_id': company['id'],
+                'assigned_by': admin['id'],
+                'assigned_to': assigned_to,
+                'title': f'Tarefa {n}.{i}',
+                'description': f'Atendimento sintético {i}',
+                'address': f'Rua {rng.randint(1, 500)}, {rng.randint(1, 2000)}',
+                'status': status,
+                'priority': rng.choice(('baixa', 'media', 'alta')),
+                'empresa_nome': rng.choice(empresa_nomes + [None]),
+                'materials': f"{rng.randint(0, 3)} cto, {rng.randint(0, 400)} m" if rng.random() > 0.5 else None,
+                'quantidade_cto': rng.randint(0, 4),
+                'quantidade_cx_emenda': rng.randint(0, 2),
+                'fibra_lancada': float(rng.randint(0, 800)),
+                'abertura_fechamento_cx_emenda': rng.randint(0, 2),
+                'abertura_fechamento_cto': rng.randint(0, 2),
+                'abertura_fechamento_rozeta': rng.randint(0, 2),
+                'created_at': created_at.isoformat(),
+                'started_at': (created_at + timedelta(hours=1)).isoformat() if status != 'pendente' else None,
+                'completed_at': (created_at + timedelta(hours=rng.randint(2, 72))).isoformat() if status == 'concluida' else None,
+            })
+        client.table('task_assignments').insert(tasks, returning='minimal').execute()
+        counts['task_assignments'] += len(tasks)
+
+        notifications = [{
+            'user_id': user['id'],
+            'company_id': company['id'],
+            'type': rng.choice(('task_assigned', 'task_updated', 'task_completed')),
+            'title': 'Notificação sintética',
+            'message': f'Mensagem {i}',
+            'read': rng.random() > 0.3,
+            'created_at': (now - timedelta(seconds=rng.randint(0, days * 86400))).isoformat(),
+        } for user in users for i in range(notifications_per_user)]
+        client.table('notifications').insert(notifications, returning='minimal').execute()
+        counts['notifications'] += len(notifications)
+
+    return counts
@@ -131,6 +131,11 @@ class TaskPhoto(Base):
     id = Column(Integer, primary_key=True, index=True)
     task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
     file_path = Column(String(500), nullable=False)
+    # Renditions geradas no upload (nulas em fotos antigas: usar o original)
+    thumb_path = Column(String(500), nullable=True)
+    medium_path = Column(String(500), nullable=True)
+    # Arquivo enviado, antes da normalização (só com PHOTO_KEEP_SOURCE)
+    source_path = Column(String(500), nullable=True)
     original_name = Column(String(255), nullable=False)
     file_size = Column(BigInteger, nullable=False)  # tamanho em bytes
     uploaded_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,93 @@
+"""
+Perfis de projeção (colunas buscadas) para as consultas de task_assignments.
+Cada view declara o perfil de que precisa em vez de buscar `*` em toda listagem.
+"""
+from typing import List
+
+# Joins com users usados nas listagens
+ASSIGNED_TO_JOIN = 'assigned_to_user:users!assigned_to(id, full_name, team)'
+ASSIGNED_BY_JOIN = 'assigned_by_user:users!assigned_by(full_name)'
+
+# Campos técnicos ISP (migration 005)
+ISP_FIELDS = (
+    'abertura_fechamento_cx_emenda',
+    'abertura_fechamento_cto',
+    'abertura_fechamento_rozeta',
+    'quantidade_cto',
+    'quantidade_cx_emenda',
+    'fibra_lancada',
+)
+
+_LIST_FIELDS = (
+    'id', 'company_id', 'title', 'status', 'priority', 'assigned_to', 'assigned_by',
+    'empresa_nome', 'due_date', 'created_at',
+    ASSIGNED_TO_JOIN, ASSIGNED_BY_JOIN,
+)
+
+TASK_PROJECTIONS = {
+    # Tabelas e cards resumidos (dashboard, tarefas recentes)
+    'list': _LIST_FIELDS,
+    # Expanders de gerenciamento: lista + descrição e localização
+    'card': _LIST_FIELDS + ('description', 'address', 'latitude', 'longitude', 'completed_at'),
+    # Página de detalhes e API mobile: todas as colunas
+    'detail': ('*', ASSIGNED_TO_JOIN, ASSIGNED_BY_JOIN),
+    # Exportação Excel/PDF e tela de concluídas
+    'export': (
+        'id', 'title', 'status', 'assigned_to', 'empresa_nome', 'description', 'address',
+        'observations', 'materials', 'created_at', 'completed_at',
+    ) + ISP_FIELDS + (ASSIGNED_TO_JOIN,),
+    # Métricas/agregações feitas no cliente
+    'metrics': (
+        'id', 'title', 'status', 'assigned_to', 'empresa_nome', 'materials',
+        'created_at', 'completed_at',
+    ) + ISP_FIELDS + (ASSIGNED_TO_JOIN,),
+}
+
+
+def projection_select(profile: str) -> str:
+    """Retorna a string de select do PostgREST para o perfil."""
+    try:
+        return ', '.join(TASK_PROJECTIONS[profile])
+    except KeyError:
+        raise ValueError(f"Perfil de projeção desconhecido: {profile}")
+
+
+def projection_fields(profile: str) -> set:
+    """Retorna as chaves de primeiro nível presentes nas linhas do perfil ('*' = todas)."""
+    fields = set()
+    for field in TASK_PROJECTIONS[profile]:
+        fields.add(field.split(':', 1)[0])
+    return fields
+
+
+class ProjectedRow(dict):
+    """dict que falha ao ler um campo que o perfil de projeção não busca.
+
+    Usado apenas no modo estrito (STRICT_TASK_PROJECTIONS) para detectar views
+    que leem campos fora do perfil declarado — `.get()` não devolve None em silêncio.
+    """
+
+    def __init__(self, data: dict, profile: str, fields: set):
+        super().__init__(data)
+        self._profile = profile
+        self._fields = fields
+
+    def _check(self, key):
+        if key not in self._fields:
+            raise KeyError(f"Campo '{key}' não é buscado pela projeção '{self._profile}'.")
+
+    def __getitem__(self, key):
+        self._check(key)
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self._check(key)
+        return super().get(key, default)
+
+
+def apply_projection(rows: List[dict], profile: str, strict: bool) -> List[dict]:
+    """No modo estrito, envolve as linhas em ProjectedRow; caso contrário retorna como estão."""
+    fields = projection_fields(profile)
+    if not strict or '*' in fields:
+        return rows
+    return [ProjectedRow(row, profile, fields) for row in rows]
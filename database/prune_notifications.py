@@ -0,0 +1,39 @@
+"""
+Job de retenção das notificações: exclui as já lidas mais antigas que
+NOTIFICATIONS_RETENTION_DAYS (não lidas nunca são removidas).
+
+Agendar uma vez por dia (cron do servidor ou cron job do Railway):
+
+    30 3 * * *  python -m database.prune_notifications
+"""
+import argparse
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import NOTIFICATIONS_RETENTION_DAYS
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Exclui notificações lidas antigas.")
+    parser.add_argument("--days", type=int, default=NOTIFICATIONS_RETENTION_DAYS,
+                        help=f"Retenção em dias (padrão: NOTIFICATIONS_RETENTION_DAYS={NOTIFICATIONS_RETENTION_DAYS})")
+    args = parser.parse_args()
+    if args.days < 1:
+        parser.error("--days precisa ser ao menos 1")
+
+    from database.supabase_only_connection import db
+    from utils.instrumentation import registry
+
+    deleted = db.prune_notifications(args.days)
+    # prune_notifications devolve 0 também em erro: o código de saída avisa o agendador
+    histogram = registry.histograms().get("db.prune_notifications")
+    if histogram is not None and histogram.errors:
+        return 1
+    print(f"Notificações lidas com mais de {args.days} dias excluídas: {deleted}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
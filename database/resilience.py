@@ -0,0 +1,355 @@
+"""
+Resiliência das leituras ao Supabase: retry, hedge e circuit breaker.
+
+Leituras idempotentes passam por `resilience.execute(endpoint, query, key)`:
+
+- Falhas transitórias (rede, timeout, 5xx/429, conexão do Postgres) são
+  repetidas até RETRY_ATTEMPTS vezes, com backoff exponencial e jitter
+  ("full jitter"). Erros permanentes (4xx, SQL inválido) sobem na hora.
+- Com `hedge=True`, se a resposta não chegar em HEDGE_AFTER_MS, uma segunda
+  requisição idêntica é disparada e vale a primeira que responder.
+- Cada endpoint (tabela ou RPC) tem um circuit breaker: após
+  BREAKER_FAILURE_THRESHOLD falhas transitórias seguidas ele abre e as
+  chamadas falham na hora, sem esperar timeout; após BREAKER_RESET_SECONDS
+  uma chamada de teste decide se fecha de novo.
+- Com o breaker aberto ou as tentativas esgotadas, a última resposta boa da
+  mesma `key` é servida, se tiver até FALLBACK_MAX_AGE_SECONDS; senão o erro
+  sobe (o método trata como antes).
+
+    result = resilience.execute('users', query, key=('get_all_users', company_id))
+
+Eventos por endpoint ficam em `resilience.stats()` (painel de diagnóstico e /metrics).
+"""
+import contextvars
+import inspect
+import random
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Hashable, Optional
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    RETRY_ATTEMPTS, RETRY_BASE_DELAY_MS, RETRY_MAX_DELAY_MS, HEDGE_AFTER_MS,
+    BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS, CACHE_MAX_ENTRIES, FALLBACK_MAX_AGE_SECONDS,
+)
+
+# Status HTTP que indicam falha passageira do gateway/servidor
+TRANSIENT_HTTP_STATUS = {408, 425, 429, 500, 502, 503, 504, 520, 521, 522, 523, 524}
+
+# Códigos do Postgres/PostgREST passageiros: conexão (08), recursos (53),
+# serialização/deadlock, servidor reiniciando e falhas de conexão do PostgREST
+TRANSIENT_ERROR_CODES = ('08', '53', '40001', '40P01', '57P01', '57P02', '57P03',
+                         'PGRST000', 'PGRST001', 'PGRST002', 'PGRST003')
+
+# Estados do circuit breaker (valor exportado como gauge no /metrics)
+CLOSED, HALF_OPEN, OPEN = 'closed', 'half_open', 'open'
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """Chamada recusada porque o circuit breaker do endpoint está aberto."""
+
+    def __init__(self, endpoint: str):
+        super().__init__(f"circuito aberto para '{endpoint}' (backend indisponível)")
+        self.endpoint = endpoint
+
+
+def is_transient(error: BaseException) -> bool:
+    """True se vale repetir a chamada (falha de rede/servidor, não erro da consulta)."""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    try:
+        import httpx
+        if isinstance(error, httpx.TransportError):
+            return True
+    except ImportError:
+        pass
+    # postgrest.APIError: `code` é o status HTTP (resposta sem JSON) ou o código do erro
+    code = getattr(error, 'code', None)
+    if code is None:
+        return False
+    code = str(code)
+    if code.isdigit() and len(code) == 3:
+        return int(code) in TRANSIENT_HTTP_STATUS
+    return code.startswith(TRANSIENT_ERROR_CODES)
+
+
+class CircuitBreaker:
+    """Breaker de um endpoint: fechado → aberto após falhas seguidas → meio-aberto (uma chamada de teste)."""
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_seconds: float = BREAKER_RESET_SECONDS, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """True se a chamada pode seguir (no meio-aberto, só uma de cada vez)."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self.clock() - self.opened_at >= self.reset_seconds:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self) -> bool:
+        """Conta uma falha transitória. Retorna True se o breaker abriu agora."""
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                opened = self.state != OPEN
+                self.state = OPEN
+                self.opened_at = self.clock()
+                return opened
+            return False
+
+
+class Resilience:
+    """Retry, hedge e circuit breakers por endpoint, com a última resposta boa por chave."""
+
+    def __init__(self, attempts: int = RETRY_ATTEMPTS, base_delay_ms: float = RETRY_BASE_DELAY_MS,
+                 max_delay_ms: float = RETRY_MAX_DELAY_MS, hedge_after_ms: float = HEDGE_AFTER_MS,
+                 failure_threshold: int = BREAKER_FAILURE_THRESHOLD, reset_seconds: float = BREAKER_RESET_SECONDS,
+                 max_entries: int = CACHE_MAX_ENTRIES, fallback_max_age: float = FALLBACK_MAX_AGE_SECONDS,
+                 rng: random.Random = None, sleep: Callable[[float], None] = time.sleep,
+                 clock: Callable[[], float] = time.monotonic):
+        # rng/sleep/clock injetáveis: testes determinísticos sem esperar o backoff de verdade
+        self.attempts = max(1, attempts)
+        self.base_delay_ms = base_delay_ms
+        self.max_delay_ms = max_delay_ms
+        self.hedge_after_ms = hedge_after_ms
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.max_entries = max_entries
+        self.fallback_max_age = fallback_max_age
+        self.rng = rng or random.Random()
+        self.sleep = sleep
+        self.clock = clock
+        self._breakers: dict = {}
+        # chave → (momento da resposta, resposta)
+        self._last_good: "OrderedDict[tuple, tuple[float, object]]" = OrderedDict()
+        self._events: dict = {}
+        self._lock = threading.Lock()
+        self._hedge_pool: Optional[ThreadPoolExecutor] = None
+
+    # === ESTADO ===
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(endpoint)
+            if breaker is None:
+                breaker = self._breakers[endpoint] = CircuitBreaker(
+                    self.failure_threshold, self.reset_seconds, self.clock
+                )
+            return breaker
+
+    def _count(self, endpoint: str, event: str) -> None:
+        with self._lock:
+            self._events.setdefault(endpoint, Counter())[event] += 1
+
+    def _remember(self, key: Hashable, value) -> None:
+        with self._lock:
+            self._last_good[key] = (self.clock(), value)
+            self._last_good.move_to_end(key)
+            while len(self._last_good) > self.max_entries:
+                self._last_good.popitem(last=False)
+
+    def _fallback(self, endpoint: str, key: Optional[Hashable], error: BaseException):
+        """Última resposta boa de `key` (se não passou de `fallback_max_age`) ou, sem ela, o próprio erro."""
+        if key is not None:
+            with self._lock:
+                entry = self._last_good.get(key)
+                if entry is not None and self.clock() - entry[0] > self.fallback_max_age:
+                    # Velha demais para servir: descartada
+                    del self._last_good[key]
+                    entry = None
+            if entry is not None:
+                self._count(endpoint, 'fallbacks')
+                print(f"Servindo último valor de {endpoint} {key}: {error}")
+                return entry[1]
+        raise error
+
+    def backoff(self, attempt: int) -> float:
+        """Espera (s) antes da tentativa `attempt` (1, 2, ...): uniforme em [0, min(máx, base·2^(n-1))]."""
+        cap = min(self.max_delay_ms, self.base_delay_ms * 2 ** (attempt - 1))
+        return self.rng.uniform(0, cap) / 1000
+
+    # === EXECUÇÃO SÍNCRONA ===
+    def execute(self, endpoint: str, query, key: Optional[Hashable] = None, hedge: bool = False):
+        """Executa `query.execute()` com retry/hedge/breaker. `key` identifica a leitura para o fallback."""
+        breaker = self.breaker(endpoint)
+        self._count(endpoint, 'calls')
+        if not breaker.allow():
+            self._count(endpoint, 'short_circuits')
+            return self._fallback(endpoint, key, CircuitOpenError(endpoint))
+
+        error = None
+        for attempt in range(self.attempts):
+            if attempt:
+                self._count(endpoint, 'retries')
+                self.sleep(self.backoff(attempt))
+            try:
+                if hedge and self.hedge_after_ms > 0:
+                    result = self._hedged(endpoint, query)
+                else:
+                    result = query.execute()
+            except Exception as e:
+                if not is_transient(e):
+                    # O backend respondeu: erro da consulta não conta contra o breaker
+                    breaker.record_success()
+                    raise
+                error = e
+                continue
+            breaker.record_success()
+            if key is not None:
+                self._remember(key, result)
+            return result
+
+        self._count(endpoint, 'failures')
+        if breaker.record_failure():
+            self._count(endpoint, 'opens')
+        return self._fallback(endpoint, key, error)
+
+    def _hedged(self, endpoint: str, query):
+        """Primeira resposta bem-sucedida entre a requisição original e uma cópia disparada após o atraso."""
+        pool = self._get_hedge_pool()
+        # Cada thread roda em uma cópia do contexto (instrumentação da chamada em andamento)
+        first = pool.submit(contextvars.copy_context().run, query.execute)
+        done, _ = wait([first], timeout=self.hedge_after_ms / 1000)
+        if done:
+            return first.result()
+
+        self._count(endpoint, 'hedges')
+        second = pool.submit(contextvars.copy_context().run, query.execute)
+        pending, error = {first, second}, None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        self._count(endpoint, 'hedge_wins')
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _get_hedge_pool(self) -> ThreadPoolExecutor:
+        if self._hedge_pool is None:
+            with self._lock:
+                if self._hedge_pool is None:
+                    self._hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hedge")
+        return self._hedge_pool
+
+    # === EXECUÇÃO ASSÍNCRONA (database/async_connection.py) ===
+    async def aexecute(self, endpoint: str, query, key: Optional[Hashable] = None, hedge: bool = False):
+        """Versão async de `execute` (aceita builders síncronos, como o MemoryClient, ou async)."""
+        import asyncio
+
+        async def _run():
+            result = query.execute()
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+
+        breaker = self.breaker(endpoint)
+        self._count(endpoint, 'calls')
+        if not breaker.allow():
+            self._count(endpoint, 'short_circuits')
+            return self._fallback(endpoint, key, CircuitOpenError(endpoint))
+
+        error = None
+        for attempt in range(self.attempts):
+            if attempt:
+                self._count(endpoint, 'retries')
+                await asyncio.sleep(self.backoff(attempt))
+            try:
+                if hedge and self.hedge_after_ms > 0:
+                    result = await self._ahedged(endpoint, _run)
+                else:
+                    result = await _run()
+            except Exception as e:
+                if not is_transient(e):
+                    breaker.record_success()
+                    raise
+                error = e
+                continue
+            breaker.record_success()
+            if key is not None:
+                self._remember(key, result)
+            return result
+
+        self._count(endpoint, 'failures')
+        if breaker.record_failure():
+            self._count(endpoint, 'opens')
+        return self._fallback(endpoint, key, error)
+
+    async def _ahedged(self, endpoint: str, run):
+        import asyncio
+        first = asyncio.ensure_future(run())
+        done, _ = await asyncio.wait({first}, timeout=self.hedge_after_ms / 1000)
+        if done:
+            return first.result()
+
+        self._count(endpoint, 'hedges')
+        second = asyncio.ensure_future(run())
+        pending, error = {first, second}, None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    if task is second:
+                        self._count(endpoint, 'hedge_wins')
+                    return task.result()
+                error = task.exception()
+        raise error
+
+    # === DIAGNÓSTICO ===
+    def stats(self) -> list:
+        """[{endpoint, state, calls, retries, hedges, hedge_wins, failures, opens, short_circuits, fallbacks}]"""
+        with self._lock:
+            endpoints = sorted(set(self._events) | set(self._breakers))
+            events = {endpoint: dict(self._events.get(endpoint, {})) for endpoint in endpoints}
+            breakers = dict(self._breakers)
+        rows = []
+        for endpoint in endpoints:
+            breaker = breakers.get(endpoint)
+            row = {"endpoint": endpoint, "state": breaker.state if breaker else CLOSED}
+            for event in ("calls", "retries", "hedges", "hedge_wins", "failures", "opens",
+                          "short_circuits", "fallbacks"):
+                row[event] = events[endpoint].get(event, 0)
+            rows.append(row)
+        return rows
+
+    def reset_stats(self) -> None:
+        """Zera só os contadores de eventos (breakers e últimas respostas continuam)."""
+        with self._lock:
+            self._events.clear()
+
+    def reset(self) -> None:
+        """Fecha todos os breakers e zera contadores e últimas respostas."""
+        with self._lock:
+            self._breakers.clear()
+            self._events.clear()
+            self._last_good.clear()
+
+
+resilience = Resilience()
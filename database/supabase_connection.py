@@ -1,26 +1,38 @@
 """
 Conexão com Supabase para o sistema Streamlit
 """
-from supabase import create_client, Client
+import threading
 import os
 from typing import Optional, Dict, List, Any
 from datetime import datetime
 import json
 from config import SUPABASE_URL, SUPABASE_KEY, SUPABASE_SERVICE_KEY, SUPABASE_BUCKET
 
-# Cliente Supabase com service key para bypass RLS
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY or SUPABASE_KEY)
+# Cliente Supabase com service key para bypass RLS (criado no primeiro uso)
+_supabase = None
+_supabase_lock = threading.Lock()
 
-def get_supabase_client() -> Client:
+def get_supabase_client():
     """Retorna cliente Supabase configurado"""
-    return supabase
+    global _supabase
+    if _supabase is None:
+        with _supabase_lock:
+            if _supabase is None:
+                from supabase import create_client
+                from utils.http_transport import supabase_options
+                _supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY or SUPABASE_KEY, supabase_options())
+    return _supabase
 
 class SupabaseManager:
     """Gerenciador de operações Supabase"""
     
     def __init__(self):
-        self.client = get_supabase_client()
         self.bucket = SUPABASE_BUCKET
+
+    @property
+    def client(self):
+        """Cliente Supabase, criado no primeiro acesso."""
+        return get_supabase_client()
     
     # === USUÁRIOS ===
     def sync_user_to_supabase(self, user_data: Dict) -> bool:
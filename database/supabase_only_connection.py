@@ -2,24 +2,289 @@
 Conexão EXCLUSIVA com Supabase - Substitui PostgreSQL local
 Sistema de Gerenciamento de Tarefas ISP v2.0
 """
-from supabase import create_client, Client
 from typing import Optional, Dict, List, Any
-from datetime import datetime
+from datetime import datetime, timedelta, date
 import bcrypt
+import base64
+import json
+import threading
 import sys
 import os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import SUPABASE_URL, SUPABASE_KEY, SUPABASE_SERVICE_KEY
+from config import (
+    SUPABASE_URL, SUPABASE_KEY, SUPABASE_SERVICE_KEY, DATABASE_BACKEND, MEMORY_BACKEND_SYNTHETIC,
+    MEMORY_BACKEND_FAULTS,
+    CACHE_TTL_SECONDS, CACHE_MAX_ENTRIES, CACHE_STALE_SECONDS, STRICT_TASK_PROJECTIONS,
+    NOTIFICATIONS_PAGE_SIZE, NOTIFICATIONS_RETENTION_DAYS, UNREAD_COUNT_TTL_SECONDS,
+)
+from database.cache import TenantCache
+from database.projections import projection_select, apply_projection
+from utils.instrumentation import instrumented, record_error
+from database.identity_map import identity_mapped, reads, writes
+from database.resilience import resilience
 
-# Cliente Supabase com service key para bypass RLS
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY or SUPABASE_KEY)
 
+def create_backend_client():
+    """Cria o cliente de dados conforme DATABASE_BACKEND.
+
+    "supabase": cliente PostgREST com service key para bypass RLS.
+    "memory": MemoryClient local (testes e benchmarks sem Supabase).
+    """
+    if DATABASE_BACKEND == 'memory':
+        from database.memory_backend import MemoryClient, FaultInjector, generate_synthetic_data
+        client = MemoryClient()
+        if MEMORY_BACKEND_SYNTHETIC:
+            generate_synthetic_data(client)
+        if MEMORY_BACKEND_FAULTS:
+            # Dados sintéticos são gerados antes: as falhas valem só para o app
+            client.faults = FaultInjector.from_spec(MEMORY_BACKEND_FAULTS)
+        return client
+    if DATABASE_BACKEND != 'supabase':
+        raise ValueError(f"DATABASE_BACKEND inválido: {DATABASE_BACKEND}")
+
+    from supabase import create_client
+    from utils.http_transport import supabase_options
+    return create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY or SUPABASE_KEY, supabase_options())
+
+
+# Cliente criado no primeiro uso (thread-safe): importar o módulo não abre conexões
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Retorna o cliente de dados compartilhado, criando-o na primeira chamada."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = create_backend_client()
+    return _client
+
+# Métricas retornadas por get_dashboard_aggregates para cada agrupamento
+DASHBOARD_METRICS = (
+    'total', 'concluida', 'em_andamento', 'pendente',
+    'quantidade_cto', 'quantidade_cx_emenda', 'fibra_lancada',
+    'abertura_fechamento_cx_emenda', 'abertura_fechamento_cto', 'abertura_fechamento_rozeta',
+)
+
+
+def period_bounds(period, today: date = None) -> tuple[Optional[datetime], Optional[datetime]]:
+    """Converte um período em limites [início, fim) de created_at.
+
+    Aceita 'hoje', 'ontem', 'semana', 'semana_passada', 'mes', 'mes_passado',
+    None/'todos' (sem limite) ou uma tupla (data_inicio, data_fim) inclusiva.
+    """
+    if not period or period == 'todos':
+        return None, None
+
+    if isinstance(period, tuple):
+        start, end = period
+        return (
+            datetime.combine(start, datetime.min.time()) if start else None,
+            datetime.combine(end + timedelta(days=1), datetime.min.time()) if end else None,
+        )
+
+    today = today or datetime.now().date()
+    if period == 'hoje':
+        start, end = today, today
+    elif period == 'ontem':
+        start = end = today - timedelta(days=1)
+    elif period == 'semana':
+        start, end = today - timedelta(days=today.weekday()), None
+    elif period == 'semana_passada':
+        start = today - timedelta(days=today.weekday() + 7)
+        end = start + timedelta(days=6)
+    elif period == 'mes':
+        start, end = today.replace(day=1), None
+    elif period == 'mes_passado':
+        end = today.replace(day=1) - timedelta(days=1)
+        start = end.replace(day=1)
+    else:
+        raise ValueError(f"Período inválido: {period}")
+    return period_bounds((start, end))
+
+
+def encode_cursor(row: dict) -> str:
+    """Gera o token opaco de paginação keyset a partir da última linha da página."""
+    payload = json.dumps([row['created_at'], row['id']]).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> tuple[str, int]:
+    """Decodifica um token gerado por encode_cursor em (created_at, id)."""
+    try:
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return str(created_at), int(row_id)
+    except Exception:
+        raise ValueError("Cursor de paginação inválido.")
+
+
+def _empty_metrics() -> dict:
+    return {m: 0 for m in DASHBOARD_METRICS}
+
+
+def dashboard_aggregates_params(company_id: int, period=None, empresa: str = None) -> dict:
+    """Parâmetros da RPC dashboard_aggregates (período convertido por period_bounds)."""
+    created_from, created_to = period_bounds(period)
+    return {
+        'p_company_id': company_id,
+        'p_created_from': created_from.isoformat() if created_from else None,
+        'p_created_to': created_to.isoformat() if created_to else None,
+        'p_empresa': empresa,
+    }
+
+
+def parse_dashboard_aggregates(rows: list) -> dict:
+    """Converte as linhas (dim, dim_key, métricas) da RPC dashboard_aggregates no formato do dashboard."""
+    aggregates = {
+        'totals': _empty_metrics(),
+        'by_status': {},
+        'by_team': {},
+        'by_empresa': {},
+        'by_user': {},
+        'empresas': [],
+    }
+    for row in rows:
+        dim, key = row['dim'], row['dim_key']
+        if dim == 'empresa_option':
+            aggregates['empresas'].append(key)
+            continue
+
+        metrics = {
+            'total': row['total_tasks'] or 0,
+            'concluida': row['total_concluida'] or 0,
+            'em_andamento': row['total_em_andamento'] or 0,
+            'pendente': row['total_pendente'] or 0,
+            'quantidade_cto': row['sum_quantidade_cto'] or 0,
+            'quantidade_cx_emenda': row['sum_quantidade_cx_emenda'] or 0,
+            'fibra_lancada': float(row['sum_fibra_lancada'] or 0),
+            'abertura_fechamento_cx_emenda': row['sum_abertura_fechamento_cx_emenda'] or 0,
+            'abertura_fechamento_cto': row['sum_abertura_fechamento_cto'] or 0,
+            'abertura_fechamento_rozeta': row['sum_abertura_fechamento_rozeta'] or 0,
+        }
+        if dim == 'total':
+            aggregates['totals'] = metrics
+        elif dim == 'status':
+            aggregates['by_status'][key] = metrics['total']
+        elif dim == 'team' and key is not None:
+            aggregates['by_team'][key] = metrics
+        elif dim == 'empresa':
+            aggregates['by_empresa'][key or 'Não definida'] = metrics
+        elif dim == 'user' and key is not None:
+            aggregates['by_user'][int(key)] = metrics
+
+    aggregates['empresas'].sort()
+    return aggregates
+
+
+def parse_completed_totals(rows: list) -> dict:
+    """Converte a linha da RPC completed_tasks_totals em {'total', 'quantidade_cto', ...}."""
+    row = rows[0] if rows else {}
+    totals = {'total': row.get('total_tasks') or 0}
+    for metric in DASHBOARD_METRICS[4:]:
+        totals[metric] = row.get(f'sum_{metric}') or 0
+    totals['fibra_lancada'] = float(totals['fibra_lancada'])
+    return totals
+
+
+def task_list_query(
+    client,
+    select: str,
+    company_id: int,
+    user_id: int = None,
+    status: str = None,
+    assigned_only: bool = False,
+    unassigned_only: bool = False,
+    assigned_to_ids: list = None,
+    created_from: datetime = None,
+    created_to: datetime = None,
+    completed_from: datetime = None,
+    completed_to: datetime = None,
+    empresa_nome: str = None,
+    assigned_by: int = None,
+    count: str = None,
+):
+    """Monta a query de listagem de tarefas com os filtros aplicados no servidor.
+
+    Aceita o cliente síncrono ou o assíncrono (database/async_connection.py):
+    os builders do PostgREST têm a mesma interface de filtros.
+    """
+    query = client.table('task_assignments').select(select, count=count).eq('company_id', company_id)
+
+    if user_id:
+        query = query.eq('assigned_to', user_id)
+    if status:
+        query = query.eq('status', status)
+    if assigned_only:
+        query = query.not_.is_('assigned_to', 'null')
+    if unassigned_only:
+        query = query.is_('assigned_to', 'null')
+    if assigned_to_ids is not None:
+        query = query.in_('assigned_to', assigned_to_ids)
+    if created_from:
+        query = query.gte('created_at', created_from.isoformat())
+    if created_to:
+        query = query.lt('created_at', created_to.isoformat())
+    if completed_from:
+        query = query.gte('completed_at', completed_from.isoformat())
+    if completed_to:
+        query = query.lt('completed_at', completed_to.isoformat())
+    if empresa_nome:
+        query = query.eq('empresa_nome', empresa_nome)
+    if assigned_by:
+        query = query.eq('assigned_by', assigned_by)
+    return query
+
+
+@identity_mapped("db")
+@instrumented("db")
 class SupabaseDatabase:
     """Classe principal para todas as operações de banco via Supabase"""
     
-    def __init__(self):
-        self.client = supabase
+    def __init__(self, client=None):
+        # `client` permite injetar outro backend (ex.: MemoryClient em testes/benchmarks);
+        # sem ele, o cliente compartilhado é criado só no primeiro acesso a `self.client`
+        self._client = client
+        # Cache de usuários/empresas por company_id (empresas ficam no tenant None)
+        self.cache = TenantCache(
+            ttl=CACHE_TTL_SECONDS,
+            max_entries=CACHE_MAX_ENTRIES,
+            stale_seconds=CACHE_STALE_SECONDS,
+        )
+        # Contador de notificações não lidas por usuário, ajustado pelas escritas
+        self.unread_counts = TenantCache(ttl=UNREAD_COUNT_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES)
+
+    @property
+    def client(self):
+        """Cliente de dados (PostgREST ou MemoryClient), resolvido sob demanda."""
+        if self._client is None:
+            self._client = get_client()
+        return self._client
+
+    # === CACHE ===
+    @writes('users')
+    def invalidate_user_cache(self, company_id: int = None, user_id: int = None) -> None:
+        """Invalida a lista de usuários da empresa e, se informado, o cache do usuário.
+
+        Sem `company_id` (empresa do usuário desconhecida), o usuário e as listas
+        de usuários são descartados em todos os tenants.
+        """
+        if company_id is None:
+            if user_id is not None:
+                self.cache.invalidate_everywhere(('user', user_id))
+                self.cache.invalidate_everywhere('users')
+            return
+        self.cache.invalidate(company_id, 'users')
+        if user_id is not None:
+            self.cache.invalidate(company_id, ('user', user_id))
+            self.cache.invalidate(None, ('user', user_id))
+
+    @writes('companies')
+    def invalidate_company_cache(self) -> None:
+        """Invalida a lista de empresas."""
+        self.cache.invalidate(None, 'companies')
     
     # === AUTENTICAÇÃO ===
     def authenticate_user(self, username: str, password: str) -> Optional[dict]:
@@ -46,7 +311,7 @@ class SupabaseDatabase:
                 return None
             
             # Verifica senha
-            if not bcrypt.checkpw(password.encode('utf-8'), user['password_hash'].encode('utf-8')):
+            if not self.check_password(password, user['password_hash']):
                 return None
             
             return {
@@ -60,14 +325,20 @@ class SupabaseDatabase:
                 'is_super_admin': user.get('is_super_admin', False)
             }
         except Exception as e:
+            record_error(e)
             print(f"Erro na autenticação: {e}")
             return None
     
     def hash_password(self, password: str) -> str:
         """Gera hash bcrypt da senha"""
         return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+    def check_password(self, password: str, password_hash: str) -> bool:
+        """Confere a senha com o hash bcrypt (medido à parte da consulta ao Supabase)"""
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
     
     # === USUÁRIOS ===
+    @writes('users')
     def create_user(self, username: str, password: str, full_name: str, team: str, company_id: int, role: str = 'user') -> tuple[bool, str]:
         """Cria novo usuário"""
         try:
@@ -92,31 +363,50 @@ class SupabaseDatabase:
             }
             
             self.client.table('users').insert(user_data).execute()
+            self.invalidate_user_cache(company_id)
             return True, "Usuário criado com sucesso!"
         except Exception as e:
+            record_error(e)
             return False, f"Erro ao criar usuário: {str(e)}"
     
+    @reads('users', registers='users')
     def get_all_users(self, company_id: int) -> List[dict]:
-        """Retorna usuários de uma empresa"""
-        try:
-            result = self.client.table('users').select('*').eq('company_id', company_id).order('full_name').execute()
+        """Retorna usuários de uma empresa (cacheado por empresa)"""
+        def _load():
+            query = self.client.table('users').select('*').eq('company_id', company_id).order('full_name')
+            result = resilience.execute('users', query, key=('get_all_users', company_id))
             return result.data or []
+
+        try:
+            return self.cache.get_or_load(company_id, 'users', _load)
         except Exception as e:
+            record_error(e)
             print(f"Erro ao buscar usuários: {e}")
             return []
     
+    @reads('users', registers='users', lookup='users')
     def get_user_by_id(self, user_id: int, company_id: int = None) -> Optional[dict]:
-        """Retorna usuário por ID"""
-        try:
+        """Retorna usuário por ID (cacheado)"""
+        def _load():
             query = self.client.table('users').select('*').eq('id', user_id)
             if company_id:
                 query = query.eq('company_id', company_id)
-            result = query.execute()
-            return result.data[0] if result.data else None
+            result = resilience.execute('users', query, key=('get_user_by_id', user_id, company_id))
+            if not result.data:
+                # Não cacheia ausência: o usuário pode ser criado logo em seguida
+                raise LookupError(user_id)
+            return result.data[0]
+
+        try:
+            return self.cache.get_or_load(company_id or None, ('user', user_id), _load)
+        except LookupError:
+            return None
         except Exception as e:
+            record_error(e)
             print(f"Erro ao buscar usuário: {e}")
             return None
     
+    @writes('users')
     def update_password(self, user_id: int, new_password: str, company_id: int) -> tuple[bool, str]:
         """Atualiza senha do usuário"""
         try:
@@ -128,29 +418,33 @@ class SupabaseDatabase:
             }).eq('id', user_id).eq('company_id', company_id).execute()
             
             if result.data:
+                self.invalidate_user_cache(company_id, user_id)
                 return True, "Senha atualizada com sucesso!"
             return False, "Usuário não encontrado."
         except Exception as e:
+            record_error(e)
             return False, f"Erro ao atualizar senha: {str(e)}"
     
+    @writes('users')
     def toggle_user_status(self, user_id: int, company_id: int) -> tuple[bool, str]:
-        """Ativa/desativa usuário"""
+        """Ativa/desativa usuário (UPDATE atômico via RPC, migration 008)"""
         try:
-            # Busca usuário atual
-            user = self.get_user_by_id(user_id, company_id)
-            if not user:
+            result = self.client.rpc('toggle_user_active', {
+                'p_user_id': user_id,
+                'p_company_id': company_id,
+            }).execute()
+            if not result.data:
                 return False, "Usuário não encontrado."
-            
-            new_status = not user['active']
-            self.client.table('users').update({
-                'active': new_status
-            }).eq('id', user_id).eq('company_id', company_id).execute()
-            
+            self.invalidate_user_cache(company_id, user_id)
+
+            new_status = result.data[0]['active']
             status = "ativado" if new_status else "desativado"
             return True, f"Usuário {status} com sucesso!"
         except Exception as e:
+            record_error(e)
             return False, f"Erro ao alterar status: {str(e)}"
     
+    @writes('users', 'task_assignments')
     def delete_user(self, user_id: int, company_id: int) -> tuple[bool, str]:
         """Exclui usuário"""
         try:
@@ -161,21 +455,30 @@ class SupabaseDatabase:
             result = self.client.table('users').delete().eq('id', user_id).eq('company_id', company_id).execute()
             
             if result.data:
+                self.invalidate_user_cache(company_id, user_id)
                 return True, "Usuário excluído com sucesso!"
             return False, "Usuário não encontrado."
         except Exception as e:
+            record_error(e)
             return False, f"Erro ao excluir usuário: {str(e)}"
     
     # === EMPRESAS ===
+    @reads('companies')
     def get_all_companies(self) -> List[dict]:
-        """Retorna todas as empresas"""
-        try:
-            result = self.client.table('companies').select('*').order('name').execute()
+        """Retorna todas as empresas (cacheado)"""
+        def _load():
+            query = self.client.table('companies').select('*').order('name')
+            result = resilience.execute('companies', query, key=('get_all_companies',))
             return result.data or []
+
+        try:
+            return self.cache.get_or_load(None, 'companies', _load)
         except Exception as e:
+            record_error(e)
             print(f"Erro ao buscar empresas: {e}")
             return []
     
+    @writes('companies')
     def create_company(self, name: str, slug: str) -> tuple[bool, str, int]:
         """Cria nova empresa"""
         try:
@@ -196,29 +499,30 @@ class SupabaseDatabase:
             
             result = self.client.table('companies').insert(company_data).execute()
             company_id = result.data[0]['id'] if result.data else None
+            self.invalidate_company_cache()
             return True, "Empresa criada com sucesso!", company_id
         except Exception as e:
+            record_error(e)
             return False, f"Erro ao criar empresa: {str(e)}", None
     
+    @writes('companies')
     def toggle_company_status(self, company_id: int) -> tuple[bool, str]:
-        """Ativa/desativa empresa"""
+        """Ativa/desativa empresa (UPDATE atômico via RPC, migration 008)"""
         try:
-            # Busca empresa atual
-            result = self.client.table('companies').select('active').eq('id', company_id).execute()
+            result = self.client.rpc('toggle_company_active', {'p_company_id': company_id}).execute()
             if not result.data:
                 return False, "Empresa não encontrada."
-            
-            new_status = not result.data[0]['active']
-            self.client.table('companies').update({
-                'active': new_status
-            }).eq('id', company_id).execute()
-            
+            self.invalidate_company_cache()
+
+            new_status = result.data[0]['active']
             status = "ativada" if new_status else "desativada"
             return True, f"Empresa {status} com sucesso!"
         except Exception as e:
+            record_error(e)
             return False, f"Erro ao alterar status: {str(e)}"
     
     # === TAREFAS ATRIBUÍDAS ===
+    @writes('task_assignments')
     def create_task_assignment(self, assignment_data: dict) -> tuple[bool, str, int]:
         """Cria nova tarefa atribuída (ou na caixa da empresa se assigned_to = None)"""
         try:
@@ -246,26 +550,157 @@ class SupabaseDatabase:
             assignment_id = result.data[0]['id'] if result.data else None
             return True, "Tarefa criada com sucesso!", assignment_id
         except Exception as e:
+            record_error(e)
             return False, f"Erro ao criar tarefa: {str(e)}", None
     
-    def get_task_assignments(self, company_id: int, user_id: int = None, status: str = None) -> List[dict]:
-        """Retorna tarefas atribuídas"""
+    @reads('task_assignments', 'users')
+    def get_task_assignments(
+        self,
+        company_id: int,
+        user_id: int = None,
+        status: str = None,
+        created_from: datetime = None,
+        created_to: datetime = None,
+        completed_from: datetime = None,
+        completed_to: datetime = None,
+        empresa_nome: str = None,
+        assigned_by: int = None,
+        assigned_to_name: str = None,
+        limit: int = None,
+        profile: str = 'detail',
+    ) -> List[dict]:
+        """Retorna tarefas atribuídas, com os filtros aplicados no servidor.
+
+        Os intervalos de data são [início, fim) em created_at/completed_at
+        (veja period_bounds). `limit` limita o número de linhas retornadas.
+        `profile` escolhe as colunas buscadas (veja database/projections.py).
+        """
         try:
-            query = self.client.table('task_assignments').select(
-                '*, assigned_to_user:users!assigned_to(full_name), assigned_by_user:users!assigned_by(full_name)'
-            ).eq('company_id', company_id)
-            
-            if user_id:
-                query = query.eq('assigned_to', user_id)
-            if status:
-                query = query.eq('status', status)
-            
-            result = query.order('created_at', desc=True).execute()
-            return result.data or []
+            assigned_to_ids = None
+            if assigned_to_name:
+                assigned_to_ids = self._resolve_user_ids_by_name(company_id, assigned_to_name)
+                if not assigned_to_ids:
+                    return []
+
+            query = self._task_list_query(
+                projection_select(profile),
+                company_id,
+                user_id=user_id,
+                status=status,
+                assigned_to_ids=assigned_to_ids,
+                created_from=created_from,
+                created_to=created_to,
+                completed_from=completed_from,
+                completed_to=completed_to,
+                empresa_nome=empresa_nome,
+                assigned_by=assigned_by,
+            )
+            query = query.order('created_at', desc=True)
+            if limit:
+                query = query.limit(limit)
+
+            key = (
+                'get_task_assignments', company_id, user_id, status, created_from, created_to,
+                completed_from, completed_to, empresa_nome, assigned_by, assigned_to_name, limit, profile,
+            )
+            result = resilience.execute('task_assignments', query, key=key)
+            return apply_projection(result.data or [], profile, STRICT_TASK_PROJECTIONS)
         except Exception as e:
+            record_error(e)
             print(f"Erro ao buscar tarefas: {e}")
             return []
     
+    @reads('task_assignments', 'users')
+    def get_dashboard_aggregates(self, company_id: int, period=None, empresa: str = None) -> dict:
+        """Retorna contagens e somas do dashboard agregadas no Postgres (RPC dashboard_aggregates).
+
+        Returns:
+            {'totals': {...}, 'by_status': {status: n}, 'by_team': {team: {...}},
+             'by_empresa': {nome: {...}}, 'by_user': {user_id: {...}}, 'empresas': [nomes]}
+        """
+        try:
+            params = dashboard_aggregates_params(company_id, period, empresa)
+            result = resilience.execute(
+                'rpc.dashboard_aggregates', self.client.rpc('dashboard_aggregates', params),
+                key=('get_dashboard_aggregates',) + tuple(sorted(params.items())), hedge=True,
+            )
+            return parse_dashboard_aggregates(result.data or [])
+        except Exception as e:
+            record_error(e)
+            print(f"Erro ao buscar agregados do dashboard: {e}")
+            return parse_dashboard_aggregates([])
+
+    @reads('task_assignments', 'users')
+    def get_completed_task_totals(
+        self,
+        company_id: int,
+        completed_from: datetime = None,
+        completed_to: datetime = None,
+        assigned_to_name: str = None,
+    ) -> dict:
+        """Quantidade e somas das métricas técnicas das tarefas concluídas (RPC completed_tasks_totals).
+
+        Mesmos filtros de get_task_assignments_keyset(status='concluida'), sem baixar as linhas.
+
+        Returns:
+            {'total': n, 'quantidade_cto': ..., 'fibra_lancada': ..., ...}
+        """
+        try:
+            assigned_to_ids = None
+            if assigned_to_name:
+                assigned_to_ids = self._resolve_user_ids_by_name(company_id, assigned_to_name)
+                if not assigned_to_ids:
+                    return parse_completed_totals([])
+
+            params = {
+                'p_company_id': company_id,
+                'p_completed_from': completed_from.isoformat() if completed_from else None,
+                'p_completed_to': completed_to.isoformat() if completed_to else None,
+                'p_assigned_to': assigned_to_ids,
+            }
+            result = resilience.execute(
+                'rpc.completed_tasks_totals', self.client.rpc('completed_tasks_totals', params),
+                key=('get_completed_task_totals', company_id, completed_from, completed_to, assigned_to_name),
+            )
+            return parse_completed_totals(result.data or [])
+        except Exception as e:
+            record_error(e)
+            print(f"Erro ao buscar totais das tarefas concluídas: {e}")
+            return parse_completed_totals([])
+
+    def _resolve_user_ids_by_name(self, company_id: int, full_name: str) -> list[int]:
+        """Resolve o nome do colaborador para ids (usa a lista de usuários em cache)."""
+        return [u['id'] for u in self.get_all_users(company_id) if u.get('full_name') == full_name]
+
+    def _task_list_query(
+        self,
+        select: str,
+        company_id: int,
+        user_id: int = None,
+        status: str = None,
+        assigned_only: bool = False,
+        unassigned_only: bool = False,
+        assigned_to_ids: list = None,
+        created_from: datetime = None,
+        created_to: datetime = None,
+        completed_from: datetime = None,
+        completed_to: datetime = None,
+        empresa_nome: str = None,
+        assigned_by: int = None,
+        count: str = None,
+    ):
+        """Monta a query de listagem de tarefas (veja task_list_query)."""
+        return task_list_query(
+            self.client, select, company_id,
+            user_id=user_id, status=status,
+            assigned_only=assigned_only, unassigned_only=unassigned_only,
+            assigned_to_ids=assigned_to_ids,
+            created_from=created_from, created_to=created_to,
+            completed_from=completed_from, completed_to=completed_to,
+            empresa_nome=empresa_nome, assigned_by=assigned_by, count=count,
+        )
+
+    @reads('task_assignments', 'users')
     def get_task_assignments_paginated(
         self,
         company_id: int,
@@ -276,63 +711,134 @@ class SupabaseDatabase:
         assigned_only: bool = False,
         unassigned_only: bool = False,
         assigned_to_name: str = None,
+        count: str = 'exact',
+        profile: str = 'detail',
     ) -> tuple[list, int]:
-        """Retorna (data, total_count) com paginação server-side."""
+        """Retorna (data, total_count) com paginação server-side por offset.
+
+        `count` pode ser 'exact', 'planned' ou 'estimated' (evita COUNT exato em tabelas grandes).
+        Para páginas profundas prefira get_task_assignments_keyset.
+        """
         try:
             start = page * page_size
             end = start + page_size - 1
 
-            query = self.client.table('task_assignments').select(
-                '*, assigned_to_user:users!assigned_to(id, full_name, team), assigned_by_user:users!assigned_by(full_name)',
-                count='exact'
-            ).eq('company_id', company_id)
-
-            if user_id:
-                query = query.eq('assigned_to', user_id)
-            if status:
-                query = query.eq('status', status)
-            if assigned_only:
-                query = query.not_.is_('assigned_to', 'null')
-            if unassigned_only:
-                query = query.is_('assigned_to', 'null')
+            assigned_to_ids = None
+            if assigned_to_name:
+                assigned_to_ids = self._resolve_user_ids_by_name(company_id, assigned_to_name)
+                if not assigned_to_ids:
+                    return [], 0
 
-            result = query.order('created_at', desc=True).range(start, end).execute()
+            query = self._task_list_query(
+                projection_select(profile), company_id, user_id, status, assigned_only, unassigned_only,
+                assigned_to_ids, count=count,
+            )
+            query = query.order('created_at', desc=True).order('id', desc=True).range(start, end)
+            key = (
+                'get_task_assignments_paginated', company_id, page, page_size, user_id, status,
+                assigned_only, unassigned_only, assigned_to_name, count, profile,
+            )
+            result = resilience.execute('task_assignments', query, key=key)
+            return apply_projection(result.data or [], profile, STRICT_TASK_PROJECTIONS), result.count or 0
+        except Exception as e:
+            record_error(e)
+            print(f"Erro ao buscar tarefas paginadas: {e}")
+            return [], 0
 
-            data = result.data or []
+    @reads('task_assignments', 'users')
+    def get_task_assignments_keyset(
+        self,
+        company_id: int,
+        cursor: str = None,
+        page_size: int = 15,
+        user_id: int = None,
+        status: str = None,
+        assigned_only: bool = False,
+        unassigned_only: bool = False,
+        assigned_to_name: str = None,
+        completed_from: datetime = None,
+        completed_to: datetime = None,
+        count: str = 'estimated',
+        profile: str = 'detail',
+    ) -> tuple[list, int, Optional[str]]:
+        """Retorna (data, total_count, next_cursor) com paginação keyset por (created_at, id) desc.
 
-            # filtro por colaborador (feito em memória pois Supabase não filtra join direto)
+        O custo de qualquer página é o mesmo da primeira. `next_cursor` é None na última página.
+        Com count=None o total não é calculado (retorna 0).
+        """
+        try:
+            assigned_to_ids = None
             if assigned_to_name:
-                data = [t for t in data if (t.get('assigned_to_user') or {}).get('full_name') == assigned_to_name]
+                assigned_to_ids = self._resolve_user_ids_by_name(company_id, assigned_to_name)
+                if not assigned_to_ids:
+                    return [], 0, None
+
+            query = self._task_list_query(
+                projection_select(profile), company_id, user_id, status, assigned_only, unassigned_only,
+                assigned_to_ids, completed_from=completed_from, completed_to=completed_to, count=count,
+            )
+            if cursor:
+                created_at, last_id = decode_cursor(cursor)
+                query = query.or_(
+                    f'created_at.lt."{created_at}",'
+                    f'and(created_at.eq."{created_at}",id.lt.{last_id})'
+                )
 
-            return data, result.count or 0
+            # Busca uma linha a mais só para saber se existe próxima página
+            query = query.order('created_at', desc=True).order('id', desc=True).limit(page_size + 1)
+            key = (
+                'get_task_assignments_keyset', company_id, cursor, page_size, user_id, status, assigned_only,
+                unassigned_only, assigned_to_name, completed_from, completed_to, count, profile,
+            )
+            result = resilience.execute('task_assignments', query, key=key, hedge=True)
+            data = result.data or []
+
+            next_cursor = None
+            if len(data) > page_size:
+                data = data[:page_size]
+                next_cursor = encode_cursor(data[-1])
+            return apply_projection(data, profile, STRICT_TASK_PROJECTIONS), result.count or 0, next_cursor
         except Exception as e:
+            record_error(e)
             print(f"Erro ao buscar tarefas paginadas: {e}")
-            return [], 0
+            return [], 0, None
 
-    def get_task_assignment_by_id(self, assignment_id: int, company_id: int = None) -> Optional[dict]:
-        """Retorna tarefa por ID"""
+    @reads('task_assignments', 'users')
+    def get_task_assignment_by_id(self, assignment_id: int, company_id: int = None, profile: str = 'detail') -> Optional[dict]:
+        """Retorna tarefa por ID (colunas conforme o perfil de projeção)"""
         try:
             query = self.client.table('task_assignments').select(
-                '*, assigned_to_user:users!assigned_to(full_name), assigned_by_user:users!assigned_by(full_name)'
+                projection_select(profile)
             ).eq('id', assignment_id)
             
             if company_id:
                 query = query.eq('company_id', company_id)
             
-            result = query.execute()
-            return result.data[0] if result.data else None
+            result = resilience.execute(
+                'task_assignments', query, key=('get_task_assignment_by_id', assignment_id, company_id, profile)
+            )
+            rows = apply_projection(result.data or [], profile, STRICT_TASK_PROJECTIONS)
+            return rows[0] if rows else None
         except Exception as e:
+            record_error(e)
             print(f"Erro ao buscar tarefa: {e}")
             return None
     
+    @writes('task_assignments')
     def update_task_status(self, assignment_id: int, status: str, notes: str = None) -> tuple[bool, str]:
         """Atualiza status da tarefa preservando materiais"""
+        success, message, _ = self.update_task_status_returning(assignment_id, status, notes)
+        return success, message
+
+    @writes('task_assignments')
+    def update_task_status_returning(
+        self, assignment_id: int, status: str, notes: str = None
+    ) -> tuple[bool, str, Optional[dict]]:
+        """Atualiza status da tarefa e retorna a linha atualizada.
+
+        Um único UPDATE condicional: nenhuma linha retornada = tarefa não encontrada.
+        """
         try:
-            # Busca tarefa atual para preservar dados
-            current_task = self.get_task_assignment_by_id(assignment_id)
-            if not current_task:
-                return False, "Tarefa não encontrada."
-            
             update_data = {
                 'status': status,
                 'updated_at': datetime.utcnow().isoformat()
@@ -349,20 +855,25 @@ class SupabaseDatabase:
             result = self.client.table('task_assignments').update(update_data).eq('id', assignment_id).execute()
             
             if result.data:
-                return True, "Status atualizado com sucesso!"
-            return False, "Tarefa não encontrada."
+                return True, "Status atualizado com sucesso!", result.data[0]
+            return False, "Tarefa não encontrada.", None
         except Exception as e:
-            return False, f"Erro ao atualizar status: {str(e)}"
+            record_error(e)
+            return False, f"Erro ao atualizar status: {str(e)}", None
     
+    @reads('task_materials')
     def get_task_materials(self, assignment_id: int) -> list:
         """Retorna materiais da tabela task_materials para uma tarefa"""
         try:
-            result = self.client.table('task_materials').select('*').eq('assignment_id', assignment_id).execute()
+            query = self.client.table('task_materials').select('*').eq('assignment_id', assignment_id)
+            result = resilience.execute('task_materials', query, key=('get_task_materials', assignment_id))
             return result.data or []
         except Exception as e:
+            record_error(e)
             print(f"Erro ao buscar materiais: {e}")
             return []
 
+    @writes('task_assignments', 'task_materials')
     def update_task_materials(self, assignment_id: int, materials: str) -> tuple[bool, str]:
         """Atualiza materiais da tarefa"""
         try:
@@ -377,8 +888,10 @@ class SupabaseDatabase:
                 return True, "Materiais atualizados com sucesso!"
             return False, "Tarefa não encontrada."
         except Exception as e:
+            record_error(e)
             return False, f"Erro ao atualizar materiais: {str(e)}"
     
+    @writes('task_assignments')
     def update_task_isp_data(self, assignment_id: int, isp_data: dict) -> tuple[bool, str]:
         """Atualiza dados técnicos ISP da tarefa"""
         try:
@@ -408,77 +921,205 @@ class SupabaseDatabase:
                 return True, "Dados técnicos atualizados com sucesso!"
             return False, "Tarefa não encontrada."
         except Exception as e:
+            record_error(e)
             return False, f"Erro ao atualizar dados técnicos: {str(e)}"
     
     # === NOTIFICAÇÕES ===
+    @writes('notifications')
     def create_notification(self, user_id: int, company_id: int, type: str, title: str, message: str = None, reference_id: int = None) -> bool:
         """Cria notificação"""
+        return self.create_notifications_bulk([{
+            'user_id': user_id,
+            'company_id': company_id,
+            'type': type,
+            'title': title,
+            'message': message,
+            'reference_id': reference_id,
+        }]) == 1
+
+    @writes('notifications')
+    def create_notifications_bulk(self, rows: List[dict]) -> int:
+        """Cria várias notificações em um único INSERT.
+
+        Cada linha precisa de user_id, company_id, type e title; message e
+        reference_id são opcionais. Retorna a quantidade criada (0 em caso de erro).
+        """
+        if not rows:
+            return 0
         try:
-            data = {
-                'user_id': user_id,
-                'company_id': company_id,
-                'type': type,
-                'title': title,
-                'message': message,
-                'reference_id': reference_id,
-                'read': False,
-                'created_at': datetime.utcnow().isoformat()
-            }
-            
-            self.client.table('notifications').insert(data).execute()
-            return True
+            now = datetime.utcnow().isoformat()
+            data = [
+                {
+                    'user_id': row['user_id'],
+                    'company_id': row['company_id'],
+                    'type': row['type'],
+                    'title': row['title'],
+                    'message': row.get('message'),
+                    'reference_id': row.get('reference_id'),
+                    'read': False,
+                    'created_at': now,
+                }
+                for row in rows
+            ]
+            self.client.table('notifications').insert(data, returning='minimal').execute()
+            for row in data:
+                self._adjust_unread_count(row['user_id'], 1)
+            return len(data)
         except Exception as e:
-            print(f"Erro ao criar notificação: {e}")
-            return False
+            record_error(e)
+            print(f"Erro ao criar notificações: {e}")
+            return 0
     
-    def get_notifications(self, user_id: int, unread_only: bool = False) -> List[dict]:
-        """Retorna notificações do usuário"""
+    @reads('notifications')
+    def get_notifications(self, user_id: int, unread_only: bool = False, limit: int = NOTIFICATIONS_PAGE_SIZE) -> List[dict]:
+        """Retorna as notificações mais recentes do usuário (no máximo uma página)"""
+        data, _ = self.get_notifications_page(user_id, page_size=limit, unread_only=unread_only)
+        return data
+
+    @reads('notifications')
+    def get_notifications_page(
+        self,
+        user_id: int,
+        cursor: str = None,
+        page_size: int = NOTIFICATIONS_PAGE_SIZE,
+        unread_only: bool = False,
+    ) -> tuple[list, Optional[str]]:
+        """Retorna (data, next_cursor) com paginação keyset por (created_at, id) desc.
+
+        `page_size` é limitado a NOTIFICATIONS_PAGE_SIZE. `next_cursor` é None na última página.
+        """
         try:
+            page_size = max(1, min(page_size, NOTIFICATIONS_PAGE_SIZE))
             query = self.client.table('notifications').select('*').eq('user_id', user_id)
             if unread_only:
                 query = query.eq('read', False)
-            
-            result = query.order('created_at', desc=True).execute()
-            return result.data or []
+            if cursor:
+                created_at, last_id = decode_cursor(cursor)
+                query = query.or_(
+                    f'created_at.lt."{created_at}",'
+                    f'and(created_at.eq."{created_at}",id.lt.{last_id})'
+                )
+
+            query = query.order('created_at', desc=True).order('id', desc=True).limit(page_size + 1)
+            key = ('get_notifications_page', user_id, cursor, page_size, unread_only)
+            result = resilience.execute('notifications', query, key=key)
+            data = result.data or []
+
+            next_cursor = None
+            if len(data) > page_size:
+                data = data[:page_size]
+                next_cursor = encode_cursor(data[-1])
+            return data, next_cursor
         except Exception as e:
+            record_error(e)
             print(f"Erro ao buscar notificações: {e}")
-            return []
+            return [], None
+
+    @writes('notifications')
+    def prune_notifications(self, older_than_days: int = NOTIFICATIONS_RETENTION_DAYS) -> int:
+        """Exclui notificações já lidas criadas há mais de `older_than_days` dias.
+
+        Não lidas nunca são removidas. Retorna a quantidade excluída.
+        """
+        try:
+            cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+            result = self.client.table('notifications').delete(
+                count='exact', returning='minimal'
+            ).eq('read', True).lt('created_at', cutoff.isoformat()).execute()
+            return result.count or 0
+        except Exception as e:
+            record_error(e)
+            print(f"Erro ao limpar notificações: {e}")
+            return 0
     
+    @writes('notifications')
     def mark_notification_as_read(self, notification_id: int, user_id: int = None) -> bool:
         """Marca notificação como lida"""
         try:
             query = self.client.table('notifications').update({
                 'read': True
-            }).eq('id', notification_id)
+            }).eq('id', notification_id).eq('read', False)
             if user_id is not None:
                 query = query.eq('user_id', user_id)
-            query.execute()
+            result = query.execute()
+            for row in result.data or []:
+                self._adjust_unread_count(row['user_id'], -1)
             return True
         except Exception as e:
+            record_error(e)
             print(f"Erro ao marcar notificação: {e}")
             return False
     
-    def get_unread_count(self, user_id: int) -> int:
-        """Retorna quantidade de notificações não lidas"""
+    @writes('notifications')
+    def mark_all_notifications_read(self, user_id: int, before: datetime = None) -> int:
+        """Marca como lidas, em um único UPDATE, as notificações não lidas do usuário.
+
+        Com `before`, só as criadas até esse instante (evita marcar as que chegaram
+        depois de a tela ser carregada). Retorna a quantidade marcada.
+        """
         try:
-            result = self.client.table('notifications').select('id', count='exact').eq('user_id', user_id).eq('read', False).execute()
+            query = self.client.table('notifications').update(
+                {'read': True}, count='exact', returning='minimal'
+            ).eq('user_id', user_id).eq('read', False)
+            if before is not None:
+                query = query.lte('created_at', before.isoformat())
+            result = query.execute()
+            count = result.count or 0
+            if before is None:
+                self.unread_counts.set(None, user_id, 0)
+            else:
+                self._adjust_unread_count(user_id, -count)
+            return count
+        except Exception as e:
+            record_error(e)
+            print(f"Erro ao marcar notificações: {e}")
+            return 0
+
+    @reads('notifications')
+    def get_unread_count(self, user_id: int) -> int:
+        """Retorna quantidade de notificações não lidas.
+
+        Lida do contador em memória; só consulta o banco quando o contador do
+        usuário expira (UNREAD_COUNT_TTL_SECONDS) ou ainda não existe.
+        """
+        def _load():
+            query = self.client.table('notifications').select('id', count='exact').eq('user_id', user_id).eq('read', False).limit(1)
+            result = resilience.execute('notifications', query, key=('get_unread_count', user_id), hedge=True)
             return result.count or 0
+
+        try:
+            return self.unread_counts.get_or_load(None, user_id, _load)
         except Exception as e:
+            record_error(e)
             print(f"Erro ao contar notificações: {e}")
             return 0
+
+    def _adjust_unread_count(self, user_id: int, delta: int) -> None:
+        """Ajusta o contador em memória de não lidas (se o usuário já estiver em cache)."""
+        self.unread_counts.adjust(None, user_id, lambda value: max(0, value + delta))
     
     # === FOTOS DAS TAREFAS ===
+    @reads('assignment_photos')
     def get_assignment_photos(self, assignment_id: int) -> List[dict]:
         """Retorna fotos de uma tarefa"""
         try:
-            result = self.client.table('assignment_photos').select('*').eq('assignment_id', assignment_id).order('uploaded_at', desc=True).execute()
+            query = self.client.table('assignment_photos').select('*').eq('assignment_id', assignment_id).order('uploaded_at', desc=True)
+            result = resilience.execute('assignment_photos', query, key=('get_assignment_photos', assignment_id))
             return result.data or []
         except Exception as e:
+            record_error(e)
             print(f"Erro ao buscar fotos: {e}")
             return []
     
-    def create_assignment_photo(self, assignment_id: int, photo_url: str, photo_path: str, original_name: str = None) -> tuple[bool, str]:
-        """Registra foto da tarefa no banco"""
+    @writes('assignment_photos')
+    def create_assignment_photo(
+        self, assignment_id: int, photo_url: str, photo_path: str, original_name: str = None,
+        renditions: dict = None,
+    ) -> tuple[bool, str]:
+        """Registra foto da tarefa no banco.
+
+        `renditions`: {'thumb': (url, path), 'medium': (url, path)} gerados no upload.
+        """
         try:
             data = {
                 'assignment_id': assignment_id,
@@ -487,12 +1128,16 @@ class SupabaseDatabase:
                 'original_name': original_name or photo_path,
                 'uploaded_at': datetime.utcnow().isoformat()
             }
+            for name, (url, path) in (renditions or {}).items():
+                data[f'{name}_url'] = url
+                data[f'{name}_path'] = path
             
             result = self.client.table('assignment_photos').insert(data).execute()
             if result.data:
                 return True, "Foto registrada com sucesso!"
             return False, "Erro ao registrar foto."
         except Exception as e:
+            record_error(e)
             return False, f"Erro ao registrar foto: {str(e)}"
 
 # Instância global
@@ -0,0 +1,105 @@
+-- Migration 006: Agregações do dashboard no servidor
+-- Aplicar no Supabase SQL Editor
+--
+-- Retorna, em uma única chamada, contagens por status e somas das métricas ISP
+-- agrupadas por status, equipe, empresa_nome e colaborador (assigned_to).
+-- Tarefas de empresas inativas são ignoradas (mesma regra do dashboard).
+-- As métricas extraídas do campo livre `materials` seguem as mesmas regex de
+-- views/dashboard_supabase.py::extract_materials_from_text.
+--
+-- Uso via PostgREST: db.client.rpc('dashboard_aggregates', {...})
+
+CREATE OR REPLACE FUNCTION dashboard_aggregates(
+    p_company_id   INTEGER,
+    p_created_from TIMESTAMP DEFAULT NULL,
+    p_created_to   TIMESTAMP DEFAULT NULL,
+    p_empresa      VARCHAR   DEFAULT NULL
+)
+RETURNS TABLE (
+    dim                               TEXT,
+    dim_key                           TEXT,
+    total_tasks                       BIGINT,
+    total_concluida                   BIGINT,
+    total_em_andamento                BIGINT,
+    total_pendente                    BIGINT,
+    sum_quantidade_cto                BIGINT,
+    sum_quantidade_cx_emenda          BIGINT,
+    sum_fibra_lancada                 NUMERIC,
+    sum_abertura_fechamento_cx_emenda BIGINT,
+    sum_abertura_fechamento_cto       BIGINT,
+    sum_abertura_fechamento_rozeta    BIGINT
+)
+LANGUAGE sql STABLE
+AS $$
+    WITH ativas AS (
+        SELECT t.*
+        FROM task_assignments t
+        WHERE t.company_id = p_company_id
+          AND (
+              COALESCE(t.empresa_nome, '') = ''
+              OR EXISTS (
+                  SELECT 1 FROM companies c
+                  WHERE c.name = t.empresa_nome AND c.active
+              )
+          )
+    ),
+    filtradas AS (
+        SELECT
+            a.status,
+            a.assigned_to,
+            NULLIF(a.empresa_nome, '') AS empresa_key,
+            CASE WHEN u.role <> 'admin' THEN u.team END AS team_key,
+            COALESCE(a.quantidade_cto, 0)
+                + COALESCE((
+                    SELECT SUM(m[1]::INTEGER)
+                    FROM regexp_matches(LOWER(COALESCE(a.materials, '')), '(\d+)\s*(?:cto|cts)', 'g') AS m
+                ), 0) AS qtd_cto,
+            COALESCE(a.quantidade_cx_emenda, 0) AS qtd_cx_emenda,
+            COALESCE(a.fibra_lancada, 0)
+                + COALESCE((
+                    SELECT SUM(m[1]::INTEGER)
+                    FROM regexp_matches(LOWER(COALESCE(a.materials, '')), '(\d+)\s*(?:m|metro)', 'g') AS m
+                ), 0) AS fibra,
+            COALESCE(a.abertura_fechamento_cx_emenda, 0) AS abert_cx_emenda,
+            COALESCE(a.abertura_fechamento_cto, 0)       AS abert_cto,
+            COALESCE(a.abertura_fechamento_rozeta, 0)    AS abert_rozeta
+        FROM ativas a
+        LEFT JOIN users u ON u.id = a.assigned_to
+        WHERE (p_empresa IS NULL OR a.empresa_nome = p_empresa)
+          AND (p_created_from IS NULL OR a.created_at >= p_created_from)
+          AND (p_created_to IS NULL OR a.created_at < p_created_to)
+    )
+    SELECT
+        CASE
+            WHEN GROUPING(f.status) = 0      THEN 'status'
+            WHEN GROUPING(f.team_key) = 0    THEN 'team'
+            WHEN GROUPING(f.empresa_key) = 0 THEN 'empresa'
+            WHEN GROUPING(f.assigned_to) = 0 THEN 'user'
+            ELSE 'total'
+        END,
+        COALESCE(f.status, f.team_key, f.empresa_key, f.assigned_to::TEXT),
+        COUNT(*),
+        COUNT(*) FILTER (WHERE f.status = 'concluida'),
+        COUNT(*) FILTER (WHERE f.status = 'em_andamento'),
+        COUNT(*) FILTER (WHERE f.status = 'pendente'),
+        SUM(f.qtd_cto)::BIGINT,
+        SUM(f.qtd_cx_emenda)::BIGINT,
+        SUM(f.fibra),
+        SUM(f.abert_cx_emenda)::BIGINT,
+        SUM(f.abert_cto)::BIGINT,
+        SUM(f.abert_rozeta)::BIGINT
+    FROM filtradas f
+    GROUP BY GROUPING SETS ((), (f.status), (f.team_key), (f.empresa_key), (f.assigned_to))
+
+    UNION ALL
+
+    -- Empresas disponíveis para o filtro (ignora período/empresa selecionados)
+    SELECT 'empresa_option', a.empresa_nome, COUNT(*), 0, 0, 0, 0, 0, 0, 0, 0, 0
+    FROM ativas a
+    WHERE COALESCE(a.empresa_nome, '') <> ''
+    GROUP BY a.empresa_nome;
+$$;
+
+-- Índice de apoio para filtros por empresa + data de criação
+CREATE INDEX IF NOT EXISTS idx_task_assignments_company_created
+    ON task_assignments (company_id, created_at DESC);
@@ -0,0 +1,18 @@
+-- Migration 007: Índices para paginação keyset de task_assignments
+-- Aplicar no Supabase SQL Editor
+--
+-- A listagem ordena por (created_at DESC, id DESC) e continua a partir do
+-- último par retornado (cursor), então cada página é uma busca no índice,
+-- independente da profundidade.
+
+-- Substitui o índice (company_id, created_at) criado na migration 006
+DROP INDEX IF EXISTS idx_task_assignments_company_created;
+
+CREATE INDEX IF NOT EXISTS idx_task_assignments_company_created_id
+    ON task_assignments (company_id, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_task_assignments_company_assigned_created_id
+    ON task_assignments (company_id, assigned_to, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_task_assignments_company_status_created_id
+    ON task_assignments (company_id, status, created_at DESC, id DESC);
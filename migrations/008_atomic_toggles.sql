@@ -0,0 +1,34 @@
+-- Migration 008: Ativar/desativar usuário e empresa em uma única operação
+-- Aplicar no Supabase SQL Editor
+--
+-- Substitui o padrão "lê o status, grava o inverso" (duas chamadas e sujeito a
+-- corrida entre admins simultâneos) por um UPDATE atômico que devolve a linha.
+-- Nenhuma linha retornada = registro não encontrado.
+--
+-- Uso via PostgREST: db.client.rpc('toggle_user_active', {...})
+
+CREATE OR REPLACE FUNCTION toggle_user_active(
+    p_user_id    INTEGER,
+    p_company_id INTEGER
+)
+RETURNS SETOF users
+LANGUAGE sql VOLATILE
+AS $$
+    UPDATE users
+       SET active = NOT active
+     WHERE id = p_user_id
+       AND company_id = p_company_id
+    RETURNING *;
+$$;
+
+CREATE OR REPLACE FUNCTION toggle_company_active(
+    p_company_id INTEGER
+)
+RETURNS SETOF companies
+LANGUAGE sql VOLATILE
+AS $$
+    UPDATE companies
+       SET active = NOT active
+     WHERE id = p_company_id
+    RETURNING *;
+$$;
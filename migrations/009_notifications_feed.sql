@@ -0,0 +1,16 @@
+-- Migration 009: Feed de notificações paginado e retenção das já lidas
+-- Aplicar no Supabase SQL Editor
+--
+-- O feed é paginado por (created_at, id) desc por usuário
+-- (SupabaseDatabase.get_notifications_page). Notificações lidas mais antigas
+-- que a retenção configurada (NOTIFICATIONS_RETENTION_DAYS) são excluídas pelo
+-- job diário `python -m database.prune_notifications` (SupabaseDatabase.prune_notifications).
+
+-- Índice do feed (keyset por usuário)
+CREATE INDEX IF NOT EXISTS idx_notifications_user_created
+    ON notifications (user_id, created_at DESC, id DESC);
+
+-- Índice de apoio à limpeza (somente lidas)
+CREATE INDEX IF NOT EXISTS idx_notifications_read_created
+    ON notifications (created_at)
+    WHERE read;
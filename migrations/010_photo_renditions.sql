@@ -0,0 +1,17 @@
+-- Migration 010: Renditions das fotos (miniatura e média)
+-- Aplicar no Supabase SQL Editor
+--
+-- No upload são geradas uma miniatura e uma versão média de cada foto
+-- (utils/image_renditions.py), gravadas no storage ao lado do original.
+-- As grades das views carregam a miniatura e abrem o original sob demanda.
+-- Fotos antigas ficam com as colunas nulas e continuam usando o original.
+
+ALTER TABLE assignment_photos
+    ADD COLUMN IF NOT EXISTS thumb_url TEXT,
+    ADD COLUMN IF NOT EXISTS thumb_path TEXT,
+    ADD COLUMN IF NOT EXISTS medium_url TEXT,
+    ADD COLUMN IF NOT EXISTS medium_path TEXT;
+
+ALTER TABLE task_photos
+    ADD COLUMN IF NOT EXISTS thumb_path VARCHAR(500),
+    ADD COLUMN IF NOT EXISTS medium_path VARCHAR(500);
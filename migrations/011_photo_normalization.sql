@@ -0,0 +1,15 @@
+-- Migration 011: Arquivo enviado guardado ao lado da foto normalizada
+-- Aplicar no Supabase SQL Editor
+--
+-- No upload, cada foto (JPEG, PNG, WebP ou HEIC) é orientada, tem o EXIF
+-- removido, é limitada a PHOTO_MAX_EDGE px e recodificada em PHOTO_FORMAT
+-- (utils/image_renditions.py). Com PHOTO_KEEP_SOURCE=true o arquivo enviado
+-- também é gravado no storage, e seu caminho fica nestas colunas.
+-- Fotos antigas e as enviadas sem PHOTO_KEEP_SOURCE ficam com as colunas nulas.
+
+ALTER TABLE assignment_photos
+    ADD COLUMN IF NOT EXISTS source_url TEXT,
+    ADD COLUMN IF NOT EXISTS source_path TEXT;
+
+ALTER TABLE task_photos
+    ADD COLUMN IF NOT EXISTS source_path VARCHAR(500);
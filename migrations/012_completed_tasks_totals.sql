@@ -0,0 +1,47 @@
+-- Migration 012: Totais das tarefas concluídas no servidor
+-- Aplicar no Supabase SQL Editor
+--
+-- KPIs da tela "Tarefas Concluídas" (views/completed_tasks_manager.py) em uma
+-- única linha: quantidade e somas das colunas técnicas, com os mesmos filtros
+-- da lista (período de conclusão e colaboradores). A tela busca só a página
+-- visível; a lista completa é baixada apenas para exportação.
+--
+-- Uso via PostgREST: db.client.rpc('completed_tasks_totals', {...})
+
+CREATE OR REPLACE FUNCTION completed_tasks_totals(
+    p_company_id     INTEGER,
+    p_completed_from TIMESTAMP DEFAULT NULL,
+    p_completed_to   TIMESTAMP DEFAULT NULL,
+    p_assigned_to    INTEGER[] DEFAULT NULL
+)
+RETURNS TABLE (
+    total_tasks                       BIGINT,
+    sum_quantidade_cto                BIGINT,
+    sum_quantidade_cx_emenda          BIGINT,
+    sum_fibra_lancada                 NUMERIC,
+    sum_abertura_fechamento_cx_emenda BIGINT,
+    sum_abertura_fechamento_cto       BIGINT,
+    sum_abertura_fechamento_rozeta    BIGINT
+)
+LANGUAGE sql STABLE
+AS $$
+    SELECT
+        COUNT(*),
+        COALESCE(SUM(t.quantidade_cto), 0)::BIGINT,
+        COALESCE(SUM(t.quantidade_cx_emenda), 0)::BIGINT,
+        COALESCE(SUM(t.fibra_lancada), 0),
+        COALESCE(SUM(t.abertura_fechamento_cx_emenda), 0)::BIGINT,
+        COALESCE(SUM(t.abertura_fechamento_cto), 0)::BIGINT,
+        COALESCE(SUM(t.abertura_fechamento_rozeta), 0)::BIGINT
+    FROM task_assignments t
+    WHERE t.company_id = p_company_id
+      AND t.status = 'concluida'
+      AND (p_completed_from IS NULL OR t.completed_at >= p_completed_from)
+      AND (p_completed_to IS NULL OR t.completed_at < p_completed_to)
+      AND (p_assigned_to IS NULL OR t.assigned_to = ANY (p_assigned_to));
+$$;
+
+-- Índice de apoio para concluídas por empresa + data de conclusão
+CREATE INDEX IF NOT EXISTS idx_task_assignments_company_completed
+    ON task_assignments (company_id, completed_at DESC)
+    WHERE status = 'concluida';
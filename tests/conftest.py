@@ -0,0 +1,19 @@
+"""
+Configuração comum dos testes.
+
+Os testes rodam sempre no backend em memória com dados sintéticos
+(database/memory_backend.py) e com o modo estrito de projeções ligado. As
+variáveis precisam estar definidas antes do primeiro import de `config`.
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+os.environ["DATABASE_BACKEND"] = "memory"
+os.environ["MEMORY_BACKEND_SYNTHETIC"] = "true"
+os.environ["MEMORY_BACKEND_FAULTS"] = ""
+os.environ["STRICT_TASK_PROJECTIONS"] = "true"
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
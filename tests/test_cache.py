@@ -0,0 +1,140 @@
+"""
+TenantCache (database/cache.py): single-flight, invalidação durante a carga e
+invalidação feita pelas escritas.
+"""
+import threading
+import time
+
+import pytest
+
+from database.cache import TenantCache
+
+
+def _blocking_loader(value, started: threading.Event, release: threading.Event, calls: list):
+    def loader():
+        calls.append(value)
+        started.set()
+        release.wait(5)
+        return value
+    return loader
+
+
+def _wait_misses(cache: TenantCache, count: int) -> None:
+    """Espera `count` misses: a segunda chamada já entrou na carga em andamento."""
+    deadline = time.monotonic() + 5
+    while cache.misses < count and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+def _in_thread(target) -> tuple:
+    results = []
+    thread = threading.Thread(target=lambda: results.append(target()))
+    thread.start()
+    return thread, results
+
+
+def test_concurrent_misses_load_once():
+    cache = TenantCache(ttl=60)
+    started, release, calls = threading.Event(), threading.Event(), []
+    loader = _blocking_loader(['ana'], started, release, calls)
+
+    first, first_result = _in_thread(lambda: cache.get_or_load(1, 'users', loader))
+    started.wait(5)
+    second, second_result = _in_thread(lambda: cache.get_or_load(1, 'users', loader))
+    _wait_misses(cache, 2)
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert calls == [['ana']]
+    assert first_result == second_result == [['ana']]
+    assert cache.get(1, 'users') == ['ana']
+
+
+def test_invalidation_during_load_does_not_cache_stale_value():
+    cache = TenantCache(ttl=60)
+    started, release, calls = threading.Event(), threading.Event(), []
+
+    loading, result = _in_thread(
+        lambda: cache.get_or_load(1, 'users', _blocking_loader('antes', started, release, calls))
+    )
+    started.wait(5)
+    # Escrita concluída enquanto a leitura anterior a ela ainda estava em andamento
+    cache.invalidate(1, 'users')
+    release.set()
+    loading.join(5)
+
+    assert result == ['antes']
+    assert cache.get(1, 'users') is None
+    assert cache.get_or_load(1, 'users', lambda: 'depois') == 'depois'
+
+
+@pytest.mark.parametrize("invalidate", [
+    lambda cache: cache.invalidate(1),
+    lambda cache: cache.invalidate_everywhere('users'),
+    lambda cache: cache.clear(),
+], ids=["tenant", "everywhere", "clear"])
+def test_every_invalidation_discards_in_flight_load(invalidate):
+    cache = TenantCache(ttl=60)
+    started, release, calls = threading.Event(), threading.Event(), []
+
+    loading, _ = _in_thread(
+        lambda: cache.get_or_load(1, 'users', _blocking_loader('antes', started, release, calls))
+    )
+    started.wait(5)
+    invalidate(cache)
+    release.set()
+    loading.join(5)
+
+    assert cache.get(1, 'users') is None
+
+
+def test_loader_error_reaches_waiters_and_is_not_cached():
+    cache = TenantCache(ttl=60)
+    started, release = threading.Event(), threading.Event()
+
+    def failing():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        raise ConnectionError("backend fora")
+
+    errors, calls = [], []
+
+    def call():
+        try:
+            cache.get_or_load(1, 'users', failing)
+        except ConnectionError as e:
+            errors.append(e)
+
+    first = threading.Thread(target=call)
+    first.start()
+    started.wait(5)
+    second = threading.Thread(target=call)
+    second.start()
+    _wait_misses(cache, 2)
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert len(errors) == 2
+    assert len(calls) == 1
+    assert cache.get_or_load(1, 'users', lambda: 'ok') == 'ok'
+
+
+def test_delete_company_evicts_users_cached_by_id():
+    from auth.authentication import delete_company
+    from database.supabase_only_connection import db
+
+    company = db.client.table('companies').insert({'name': 'Empresa Excluída', 'active': True}).execute().data[0]
+    user = db.client.table('users').insert({
+        'company_id': company['id'], 'username': 'excluido', 'full_name': 'Excluído', 'role': 'user',
+        'team': 'fusao', 'active': True, 'password_hash': 'x',
+    }).execute().data[0]
+    # Busca só por id: fica em cache no tenant None
+    assert db.get_user_by_id(user['id'])['id'] == user['id']
+
+    success, _ = delete_company(company['id'])
+
+    assert success
+    assert db.get_user_by_id(user['id']) is None
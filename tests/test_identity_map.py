@@ -0,0 +1,80 @@
+"""
+Identity map por rerun (database/identity_map.py), compartilhado por `db` e `adb`.
+"""
+from database.async_connection import adb, gather
+from database.identity_map import rerun_scope
+from database.memory_backend import FaultInjector
+from database.supabase_only_connection import db
+
+
+def _backend_calls(monkeypatch) -> FaultInjector:
+    # Sem falhas: só conta os execute() que chegam ao backend em memória
+    faults = FaultInjector()
+    monkeypatch.setattr(db.client, 'faults', faults)
+    db.cache.clear()
+    return faults
+
+
+def test_sync_reads_are_memoized_per_rerun(monkeypatch):
+    faults = _backend_calls(monkeypatch)
+
+    with rerun_scope() as identity_map:
+        first = db.get_task_assignments(1, limit=5, profile='list')
+        again = db.get_task_assignments(company_id=1, limit=5, profile='list')
+
+    assert again is first
+    assert faults.calls == 1
+    assert identity_map.duplicates['db.get_task_assignments'] == 1
+
+
+def test_async_reads_share_the_rerun_map(monkeypatch):
+    faults = _backend_calls(monkeypatch)
+
+    with rerun_scope() as identity_map:
+        tasks, users = gather(
+            adb.get_task_assignments(1, limit=5, profile='list'),
+            adb.get_all_users(1),
+        )
+        assert db.get_all_users(1) is users
+        assert db.get_task_assignments(1, limit=5, profile='list') is tasks
+        # Linhas de usuários carregadas por `adb` atendem get_user_by_id
+        assert db.get_user_by_id(users[0]['id']) is users[0]
+
+    assert faults.calls == 2
+    assert identity_map.duplicates['db.get_all_users'] == 1
+    assert identity_map.duplicates['db.get_task_assignments'] == 1
+    assert identity_map.duplicates['db.get_user_by_id'] == 1
+
+
+def test_async_nested_reads_see_the_rerun_map(monkeypatch):
+    _backend_calls(monkeypatch)
+
+    with rerun_scope() as identity_map:
+        users = db.get_all_users(1)
+        gather(adb.get_task_assignments(1, assigned_to_name=users[0]['full_name'], profile='list'))
+
+    # get_all_users chamado de dentro da corrotina, no loop dedicado
+    assert identity_map.duplicates['adb.get_all_users'] == 1
+
+
+def test_writes_invalidate_async_reads(monkeypatch):
+    faults = _backend_calls(monkeypatch)
+
+    with rerun_scope():
+        gather(adb.get_all_companies())
+        company = db.get_all_companies()[0]
+        db.toggle_company_status(company["id"])
+        db.toggle_company_status(company["id"])
+        calls = faults.calls
+        db.get_all_companies()
+
+    assert faults.calls == calls + 1
+
+
+def test_outside_rerun_nothing_is_memoized(monkeypatch):
+    faults = _backend_calls(monkeypatch)
+
+    gather(adb.get_task_assignments(1, limit=5, profile='list'))
+    db.get_task_assignments(1, limit=5, profile='list')
+
+    assert faults.calls == 2
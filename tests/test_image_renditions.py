@@ -0,0 +1,66 @@
+"""
+Normalização das fotos na ingestão (utils/image_renditions.py).
+"""
+import io
+
+from PIL import Image
+
+from config import PHOTO_MAX_EDGE
+from utils.image_renditions import RENDITIONS, normalize_photo
+
+ORIENTATION = 0x0112
+
+
+def _encode(image, fmt: str, **options) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+
+def _photo(size=(64, 48)) -> Image.Image:
+    # Ruído: difícil de comprimir, a recodificação não tem como ficar menor
+    return Image.frombytes("RGB", size, bytes((i * 7919) % 251 for i in range(size[0] * size[1] * 3)))
+
+
+def test_small_photo_without_exif_is_kept_as_sent():
+    sent = _encode(_photo(), "JPEG", quality=40)
+
+    photo = normalize_photo(sent)
+
+    assert not photo.reencoded
+    assert photo.content == sent
+    assert (photo.ext, photo.content_type) == ("jpg", "image/jpeg")
+    assert set(photo.renditions) == set(RENDITIONS)
+
+
+def test_png_kept_with_its_own_type():
+    sent = _encode(Image.new("RGB", (16, 16), (200, 30, 30)), "PNG", optimize=True)
+
+    photo = normalize_photo(sent)
+
+    assert not photo.reencoded
+    assert photo.content == sent
+    assert (photo.ext, photo.content_type) == ("png", "image/png")
+
+
+def test_exif_is_always_stripped():
+    exif = Image.Exif()
+    exif[ORIENTATION] = 6
+    sent = _encode(_photo(), "JPEG", quality=40, exif=exif)
+
+    photo = normalize_photo(sent)
+
+    assert photo.reencoded
+    with Image.open(io.BytesIO(photo.content)) as image:
+        assert not image.getexif()
+        # Orientação 6: girada 90° nos pixels
+        assert image.size == (48, 64)
+
+
+def test_large_photo_is_resized():
+    sent = _encode(Image.new("RGB", (PHOTO_MAX_EDGE + 200, 100), (10, 120, 10)), "PNG")
+
+    photo = normalize_photo(sent)
+
+    assert photo.reencoded
+    assert max(photo.width, photo.height) == PHOTO_MAX_EDGE
@@ -0,0 +1,32 @@
+"""
+Tempo de import dos pontos de entrada (cold start) e bibliotecas carregadas sob demanda.
+
+Mesmos limites de `python -m utils.import_budget`: cada medição roda em um
+processo Python novo.
+"""
+import pytest
+
+from utils.import_budget import DEFAULT_BUDGETS, EAGER_FORBIDDEN, eagerly_loaded, measure_import
+
+
+@pytest.mark.parametrize("module", sorted(DEFAULT_BUDGETS))
+def test_import_within_budget(module):
+    elapsed = measure_import(module, runs=3)
+    assert elapsed <= DEFAULT_BUDGETS[module], f"import {module}: {elapsed:.3f}s"
+
+
+@pytest.mark.parametrize("module", sorted(EAGER_FORBIDDEN))
+def test_heavy_libraries_load_lazily(module):
+    assert eagerly_loaded(module, EAGER_FORBIDDEN[module]) == []
+
+
+
+def test_page_import_cost_in_diagnostics():
+    from tests.test_strict_projections import ADMIN, _run_page
+    from utils.instrumentation import page_import_report
+
+    at = _run_page("admin", ADMIN)
+
+    assert not at.exception, [e.value for e in at.exception]
+    assert "admin" in dict(page_import_report())
+    assert "Custo de import por página (primeira renderização)" in [e.label for e in at.expander]
@@ -0,0 +1,30 @@
+"""
+Fotos na view de detalhe: miniatura na grade, versão média ao ampliar.
+"""
+from tests.test_strict_projections import ADMIN, _assignment_id, _run_page
+
+
+def _image_urls(at) -> list:
+    return [img.url for element in at.get("image") for img in element.proto.imgs]
+
+
+def test_zoom_serves_medium_rendition():
+    from database.resilience import resilience
+    from database.supabase_only_connection import db
+
+    assignment_id = _assignment_id()
+    db.client.table('assignment_photos').insert({
+        'assignment_id': assignment_id, 'photo_url': 'https://cdn/o.jpg', 'photo_path': 'o.jpg',
+        'thumb_url': 'https://cdn/t.jpg', 'medium_url': 'https://cdn/m.jpg',
+        'original_name': 'o.jpg', 'uploaded_at': '2026-01-01T00:00:00',
+    }).execute()
+    resilience.reset()
+
+    at = _run_page("assignment_details", ADMIN, selected_assignment_id=assignment_id)
+    assert "https://cdn/t.jpg" in _image_urls(at)
+    assert "https://cdn/m.jpg" not in _image_urls(at)
+
+    next(b for b in at.button if b.label == "🔍 Ampliar").click().run()
+    assert not at.exception, [e.value for e in at.exception]
+    assert "https://cdn/m.jpg" in _image_urls(at)
+    assert "https://cdn/o.jpg" not in _image_urls(at)
@@ -0,0 +1,34 @@
+"""
+Job de retenção das notificações (database/prune_notifications.py).
+"""
+import sys
+from datetime import datetime, timedelta
+
+from database import prune_notifications
+
+
+def _notification(user_id: int, days_ago: int, read: bool) -> dict:
+    return {
+        'user_id': user_id, 'title': 'Teste', 'message': 'retenção', 'type': 'info', 'read': read,
+        'created_at': (datetime.utcnow() - timedelta(days=days_ago)).isoformat(),
+    }
+
+
+def test_prunes_only_old_read_notifications(monkeypatch):
+    from database.supabase_only_connection import db
+
+    client = db.client
+    # Tabela trocada só durante o teste (o backend em memória é compartilhado)
+    monkeypatch.setitem(client.tables, 'notifications', [
+        _notification(1, 120, read=True),
+        _notification(1, 120, read=False),
+        _notification(1, 10, read=True),
+    ])
+    monkeypatch.setattr(sys, 'argv', ['prune_notifications', '--days', '90'])
+
+    assert prune_notifications.main() == 0
+
+    remaining = client.tables['notifications']
+    assert len(remaining) == 2
+    assert all(not n['read'] or n['created_at'] > (datetime.utcnow() - timedelta(days=90)).isoformat()
+               for n in remaining)
@@ -0,0 +1,255 @@
+"""
+Retry, circuit breaker, hedge e fallback de database/resilience.py.
+
+Determinísticos: falhas exatas via FaultInjector do backend em memória e
+rng/sleep/clock injetados no Resilience (nenhum backoff espera de verdade).
+"""
+import asyncio
+import random
+import threading
+
+import pytest
+
+from database.memory_backend import FaultInjector, MemoryClient
+from database.resilience import CLOSED, HALF_OPEN, OPEN, CircuitOpenError, Resilience
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class QueryError(Exception):
+    """Erro com `code`, como postgrest.APIError."""
+
+    def __init__(self, code: str):
+        super().__init__(code)
+        self.code = code
+
+
+class FailingQuery:
+    def __init__(self, error: Exception):
+        self.error = error
+        self.calls = 0
+
+    def execute(self):
+        self.calls += 1
+        raise self.error
+
+
+@pytest.fixture
+def client():
+    client = MemoryClient()
+    client.tables['users'] = [{'id': 1, 'company_id': 1, 'username': 'ana'}]
+    client.faults = FaultInjector(seed=1)
+    return client
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def sleeps():
+    return []
+
+
+@pytest.fixture
+def resilience(clock, sleeps):
+    return Resilience(attempts=3, base_delay_ms=100, max_delay_ms=1000, hedge_after_ms=20,
+                      failure_threshold=2, reset_seconds=30, max_entries=16, fallback_max_age=60,
+                      rng=random.Random(0), sleep=sleeps.append, clock=clock)
+
+
+def stats_of(resilience: Resilience, endpoint: str) -> dict:
+    return next(row for row in resilience.stats() if row['endpoint'] == endpoint)
+
+
+# === RETRY ===
+def test_transient_errors_are_retried(client, resilience, sleeps):
+    client.faults.fail_next(2)
+
+    result = resilience.execute('users', client.table('users').select('*'))
+
+    assert result.data == [{'id': 1, 'company_id': 1, 'username': 'ana'}]
+    assert client.faults.calls == 3
+    assert stats_of(resilience, 'users')['retries'] == 2
+    # Backoff com jitter: dentro do teto de cada tentativa (100ms, 200ms)
+    assert len(sleeps) == 2
+    assert 0 <= sleeps[0] <= 0.1 and 0 <= sleeps[1] <= 0.2
+
+
+def test_permanent_errors_are_not_retried(resilience, sleeps):
+    query = FailingQuery(QueryError('42P01'))
+
+    with pytest.raises(QueryError):
+        resilience.execute('users', query)
+
+    assert query.calls == 1
+    assert sleeps == []
+    assert resilience.breaker('users').state == CLOSED
+
+
+def test_exhausted_retries_raise_without_fallback(client, resilience):
+    client.faults.down = True
+
+    with pytest.raises(ConnectionError):
+        resilience.execute('users', client.table('users').select('*'))
+
+    assert client.faults.calls == 3
+    assert stats_of(resilience, 'users')['failures'] == 1
+
+
+def test_async_transient_errors_are_retried(client, resilience):
+    client.faults.fail_next(1)
+    # aexecute usa asyncio.sleep: backoff zerado para não esperar
+    resilience.base_delay_ms = 0
+
+    result = asyncio.run(resilience.aexecute('users', client.table('users').select('*')))
+
+    assert len(result.data) == 1
+    assert client.faults.calls == 2
+    assert stats_of(resilience, 'users')['retries'] == 1
+
+
+# === CIRCUIT BREAKER ===
+def test_breaker_opens_half_opens_and_closes(client, resilience, clock):
+    query = client.table('users').select('*')
+    breaker = resilience.breaker('users')
+    client.faults.down = True
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            resilience.execute('users', query)
+    assert breaker.state == OPEN
+    assert stats_of(resilience, 'users')['opens'] == 1
+
+    # Aberto: falha na hora, sem chegar ao backend
+    calls = client.faults.calls
+    with pytest.raises(CircuitOpenError):
+        resilience.execute('users', query)
+    assert client.faults.calls == calls
+    assert stats_of(resilience, 'users')['short_circuits'] == 1
+
+    # Passado o reset, uma única chamada de teste passa (meio-aberto) e fecha o breaker
+    client.faults.down = False
+    clock.advance(30)
+    seen = []
+
+    class ProbeQuery:
+        def execute(self):
+            seen.append(breaker.state)
+            # Outra chamada durante o teste continua recusada
+            with pytest.raises(CircuitOpenError):
+                resilience.execute('users', query)
+            return query.execute()
+
+    resilience.execute('users', ProbeQuery())
+    assert seen == [HALF_OPEN]
+    assert breaker.state == CLOSED
+    assert breaker.failures == 0
+
+
+def test_failed_probe_reopens_breaker(client, resilience, clock):
+    query = client.table('users').select('*')
+    breaker = resilience.breaker('users')
+    client.faults.down = True
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            resilience.execute('users', query)
+
+    clock.advance(30)
+    with pytest.raises(ConnectionError):
+        resilience.execute('users', query)
+
+    assert breaker.state == OPEN
+    assert breaker.opened_at == clock.now
+    assert stats_of(resilience, 'users')['opens'] == 2
+
+
+# === HEDGE ===
+def test_hedge_returns_first_response(resilience):
+    release = threading.Event()
+
+    class SlowFirstQuery:
+        def __init__(self):
+            self.calls = 0
+            self._lock = threading.Lock()
+
+        def execute(self):
+            with self._lock:
+                self.calls += 1
+                call = self.calls
+            if call == 1:
+                # A original só termina depois que a cópia respondeu
+                release.wait(5)
+                return 'original'
+            return 'hedge'
+
+    query = SlowFirstQuery()
+    try:
+        result = resilience.execute('users', query, hedge=True)
+    finally:
+        release.set()
+
+    assert result == 'hedge'
+    assert query.calls == 2
+    stats = stats_of(resilience, 'users')
+    assert stats['hedges'] == 1
+    assert stats['hedge_wins'] == 1
+
+
+def test_fast_response_is_not_hedged(client, resilience):
+    result = resilience.execute('users', client.table('users').select('*'), hedge=True)
+
+    assert len(result.data) == 1
+    assert client.faults.calls == 1
+    assert stats_of(resilience, 'users')['hedges'] == 0
+
+
+# === FALLBACK ===
+def test_fallback_serves_last_good_response(client, resilience):
+    query = client.table('users').select('*')
+    key = ('get_all_users', 1)
+    good = resilience.execute('users', query, key=key)
+
+    client.faults.down = True
+    assert resilience.execute('users', query, key=key) is good
+    # Breaker aberto: o fallback também cobre o curto-circuito
+    assert resilience.execute('users', query, key=key) is good
+    assert resilience.execute('users', query, key=key) is good
+
+    stats = stats_of(resilience, 'users')
+    assert stats['fallbacks'] == 3
+    assert stats['short_circuits'] == 1
+
+
+def test_fallback_is_per_key(client, resilience):
+    query = client.table('users').select('*')
+    resilience.execute('users', query, key=('get_all_users', 1))
+
+    client.faults.down = True
+    with pytest.raises(ConnectionError):
+        resilience.execute('users', query, key=('get_all_users', 2))
+
+
+def test_fallback_expires_after_max_age(client, resilience, clock):
+    query = client.table('users').select('*')
+    key = ('get_all_users', 1)
+    good = resilience.execute('users', query, key=key)
+
+    client.faults.down = True
+    clock.advance(60)
+    assert resilience.execute('users', query, key=key) is good
+
+    clock.advance(1)
+    with pytest.raises(ConnectionError):
+        resilience.execute('users', query, key=key)
+    assert key not in resilience._last_good
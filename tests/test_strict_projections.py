@@ -0,0 +1,81 @@
+"""
+Cada view renderizada com STRICT_TASK_PROJECTIONS ligado (via Streamlit AppTest).
+
+No modo estrito, ler um campo de tarefa fora do perfil de projeção buscado
+levanta KeyError (database/projections.py::ProjectedRow); aqui isso aparece
+como exceção da página.
+"""
+import os
+
+import pytest
+
+from tests.conftest import ROOT
+
+APP_PATH = os.path.join(ROOT, "app.py")
+
+ADMIN = {
+    "user_id": 1, "company_id": 1, "company_name": "Empresa 1", "username": "admin1",
+    "full_name": "Gerente 1", "team": "fusao", "role": "admin", "is_super_admin": False,
+}
+
+
+def _session(user: dict) -> dict:
+    return {"logged_in": True, "cookie_load_attempted": True, **user}
+
+
+def _collaborator() -> dict:
+    from database.supabase_only_connection import db
+
+    user = next(u for u in db.get_all_users(1) if u.get("role") == "user")
+    return {
+        "user_id": user["id"], "company_id": 1, "company_name": "Empresa 1", "username": user["username"],
+        "full_name": user["full_name"], "team": user["team"], "role": "user", "is_super_admin": False,
+    }
+
+
+def _assignment_id() -> int:
+    from database.supabase_only_connection import db
+
+    tasks, _, _ = db.get_task_assignments_keyset(1, page_size=1, count=None, profile="list")
+    return tasks[0]["id"]
+
+
+def _run_page(page: str, user: dict, **state):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    for key, value in {**_session(user), "current_page": page, **state}.items():
+        at.session_state[key] = value
+    at.run()
+    return at
+
+
+def test_strict_mode_enabled():
+    from config import STRICT_TASK_PROJECTIONS
+
+    assert STRICT_TASK_PROJECTIONS
+
+
+@pytest.mark.parametrize("page", [
+    "dashboard",
+    "notifications",
+    "task_management",
+    "completed_tasks",
+    "admin",
+    "manager_dashboard",
+    "task_details",
+])
+def test_admin_pages_read_only_projected_fields(page):
+    at = _run_page(page, ADMIN)
+    assert not at.exception, [e.value for e in at.exception]
+
+
+def test_assignment_details_reads_only_projected_fields():
+    at = _run_page("assignment_details", ADMIN, selected_assignment_id=_assignment_id())
+    assert not at.exception, [e.value for e in at.exception]
+
+
+@pytest.mark.parametrize("page", ["dashboard", "notifications"])
+def test_collaborator_pages_read_only_projected_fields(page):
+    at = _run_page(page, _collaborator())
+    assert not at.exception, [e.value for e in at.exception]
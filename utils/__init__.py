@@ -1,5 +1,12 @@
-from .file_handler import save_uploaded_files, get_task_photos, delete_task_photos
-from .export import export_to_excel, export_to_pdf
+# Exports carregados sob demanda: `from utils.push_notification import ...` não
+# deve importar file_handler (SQLAlchemy) nem export (pandas/reportlab).
+_LAZY_EXPORTS = {
+    "save_uploaded_files": "file_handler",
+    "get_task_photos": "file_handler",
+    "delete_task_photos": "file_handler",
+    "export_to_excel": "export",
+    "export_to_pdf": "export",
+}
 
 __all__ = [
     "save_uploaded_files",
@@ -8,3 +15,11 @@ __all__ = [
     "export_to_excel",
     "export_to_pdf",
 ]
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        from importlib import import_module
+        module = import_module(f".{_LAZY_EXPORTS[name]}", __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
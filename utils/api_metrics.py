@@ -0,0 +1,196 @@
+"""
+Métricas de requisição da API Flask no formato texto do Prometheus.
+
+`init_request_metrics(app)` registra hooks que medem, por rota e método:
+latência (histograma), requisições por status, tamanho de requisição/resposta
+e requisições em andamento. `render_prometheus()` gera o texto servido em
+/metrics, incluindo os histogramas das chamadas ao banco/storage
+(utils/instrumentation.py), para separar tempo de Flask, bcrypt e Supabase,
+os eventos de retry/hedge/circuit breaker (database/resilience.py) e a
+compressão das fotos normalizadas por empresa (utils/image_renditions.py).
+"""
+import threading
+import time
+from collections import Counter
+
+from utils.instrumentation import Histogram, registry
+from database.resilience import resilience, STATE_VALUES
+from utils.image_renditions import compression_stats
+
+# Limites dos buckets em segundos (latência) e bytes (payload)
+REQUEST_BUCKETS_S = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+_lock = threading.Lock()
+_latency: dict = {}
+_request_sizes: dict = {}
+_response_sizes: dict = {}
+_status: Counter = Counter()
+_in_flight = 0
+
+
+def _observe(series: dict, key: tuple, buckets: tuple, value: float) -> None:
+    histogram = series.get(key)
+    if histogram is None:
+        histogram = series[key] = Histogram(buckets)
+    histogram.observe(value)
+
+
+def init_request_metrics(app) -> None:
+    """Registra os hooks de medição na aplicação Flask."""
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer():
+        global _in_flight
+        g._metrics_started = time.perf_counter()
+        with _lock:
+            _in_flight += 1
+
+    @app.after_request
+    def _record(response):
+        started = g.pop("_metrics_started", None)
+        if started is None:
+            return response
+        route = request.url_rule.rule if request.url_rule else "<sem rota>"
+        key = (request.method, route)
+        response_size = response.calculate_content_length() or 0
+        with _lock:
+            _observe(_latency, key, REQUEST_BUCKETS_S, time.perf_counter() - started)
+            _observe(_request_sizes, key, SIZE_BUCKETS, request.content_length or 0)
+            _observe(_response_sizes, key, SIZE_BUCKETS, response_size)
+            _status[key + (str(response.status_code),)] += 1
+        return response
+
+    @app.teardown_request
+    def _finish(exc):
+        global _in_flight
+        with _lock:
+            _in_flight -= 1
+
+
+# === FORMATO PROMETHEUS ===
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _histogram_lines(name: str, histogram: Histogram, scale: float = 1.0, **labels) -> list:
+    """Linhas _bucket/_sum/_count (buckets cumulativos; `scale` converte a unidade, ex.: ms → s)."""
+    lines = []
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(f"{name}_bucket{_labels(**labels, le=f'{bound * scale:g}')} {cumulative}")
+    lines.append(f"{name}_bucket{_labels(**labels, le='+Inf')} {histogram.count}")
+    lines.append(f"{name}_sum{_labels(**labels)} {histogram.total * scale:.6f}")
+    lines.append(f"{name}_count{_labels(**labels)} {histogram.count}")
+    return lines
+
+
+def render_prometheus() -> str:
+    """Todas as métricas (requisições da API + chamadas ao banco/storage) em texto Prometheus."""
+    lines = []
+    with _lock:
+        lines += [
+            "# HELP api_request_duration_seconds Latência das requisições por rota.",
+            "# TYPE api_request_duration_seconds histogram",
+        ]
+        for (method, route), histogram in sorted(_latency.items()):
+            lines += _histogram_lines("api_request_duration_seconds", histogram, method=method, route=route)
+
+        lines += [
+            "# HELP api_requests_total Requisições por rota e status HTTP.",
+            "# TYPE api_requests_total counter",
+        ]
+        for (method, route, status), count in sorted(_status.items()):
+            lines.append(f"api_requests_total{_labels(method=method, route=route, status=status)} {count}")
+
+        for name, series, help_text in (
+            ("api_request_size_bytes", _request_sizes, "Tamanho do corpo da requisição."),
+            ("api_response_size_bytes", _response_sizes, "Tamanho do corpo da resposta."),
+        ):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            for (method, route), histogram in sorted(series.items()):
+                lines += _histogram_lines(name, histogram, method=method, route=route)
+
+        lines += [
+            "# HELP api_requests_in_flight Requisições em andamento.",
+            "# TYPE api_requests_in_flight gauge",
+            f"api_requests_in_flight {_in_flight}",
+        ]
+
+    calls = sorted(registry.histograms().items())
+    lines += [
+        "# HELP db_call_duration_seconds Latência das chamadas ao banco/storage.",
+        "# TYPE db_call_duration_seconds histogram",
+    ]
+    for call, histogram in calls:
+        lines += _histogram_lines("db_call_duration_seconds", histogram, scale=0.001, call=call)
+
+    lines += [
+        "# HELP db_call_rows_total Linhas retornadas pelas chamadas ao banco.",
+        "# TYPE db_call_rows_total counter",
+    ]
+    lines += [f"db_call_rows_total{_labels(call=call)} {h.rows}" for call, h in calls]
+
+    lines += [
+        "# HELP db_call_response_bytes_total Bytes de resposta recebidos pelas chamadas.",
+        "# TYPE db_call_response_bytes_total counter",
+    ]
+    lines += [f"db_call_response_bytes_total{_labels(call=call)} {h.bytes}" for call, h in calls]
+
+    lines += [
+        "# HELP db_call_errors_total Erros das chamadas por classe.",
+        "# TYPE db_call_errors_total counter",
+    ]
+    for call, histogram in calls:
+        for error, count in sorted(histogram.errors.items()):
+            lines.append(f"db_call_errors_total{_labels(call=call, error=error)} {count}")
+
+    endpoints = resilience.stats()
+    lines += [
+        "# HELP db_resilience_events_total Retries, hedges, falhas, aberturas do breaker e fallbacks por endpoint.",
+        "# TYPE db_resilience_events_total counter",
+    ]
+    for row in endpoints:
+        for event, value in row.items():
+            if event not in ("endpoint", "state"):
+                lines.append(f"db_resilience_events_total{_labels(endpoint=row['endpoint'], event=event)} {value}")
+
+    lines += [
+        "# HELP db_circuit_state Estado do circuit breaker (0 fechado, 1 meio-aberto, 2 aberto).",
+        "# TYPE db_circuit_state gauge",
+    ]
+    lines += [
+        f"db_circuit_state{_labels(endpoint=row['endpoint'])} {STATE_VALUES[row['state']]}" for row in endpoints
+    ]
+
+    companies = compression_stats.stats()
+    lines += [
+        "# HELP photo_normalized_total Fotos normalizadas na ingestão por empresa.",
+        "# TYPE photo_normalized_total counter",
+    ]
+    lines += [f"photo_normalized_total{_labels(company=row['company_id'])} {row['photos']}" for row in companies]
+    lines += [
+        "# HELP photo_normalize_bytes_total Bytes recebidos (source) e gravados (output) por empresa.",
+        "# TYPE photo_normalize_bytes_total counter",
+    ]
+    for row in companies:
+        for stage in ("source", "output"):
+            lines.append(
+                f"photo_normalize_bytes_total{_labels(company=row['company_id'], stage=stage)} {row[stage + '_bytes']}"
+            )
+    lines += [
+        "# HELP photo_normalize_seconds_total Tempo gasto normalizando fotos por empresa.",
+        "# TYPE photo_normalize_seconds_total counter",
+    ]
+    lines += [
+        f"photo_normalize_seconds_total{_labels(company=row['company_id'])} {row['elapsed_ms'] / 1000:.6f}"
+        for row in companies
+    ]
+
+    return "\n".join(lines) + "\n"
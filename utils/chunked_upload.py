@@ -0,0 +1,236 @@
+"""
+Ingestão de fotos em streaming, por blocos, sem carregar o arquivo inteiro na memória.
+
+- `sniff_image_type` valida o tipo (JPEG, PNG, WebP, HEIC) pelos primeiros
+  bytes (magic bytes), não pela extensão: um .jpg que não é JPEG é recusado
+  antes de qualquer envio.
+- `copy_stream` grava um stream em disco bloco a bloco, abortando assim que o
+  tamanho passa do limite (o tamanho real, não o informado pelo cliente).
+- `upload_stream` envia ao Supabase Storage: arquivos de até um bloco em uma
+  requisição; maiores pelo protocolo TUS (upload resumível), um bloco de
+  UPLOAD_CHUNK_MB por vez, retomando do último offset confirmado após falhas
+  transitórias.
+
+O pico de memória por upload fica limitado a um bloco, independente do tamanho do arquivo.
+"""
+import base64
+import sys
+import os
+import time
+from typing import BinaryIO, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    SUPABASE_URL, SUPABASE_KEY, SUPABASE_SERVICE_KEY, SUPABASE_BUCKET,
+    UPLOAD_CHUNK_MB, RETRY_ATTEMPTS, RETRY_BASE_DELAY_MS,
+)
+
+# O endpoint TUS do Supabase Storage exige blocos de exatamente 6 MB (exceto o último)
+CHUNK_SIZE = int(UPLOAD_CHUNK_MB * 1024 * 1024)
+
+# Bytes lidos para identificar o tipo do arquivo
+SNIFF_BYTES = 16
+
+# Assinaturas aceitas → tipo (extensões de ALLOWED_EXTENSIONS)
+MAGIC_NUMBERS = {
+    b"\xff\xd8\xff": "jpeg",
+    b"\x89PNG\r\n\x1a\n": "png",
+}
+
+# WebP: "RIFF" <tamanho> "WEBP"; HEIC/HEIF: <tamanho> "ftyp" <marca> (contêiner ISO BMFF)
+HEIF_BRANDS = {b"heic", b"heix", b"hevc", b"hevx", b"heim", b"heis", b"mif1", b"msf1"}
+
+EXTENSION_TYPES = {
+    "jpg": "jpeg", "jpeg": "jpeg", "png": "png", "webp": "webp", "heic": "heic", "heif": "heic",
+}
+
+TUS_VERSION = "1.0.0"
+
+
+class UploadTooLarge(Exception):
+    """O stream passou do tamanho máximo permitido."""
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Tipo da imagem ('jpeg', 'png', 'webp', 'heic') pelos primeiros bytes, ou None se não reconhecido."""
+    for magic, kind in MAGIC_NUMBERS.items():
+        if head.startswith(magic):
+            return kind
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    if head[4:8] == b"ftyp" and head[8:12] in HEIF_BRANDS:
+        return "heic"
+    return None
+
+
+def validate_image_stream(fileobj: BinaryIO, filename: str) -> tuple[bool, str]:
+    """Confere os magic bytes contra a extensão, lendo só o início (o stream volta à posição 0)."""
+    fileobj.seek(0)
+    head = fileobj.read(SNIFF_BYTES)
+    fileobj.seek(0)
+    kind = sniff_image_type(head)
+    ext = filename.rsplit(".", 1)[1].lower() if "." in filename else ""
+    if kind is None:
+        return False, f"Arquivo '{filename}' não é uma imagem JPG, PNG, WebP ou HEIC válida."
+    if EXTENSION_TYPES.get(ext) != kind:
+        return False, f"Arquivo '{filename}' tem extensão .{ext}, mas o conteúdo é {kind.upper()}."
+    if kind == "heic":
+        from utils.image_renditions import heif_supported
+        if not heif_supported():
+            return False, f"Arquivo '{filename}' é HEIC, mas o servidor não tem suporte (pacote pillow-heif)."
+    return True, ""
+
+
+def iter_chunks(fileobj: BinaryIO, chunk_size: int = CHUNK_SIZE):
+    """Itera sobre o stream em blocos de até `chunk_size` bytes."""
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def copy_stream(source: BinaryIO, dest_path: str, max_bytes: int, chunk_size: int = 1024 * 1024) -> int:
+    """Grava `source` em `dest_path` bloco a bloco. Retorna o tamanho.
+
+    Levanta UploadTooLarge (e apaga o arquivo parcial) se passar de `max_bytes`.
+    """
+    written = 0
+    try:
+        with open(dest_path, "wb") as dest:
+            for chunk in iter_chunks(source, chunk_size):
+                written += len(chunk)
+                if written > max_bytes:
+                    raise UploadTooLarge(dest_path)
+                dest.write(chunk)
+    except BaseException:
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        raise
+    return written
+
+
+def stream_size(fileobj: BinaryIO) -> int:
+    """Tamanho de um stream posicionável, sem lê-lo (volta à posição 0)."""
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(0)
+    return size
+
+
+# === SUPABASE STORAGE ===
+def upload_stream(bucket, path: str, fileobj: BinaryIO, content_type: str, size: int = None) -> None:
+    """Envia um stream ao storage: uma requisição até CHUNK_SIZE, TUS resumível acima disso.
+
+    `bucket` é o `storage.from_(SUPABASE_BUCKET)` do cliente com service key.
+    """
+    size = stream_size(fileobj) if size is None else size
+    if size <= CHUNK_SIZE:
+        bucket.upload(path=path, file=fileobj.read(), file_options={"content-type": content_type})
+        return
+    ResumableUpload(path, size, content_type).upload(fileobj)
+
+
+def _tus_metadata(**values) -> str:
+    return ",".join(f"{k} {base64.b64encode(str(v).encode()).decode()}" for k, v in values.items())
+
+
+class ResumableUpload:
+    """Upload TUS ao endpoint /storage/v1/upload/resumable do Supabase.
+
+    Cada bloco é lido do stream só quando vai ser enviado; após uma falha
+    transitória, o offset confirmado é consultado (HEAD) e o envio continua dali.
+    """
+
+    def __init__(self, path: str, size: int, content_type: str):
+        self.path = path
+        self.size = size
+        self.content_type = content_type
+        self.location: Optional[str] = None
+        key = SUPABASE_SERVICE_KEY or SUPABASE_KEY
+        self.headers = {
+            "authorization": f"Bearer {key}",
+            "apikey": key,
+            "tus-resumable": TUS_VERSION,
+        }
+
+    def _client(self):
+        from utils.http_transport import get_http_client
+        return get_http_client()
+
+    def create(self) -> str:
+        """Cria a sessão de upload e retorna a URL (Location) para os blocos."""
+        response = self._client().post(
+            f"{SUPABASE_URL}/storage/v1/upload/resumable",
+            headers={
+                **self.headers,
+                "upload-length": str(self.size),
+                "x-upsert": "false",
+                "upload-metadata": _tus_metadata(
+                    bucketName=SUPABASE_BUCKET,
+                    objectName=self.path,
+                    contentType=self.content_type,
+                    cacheControl=3600,
+                ),
+            },
+        )
+        response.raise_for_status()
+        self.location = response.headers["location"]
+        return self.location
+
+    def offset(self) -> int:
+        """Bytes já confirmados pelo servidor."""
+        response = self._client().head(self.location, headers=self.headers)
+        response.raise_for_status()
+        return int(response.headers["upload-offset"])
+
+    def _send_chunk(self, offset: int, chunk: bytes) -> int:
+        response = self._client().patch(
+            self.location,
+            content=chunk,
+            headers={
+                **self.headers,
+                "upload-offset": str(offset),
+                "content-type": "application/offset+octet-stream",
+            },
+        )
+        response.raise_for_status()
+        return int(response.headers["upload-offset"])
+
+    def upload(self, fileobj: BinaryIO) -> None:
+        """Envia o stream inteiro, retomando após falhas transitórias (até RETRY_ATTEMPTS seguidas)."""
+        from database.resilience import is_transient
+
+        if self.location is None:
+            self.create()
+        offset, failures = 0, 0
+        while offset < self.size:
+            try:
+                fileobj.seek(offset)
+                offset = self._send_chunk(offset, fileobj.read(CHUNK_SIZE))
+                failures = 0
+            except Exception as e:
+                failures += 1
+                if not _is_retryable(e, is_transient) or failures >= RETRY_ATTEMPTS:
+                    self.abort()
+                    raise
+                time.sleep(RETRY_BASE_DELAY_MS * 2 ** (failures - 1) / 1000)
+                offset = self.offset()
+
+    def abort(self) -> None:
+        """Descarta a sessão no servidor (melhor esforço: expira sozinha de qualquer forma)."""
+        if self.location is None:
+            return
+        try:
+            self._client().delete(self.location, headers=self.headers)
+        except Exception as e:
+            print(f"Aviso: Erro ao cancelar upload resumível {self.path}: {e}")
+
+
+def _is_retryable(error: Exception, is_transient) -> bool:
+    """Falhas de rede e respostas 5xx/409 (offset divergente) do servidor TUS valem nova tentativa."""
+    if is_transient(error):
+        return True
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    return status is not None and (status >= 500 or status == 409)
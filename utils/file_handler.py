@@ -3,6 +3,9 @@ Gerenciamento de upload e download de fotos usando Supabase Storage.
 """
 
 import uuid
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from typing import List, Optional
 import sys
@@ -18,13 +21,28 @@ from config import (
     MAX_FILE_SIZE_BYTES,
     MAX_FILES_PER_TASK,
     ALLOWED_EXTENSIONS,
+    UPLOAD_CONCURRENCY,
+    SIGNED_URL_EXPIRES_SECONDS,
+    SIGNED_URL_REFRESH_MARGIN_SECONDS,
+    SIGNED_URL_CACHE_MAX_ENTRIES,
+    PHOTO_KEEP_SOURCE,
 )
-from database.connection import SessionLocal
-from database.models import TaskPhoto
+from database.cache import TenantCache
+from utils.instrumentation import instrument, record_error
+from utils.image_renditions import normalize_photo, rendition_path, source_path, RENDITION_CONTENT_TYPE
+from utils.chunked_upload import upload_stream, validate_image_stream
 
-# Clientes Supabase (inicializados sob demanda)
+# Clientes Supabase (inicializados sob demanda, sobre o pool de utils/http_transport.py)
 _supabase_client = None
 _supabase_service_client = None
+_client_lock = threading.Lock()
+
+# URLs assinadas por caminho no bucket, descartadas SIGNED_URL_REFRESH_MARGIN_SECONDS
+# antes de expirarem (a próxima leitura assina de novo, nunca serve URL vencida)
+_signed_urls = TenantCache(
+    ttl=max(0, SIGNED_URL_EXPIRES_SECONDS - SIGNED_URL_REFRESH_MARGIN_SECONDS),
+    max_entries=SIGNED_URL_CACHE_MAX_ENTRIES,
+)
 
 
 def get_supabase_client():
@@ -36,8 +54,11 @@ def get_supabase_client():
                 "SUPABASE_URL e SUPABASE_KEY devem estar configurados. "
                 "Verifique o arquivo secrets.toml ou variáveis de ambiente."
             )
-        from supabase import create_client
-        _supabase_client = create_client(SUPABASE_URL, SUPABASE_KEY)
+        with _client_lock:
+            if _supabase_client is None:
+                from supabase import create_client
+                from utils.http_transport import supabase_options
+                _supabase_client = create_client(SUPABASE_URL, SUPABASE_KEY, supabase_options())
     return _supabase_client
 
 
@@ -51,8 +72,11 @@ def get_supabase_service_client():
             raise ValueError(
                 "SUPABASE_URL e SUPABASE_SERVICE_KEY (ou SUPABASE_KEY) devem estar configurados."
             )
-        from supabase import create_client
-        _supabase_service_client = create_client(SUPABASE_URL, key)
+        with _client_lock:
+            if _supabase_service_client is None:
+                from supabase import create_client
+                from utils.http_transport import supabase_options
+                _supabase_service_client = create_client(SUPABASE_URL, key, supabase_options())
     return _supabase_service_client
 
 
@@ -82,20 +106,114 @@ def get_content_type(filename: str) -> str:
         "jpg": "image/jpeg",
         "jpeg": "image/jpeg",
         "png": "image/png",
+        "webp": "image/webp",
+        "heic": "image/heic",
+        "heif": "image/heif",
     }
     return content_types.get(ext, "application/octet-stream")
 
 
+def _upload_photo(supabase, file, company_id: int, uploaded_paths: list) -> dict:
+    """Normaliza um arquivo e envia a foto e suas renditions ao storage (roda em uma thread do pool).
+
+    Cada caminho enviado entra em `uploaded_paths` logo após o upload, para que
+    a limpeza alcance também os envios parciais de um arquivo que falhou.
+    """
+    bucket = supabase.storage.from_(SUPABASE_BUCKET)
+
+    # Decodifica, orienta, remove EXIF, limita o tamanho e recodifica (utils/image_renditions.py)
+    file.seek(0)
+    photo = normalize_photo(file, company_id)
+    if photo is None:
+        # Conteúdo não decodificável: guardado como veio, sem renditions (as views usam o original)
+        unique_name = generate_unique_filename(file.name, company_id)
+        file.seek(0)
+        upload_stream(bucket, unique_name, file, get_content_type(file.name), size=file.size)
+        uploaded_paths.append(unique_name)
+        return {
+            "file_path": unique_name,
+            "thumb_path": None,
+            "medium_path": None,
+            "source_path": None,
+            "original_name": file.name,
+            "file_size": file.size,
+        }
+
+    # Upload para o Supabase Storage (service_role key para bypass RLS)
+    unique_name = generate_unique_filename(f"{file.name.rsplit('.', 1)[0]}.{photo.ext}", company_id)
+    bucket.upload(
+        path=unique_name,
+        file=photo.content,
+        file_options={"content-type": photo.content_type}
+    )
+    uploaded_paths.append(unique_name)
+
+    # Arquivo enviado, sem normalização (opcional): em streaming, resumível acima de um bloco.
+    # Se a foto não foi recodificada, ela já é o próprio arquivo enviado.
+    kept_source = None
+    if PHOTO_KEEP_SOURCE and photo.reencoded:
+        kept_source = source_path(unique_name, file.name)
+        file.seek(0)
+        upload_stream(bucket, kept_source, file, get_content_type(file.name), size=file.size)
+        uploaded_paths.append(kept_source)
+
+    # Miniatura e versão média ao lado da foto
+    rendition_paths = {}
+    for name, content in photo.renditions.items():
+        path = rendition_path(unique_name, name)
+        bucket.upload(
+            path=path,
+            file=content,
+            file_options={"content-type": RENDITION_CONTENT_TYPE}
+        )
+        uploaded_paths.append(path)
+        rendition_paths[name] = path
+
+    return {
+        "file_path": unique_name,
+        "thumb_path": rendition_paths.get("thumb"),
+        "medium_path": rendition_paths.get("medium"),
+        "source_path": kept_source,
+        "original_name": file.name,
+        "file_size": len(photo.content),
+    }
+
+
+def _remove_uploaded(paths: list) -> None:
+    """Remove do storage, em paralelo, os objetos já enviados (lotes de até 10 caminhos)."""
+    if not paths:
+        return
+    bucket = get_supabase_service_client().storage.from_(SUPABASE_BUCKET)
+    batches = [paths[i:i + 10] for i in range(0, len(paths), 10)]
+    with ThreadPoolExecutor(max_workers=min(UPLOAD_CONCURRENCY, len(batches))) as pool:
+        futures = {pool.submit(bucket.remove, batch): batch for batch in batches}
+        for future, batch in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                record_error(e)
+                print(f"Aviso: Erro ao remover arquivos do storage {batch}: {e}")
+
+
+@instrument("storage.save_uploaded_files")
 def save_uploaded_files(
-    uploaded_files: list, task_id: int, company_id: int = None
+    uploaded_files: list, task_id: int, company_id: int = None, on_progress=None
 ) -> tuple[bool, str, List[dict]]:
     """
     Salva os arquivos enviados no Supabase Storage e registra no banco.
 
+    Os arquivos são normalizados e enviados em paralelo (até UPLOAD_CONCURRENCY
+    por vez), cada um com sua miniatura e versão média (utils/image_renditions.py). É tudo ou
+    nada: se algum envio falhar, os objetos já enviados são removidos e nenhuma
+    linha é gravada; com todos enviados, as linhas de task_photos são inseridas
+    em um único commit.
+
     Args:
         uploaded_files: Lista de arquivos do Streamlit file_uploader
         task_id: ID da tarefa associada
         company_id: ID da empresa (para organização de pastas)
+        on_progress: Callback opcional (concluídos, total, nome do arquivo), chamado
+            na thread de quem chamou a cada arquivo enviado (ex.: st.progress)
 
     Returns:
         (sucesso, mensagem, lista de fotos salvas)
@@ -103,100 +221,109 @@ def save_uploaded_files(
     if not uploaded_files:
         return True, "Nenhum arquivo para salvar.", []
 
-    # Validações
+    # Validações (todas antes do primeiro upload)
     if len(uploaded_files) > MAX_FILES_PER_TASK:
         return (
             False,
             f"Máximo de {MAX_FILES_PER_TASK} fotos permitidas por tarefa.",
             [],
         )
+    for file in uploaded_files:
+        if not allowed_file(file.name):
+            return (
+                False,
+                f"Arquivo '{file.name}' tem formato inválido. Use JPG, PNG, WebP ou HEIC.",
+                [],
+            )
+        if file.size > MAX_FILE_SIZE_BYTES:
+            return (
+                False,
+                f"Arquivo '{file.name}' excede o tamanho máximo de 1GB.",
+                [],
+            )
+        # Tipo real pelos primeiros bytes (a extensão pode mentir)
+        valid, message = validate_image_stream(file, file.name)
+        if not valid:
+            return False, message, []
+
+    from database.connection import SessionLocal
+    from database.models import TaskPhoto
 
+    # Todos os caminhos enviados ao storage (originais e renditions), para limpeza em caso de erro
+    uploaded_paths = []
     saved_photos = []
     session = SessionLocal()
 
     try:
         supabase = get_supabase_service_client()
 
-        for file in uploaded_files:
-            # Validar extensão
-            if not allowed_file(file.name):
-                return (
-                    False,
-                    f"Arquivo '{file.name}' tem formato inválido. Use JPG, JPEG ou PNG.",
-                    [],
-                )
-
-            # Validar tamanho
-            file_size = file.size
-            if file_size > MAX_FILE_SIZE_BYTES:
-                return (
-                    False,
-                    f"Arquivo '{file.name}' excede o tamanho máximo de 1GB.",
-                    [],
-                )
-
-            # Gerar nome único
-            unique_name = generate_unique_filename(file.name, company_id)
-            content_type = get_content_type(file.name)
-
-            # Ler conteúdo do arquivo
-            file_content = file.getvalue()
-
-            # Upload para Supabase Storage (usando service_role key para bypass RLS)
-            response = supabase.storage.from_(SUPABASE_BUCKET).upload(
-                path=unique_name,
-                file=file_content,
-                file_options={"content-type": content_type}
-            )
-
-            # Registrar no banco
-            photo = TaskPhoto(
-                task_id=task_id,
-                file_path=unique_name,
-                original_name=file.name,
-                file_size=file_size,
-            )
-            session.add(photo)
-            saved_photos.append(
-                {
-                    "file_path": unique_name,
-                    "original_name": file.name,
-                    "file_size": file_size,
-                }
-            )
-
+        total = len(uploaded_files)
+        with ThreadPoolExecutor(max_workers=min(UPLOAD_CONCURRENCY, total), thread_name_prefix="upload") as pool:
+            # Cada envio roda em uma cópia do contexto (bytes atribuídos a esta chamada instrumentada)
+            futures = {
+                pool.submit(contextvars.copy_context().run, _upload_photo, supabase, file, company_id, uploaded_paths): file
+                for file in uploaded_files
+            }
+            try:
+                for future in as_completed(futures):
+                    saved_photos.append(future.result())
+                    if on_progress is not None:
+                        on_progress(len(saved_photos), total, futures[future].name)
+            except Exception:
+                # Não inicia os envios pendentes; o `with` espera os que já estão em andamento
+                for future in futures:
+                    future.cancel()
+                raise
+
+        # Registrar no banco, na ordem em que os arquivos foram escolhidos
+        order = {file.name: i for i, file in enumerate(uploaded_files)}
+        saved_photos.sort(key=lambda photo: order.get(photo["original_name"], 0))
+        session.add_all([TaskPhoto(task_id=task_id, **photo) for photo in saved_photos])
         session.commit()
         return True, f"{len(saved_photos)} foto(s) salva(s) com sucesso.", saved_photos
 
     except Exception as e:
+        record_error(e)
         session.rollback()
         # Limpar arquivos já salvos no Supabase em caso de erro
         try:
-            supabase = get_supabase_service_client()
-            for photo in saved_photos:
-                supabase.storage.from_(SUPABASE_BUCKET).remove([photo["file_path"]])
-        except:
-            pass
+            _remove_uploaded(list(uploaded_paths))
+        except Exception as cleanup_error:
+            print(f"Aviso: Erro ao limpar uploads: {cleanup_error}")
         return False, f"Erro ao salvar fotos: {str(e)}", []
     finally:
         session.close()
 
 
+@instrument("storage.get_task_photos")
 def get_task_photos(task_id: int) -> List[dict]:
-    """Retorna lista de fotos de uma tarefa com URLs públicas."""
+    """Retorna lista de fotos de uma tarefa com a URL da miniatura.
+
+    `thumb_url` aponta para a miniatura (ou para o original, em fotos sem
+    renditions). As URLs da versão média e do original não são geradas aqui:
+    use get_photo_url(medium_path or file_path) quando o usuário ampliar a foto.
+    """
+    from database.connection import SessionLocal
+    from database.models import TaskPhoto
+
     session = SessionLocal()
     try:
         photos = session.query(TaskPhoto).filter(TaskPhoto.task_id == task_id).all()
+        # Todas as miniaturas da tarefa em uma só assinatura (ou nenhuma, se já em cache)
+        thumb_urls = get_photo_urls([p.thumb_path or p.file_path for p in photos])
         result = []
 
         for p in photos:
             photo_data = {
                 "id": p.id,
                 "file_path": p.file_path,
+                "thumb_path": p.thumb_path,
+                "medium_path": p.medium_path,
+                "source_path": p.source_path,
                 "original_name": p.original_name,
                 "file_size": p.file_size,
                 "uploaded_at": p.uploaded_at,
-                "public_url": get_photo_url(p.file_path),
+                "thumb_url": thumb_urls.get(p.thumb_path or p.file_path),
             }
             result.append(photo_data)
 
@@ -205,30 +332,79 @@ def get_task_photos(task_id: int) -> List[dict]:
         session.close()
 
 
-def get_photo_url(file_path: str, expires_in: int = 3600) -> Optional[str]:
+def get_photo_url(file_path: str, expires_in: int = SIGNED_URL_EXPIRES_SECONDS) -> Optional[str]:
     """
-    Retorna a URL pública ou assinada de uma foto no Supabase Storage.
+    Retorna a URL assinada de uma foto no Supabase Storage (em cache, ver get_photo_urls).
 
     Args:
         file_path: Caminho do arquivo no bucket
-        expires_in: Tempo de expiração em segundos (padrão: 1 hora)
+        expires_in: Tempo de expiração em segundos (padrão: SIGNED_URL_EXPIRES_SECONDS)
 
     Returns:
         URL da foto ou None em caso de erro
     """
+    return get_photo_urls([file_path], expires_in).get(file_path)
+
+
+def get_photo_urls(file_paths: List[str], expires_in: int = SIGNED_URL_EXPIRES_SECONDS) -> dict:
+    """
+    Retorna {caminho: URL assinada} para vários arquivos do bucket.
+
+    Caminhos já em cache não geram requisição; os demais são assinados juntos
+    em uma única chamada a create_signed_urls. Só a validade padrão é guardada
+    em cache (outra `expires_in` sempre assina de novo). Caminhos que não
+    puderem ser assinados ficam fora do resultado.
+    """
+    cacheable = expires_in == SIGNED_URL_EXPIRES_SECONDS
+    urls = {}
+    missing = []
+    for path in dict.fromkeys(p for p in file_paths if p):
+        url = _signed_urls.get(None, path) if cacheable else None
+        if url:
+            urls[path] = url
+        else:
+            missing.append(path)
+
+    if missing:
+        signed = _sign_urls(missing, expires_in)
+        if cacheable:
+            for path, url in signed.items():
+                _signed_urls.set(None, path, url)
+        urls.update(signed)
+    return urls
+
+
+@instrument("storage.create_signed_urls")
+def _sign_urls(file_paths: List[str], expires_in: int) -> dict:
+    """Assina `file_paths` em uma requisição. Retorna {caminho: URL} ({} em caso de erro)."""
     try:
         supabase = get_supabase_client()
-        # Gera URL assinada (funciona para buckets privados e públicos)
-        response = supabase.storage.from_(SUPABASE_BUCKET).create_signed_url(
-            path=file_path,
+        # URL assinada funciona para buckets privados e públicos
+        response = supabase.storage.from_(SUPABASE_BUCKET).create_signed_urls(
+            paths=file_paths,
             expires_in=expires_in
         )
-        return response.get("signedURL") or response.get("signedUrl")
+        urls = {}
+        for item in response:
+            url = item.get("signedURL") or item.get("signedUrl")
+            if item.get("error") or not url:
+                print(f"Erro ao gerar URL da foto {item.get('path')}: {item.get('error')}")
+                continue
+            urls[item["path"]] = url
+        return urls
     except Exception as e:
-        print(f"Erro ao gerar URL da foto: {e}")
-        return None
+        record_error(e)
+        print(f"Erro ao gerar URLs das fotos: {e}")
+        return {}
+
 
+def forget_photo_urls(file_paths: List[str]) -> None:
+    """Descarta do cache as URLs assinadas de arquivos removidos do bucket."""
+    for path in file_paths:
+        _signed_urls.invalidate(None, path)
 
+
+@instrument("storage.get_public_url")
 def get_public_url(file_path: str) -> str:
     """
     Retorna a URL pública direta de uma foto (para buckets públicos).
@@ -244,12 +420,17 @@ def get_public_url(file_path: str) -> str:
         response = supabase.storage.from_(SUPABASE_BUCKET).get_public_url(file_path)
         return response
     except Exception as e:
+        record_error(e)
         print(f"Erro ao gerar URL pública: {e}")
         return ""
 
 
+@instrument("storage.delete_task_photos")
 def delete_task_photos(task_id: int) -> tuple[bool, str]:
     """Remove todas as fotos de uma tarefa do Supabase Storage e banco."""
+    from database.connection import SessionLocal
+    from database.models import TaskPhoto
+
     session = SessionLocal()
     try:
         photos = session.query(TaskPhoto).filter(TaskPhoto.task_id == task_id).all()
@@ -257,15 +438,22 @@ def delete_task_photos(task_id: int) -> tuple[bool, str]:
         if not photos:
             return True, "Nenhuma foto para remover."
 
-        # Coletar paths para deletar
-        file_paths = [photo.file_path for photo in photos]
+        # Coletar paths para deletar (originais e renditions)
+        file_paths = [
+            path
+            for photo in photos
+            for path in (photo.file_path, photo.thumb_path, photo.medium_path, photo.source_path)
+            if path
+        ]
 
         # Remover do Supabase Storage (usando service_role key para bypass RLS)
         try:
             supabase = get_supabase_service_client()
             supabase.storage.from_(SUPABASE_BUCKET).remove(file_paths)
         except Exception as e:
+            record_error(e)
             print(f"Aviso: Erro ao remover arquivos do storage: {e}")
+        forget_photo_urls(file_paths)
 
         # Remover registros do banco
         for photo in photos:
@@ -274,14 +462,19 @@ def delete_task_photos(task_id: int) -> tuple[bool, str]:
         session.commit()
         return True, f"{len(photos)} foto(s) removida(s)."
     except Exception as e:
+        record_error(e)
         session.rollback()
         return False, f"Erro ao remover fotos: {str(e)}"
     finally:
         session.close()
 
 
+@instrument("storage.delete_single_photo")
 def delete_single_photo(photo_id: int) -> tuple[bool, str]:
     """Remove uma única foto pelo ID."""
+    from database.connection import SessionLocal
+    from database.models import TaskPhoto
+
     session = SessionLocal()
     try:
         photo = session.query(TaskPhoto).filter(TaskPhoto.id == photo_id).first()
@@ -289,14 +482,18 @@ def delete_single_photo(photo_id: int) -> tuple[bool, str]:
         if not photo:
             return False, "Foto não encontrada."
 
-        file_path = photo.file_path
+        file_paths = [
+            p for p in (photo.file_path, photo.thumb_path, photo.medium_path, photo.source_path) if p
+        ]
 
         # Remover do Supabase Storage (usando service_role key para bypass RLS)
         try:
             supabase = get_supabase_service_client()
-            supabase.storage.from_(SUPABASE_BUCKET).remove([file_path])
+            supabase.storage.from_(SUPABASE_BUCKET).remove(file_paths)
         except Exception as e:
+            record_error(e)
             print(f"Aviso: Erro ao remover arquivo do storage: {e}")
+        forget_photo_urls(file_paths)
 
         # Remover registro do banco
         session.delete(photo)
@@ -304,12 +501,14 @@ def delete_single_photo(photo_id: int) -> tuple[bool, str]:
 
         return True, "Foto removida com sucesso."
     except Exception as e:
+        record_error(e)
         session.rollback()
         return False, f"Erro ao remover foto: {str(e)}"
     finally:
         session.close()
 
 
+@instrument("storage.download_photo")
 def download_photo(file_path: str) -> Optional[bytes]:
     """
     Faz download do conteúdo de uma foto do Supabase Storage.
@@ -325,6 +524,7 @@ def download_photo(file_path: str) -> Optional[bytes]:
         response = supabase.storage.from_(SUPABASE_BUCKET).download(file_path)
         return response
     except Exception as e:
+        record_error(e)
         print(f"Erro ao baixar foto: {e}")
         return None
 
@@ -341,6 +541,7 @@ def format_file_size(size_bytes: int) -> str:
         return f"{size_bytes / (1024 * 1024 * 1024):.2f} GB"
 
 
+@instrument("storage.ensure_bucket_exists")
 def ensure_bucket_exists() -> bool:
     """
     Verifica se o bucket existe e tenta criar se não existir.
@@ -362,5 +563,6 @@ def ensure_bucket_exists() -> bool:
 
         return True
     except Exception as e:
+        record_error(e)
         print(f"Erro ao verificar/criar bucket: {e}")
         return False
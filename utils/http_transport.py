@@ -0,0 +1,170 @@
+"""
+Transporte HTTP compartilhado por todo o tráfego de saída (Supabase e FCM).
+
+Um único pool httpx por processo (e um assíncrono para database/async_connection.py),
+com limite de conexões, keep-alive, HTTP/2 quando o pacote `h2` está instalado
+e timeouts configuráveis (HTTP_* em config.py). Conexões TLS são reaproveitadas
+entre requisições em vez de um handshake por cliente ou por push.
+
+Os clientes Supabase recebem o pool via `supabase_options()`: URL e headers
+(anon/service key) vão em cada requisição, então clientes com chaves diferentes
+compartilham as mesmas conexões com segurança.
+"""
+import functools
+import importlib.util
+import threading
+import sys
+import os
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE, HTTP_KEEPALIVE_EXPIRY, HTTP2,
+    HTTP_CONNECT_TIMEOUT, HTTP_TIMEOUT,
+)
+from utils.instrumentation import add_response_bytes
+
+_http_client = None
+_async_http_client = None
+_lock = threading.Lock()
+
+# Requisições por versão de protocolo negociada ("HTTP/1.1", "HTTP/2")
+_requests_by_version: Counter = Counter()
+
+
+def http2_available() -> bool:
+    """True se HTTP/2 está habilitado e o pacote `h2` está instalado."""
+    return HTTP2 and importlib.util.find_spec("h2") is not None
+
+
+def _client_kwargs() -> dict:
+    import httpx
+    return {
+        "limits": httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        "timeout": httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        "http2": http2_available(),
+        "follow_redirects": True,
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def _counting_streams() -> tuple:
+    """Classes (síncrona, assíncrona) que contam os bytes do corpo à medida que são lidos.
+
+    Criadas na primeira resposta, para não importar httpx no import do módulo.
+    """
+    import httpx
+
+    class CountingStream(httpx.SyncByteStream):
+        def __init__(self, stream):
+            self._stream = stream
+
+        def __iter__(self):
+            for chunk in self._stream:
+                add_response_bytes(len(chunk))
+                yield chunk
+
+        def close(self) -> None:
+            self._stream.close()
+
+    class AsyncCountingStream(httpx.AsyncByteStream):
+        def __init__(self, stream):
+            self._stream = stream
+
+        async def __aiter__(self):
+            async for chunk in self._stream:
+                add_response_bytes(len(chunk))
+                yield chunk
+
+        async def aclose(self) -> None:
+            await self._stream.aclose()
+
+    return CountingStream, AsyncCountingStream
+
+
+def _count_response(response) -> None:
+    # Bytes de resposta são atribuídos à chamada instrumentada em andamento, contados
+    # durante a leitura do corpo (sem bufferizar: downloads em streaming continuam em streaming)
+    _requests_by_version[response.http_version] += 1
+    response.stream = _counting_streams()[0](response.stream)
+
+
+async def _acount_response(response) -> None:
+    _requests_by_version[response.http_version] += 1
+    response.stream = _counting_streams()[1](response.stream)
+
+
+def get_http_client():
+    """Retorna o httpx.Client compartilhado, criando-o na primeira chamada."""
+    global _http_client
+    if _http_client is None:
+        with _lock:
+            if _http_client is None:
+                import httpx
+                _http_client = httpx.Client(
+                    event_hooks={"response": [_count_response]}, **_client_kwargs()
+                )
+    return _http_client
+
+
+def get_async_http_client():
+    """Retorna o httpx.AsyncClient compartilhado (usado só no loop de database/async_connection.py)."""
+    global _async_http_client
+    if _async_http_client is None:
+        with _lock:
+            if _async_http_client is None:
+                import httpx
+                _async_http_client = httpx.AsyncClient(
+                    event_hooks={"response": [_acount_response]}, **_client_kwargs()
+                )
+    return _async_http_client
+
+
+def supabase_options(is_async: bool = False):
+    """ClientOptions do supabase-py apontando para o pool compartilhado.
+
+    `httpx_client` existe a partir do supabase 2.16 (postgrest 1.1, storage3 0.12).
+    """
+    if is_async:
+        from supabase.lib.client_options import AsyncClientOptions
+        return AsyncClientOptions(httpx_client=get_async_http_client())
+    from supabase.lib.client_options import SyncClientOptions
+    return SyncClientOptions(httpx_client=get_http_client())
+
+
+def _pool_stats(client) -> dict:
+    """Conexões abertas/ociosas do pool httpcore por trás de um cliente httpx."""
+    if client is None:
+        return {"connections": 0, "idle": 0, "http2": 0}
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", []))
+    return {
+        "connections": len(connections),
+        "idle": sum(1 for c in connections if c.is_idle()),
+        "http2": sum(1 for c in connections if "HTTP/2" in c.info()),
+    }
+
+
+def pool_stats() -> dict:
+    """Estatísticas do transporte compartilhado (para diagnóstico)."""
+    return {
+        "max_connections": HTTP_MAX_CONNECTIONS,
+        "max_keepalive": HTTP_MAX_KEEPALIVE,
+        "http2_enabled": http2_available(),
+        "requests_by_version": dict(_requests_by_version),
+        "sync": _pool_stats(_http_client),
+        "async": _pool_stats(_async_http_client),
+    }
+
+
+def close() -> None:
+    """Fecha o pool síncrono (o assíncrono é descartado junto com o processo)."""
+    global _http_client
+    with _lock:
+        if _http_client is not None:
+            _http_client.close()
+            _http_client = None
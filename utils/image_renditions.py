@@ -0,0 +1,250 @@
+"""
+Normalização e renditions das fotos na ingestão (Pillow).
+
+Cada foto enviada (JPEG, PNG, WebP ou HEIC) é decodificada uma vez, orientada
+pelo EXIF, limitada a PHOTO_MAX_EDGE px e recodificada em PHOTO_FORMAT, sem
+metadados EXIF (localização, modelo do aparelho). Da mesma imagem saem uma
+miniatura (grades das views) e uma versão média (visualização), em JPEG:
+
+    company_1/20260301_101500_ab12cd34ef56.jpg           foto normalizada
+    company_1/20260301_101500_ab12cd34ef56_thumb.jpg     PHOTO_THUMB_SIZE
+    company_1/20260301_101500_ab12cd34ef56_medium.jpg    PHOTO_MEDIUM_SIZE
+    company_1/20260301_101500_ab12cd34ef56_source.heic   enviado (PHOTO_KEEP_SOURCE)
+
+Se a foto já vem em JPEG/PNG/WebP, sem EXIF, dentro do limite e a recodificação
+não a deixa menor, o arquivo enviado é mantido como veio (só as renditions
+são geradas). As grades carregam a miniatura; a foto normalizada só é aberta
+sob demanda. HEIC exige o pacote opcional pillow-heif.
+"""
+import io
+import sys
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    PHOTO_THUMB_SIZE, PHOTO_MEDIUM_SIZE, PHOTO_RENDITION_QUALITY,
+    PHOTO_MAX_EDGE, PHOTO_QUALITY, PHOTO_FORMAT,
+)
+
+# Nome da rendition → lado maior em pixels (da maior para a menor: cada uma é reduzida da anterior)
+RENDITIONS = {
+    "medium": PHOTO_MEDIUM_SIZE,
+    "thumb": PHOTO_THUMB_SIZE,
+}
+
+RENDITION_CONTENT_TYPE = "image/jpeg"
+
+# Formato final → (extensão, content-type)
+OUTPUT_FORMATS = {
+    "jpeg": ("jpg", "image/jpeg"),
+    "webp": ("webp", "image/webp"),
+}
+
+# Formatos que os navegadores exibem e podem ser mantidos como vieram → (extensão, content-type)
+KEPT_FORMATS = {
+    **OUTPUT_FORMATS,
+    "png": ("png", "image/png"),
+}
+KEPT_MODES = ("RGB", "L", "RGBA", "LA", "P")
+
+_heif_lock = threading.Lock()
+_heif_registered: Optional[bool] = None
+
+
+def heif_supported() -> bool:
+    """True se o pacote pillow-heif está instalado (registra o decoder HEIC no Pillow uma vez)."""
+    global _heif_registered
+    if _heif_registered is None:
+        with _heif_lock:
+            if _heif_registered is None:
+                try:
+                    from pillow_heif import register_heif_opener
+                    register_heif_opener()
+                    _heif_registered = True
+                except ImportError:
+                    _heif_registered = False
+    return _heif_registered
+
+
+@dataclass
+class NormalizedPhoto:
+    """Foto recodificada e suas renditions, prontas para gravar."""
+
+    content: bytes
+    ext: str
+    content_type: str
+    width: int
+    height: int
+    source_format: str
+    source_bytes: int
+    elapsed_ms: float
+    renditions: dict = field(default_factory=dict)
+    # False: `content` é o arquivo enviado, mantido porque recodificar não ajudava
+    reencoded: bool = True
+
+
+def rendition_path(file_path: str, name: str) -> str:
+    """Caminho da rendition `name` ao lado do original (sempre .jpg)."""
+    base = file_path.rsplit(".", 1)[0] if "." in os.path.basename(file_path) else file_path
+    return f"{base}_{name}.jpg"
+
+
+def source_path(file_path: str, filename: str) -> str:
+    """Caminho do arquivo enviado, sem normalização, ao lado da foto (com a extensão de `filename`)."""
+    base = file_path.rsplit(".", 1)[0] if "." in os.path.basename(file_path) else file_path
+    ext = filename.rsplit(".", 1)[1].lower() if "." in filename else "bin"
+    return f"{base}_source.{ext}"
+
+
+def normalize_photo(source, company_id: int = None) -> Optional[NormalizedPhoto]:
+    """Decodifica, orienta, limita o tamanho e recodifica uma foto, gerando também as renditions.
+
+    `source` são os bytes da foto ou um arquivo/stream aberto. O EXIF não é
+    copiado para a saída (a orientação já foi aplicada aos pixels); o perfil de
+    cor ICC é mantido. Sem EXIF, sem redução e sem ganho de tamanho, o arquivo
+    enviado é devolvido como veio (`reencoded=False`, com a extensão e o
+    content-type do formato de origem). O resultado entra em `compression_stats`
+    da empresa.
+    Retorna None se o conteúdo não puder ser decodificado (o chamador decide
+    se guarda o arquivo como veio).
+    """
+    from PIL import Image, ImageOps
+
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    started = time.perf_counter()
+    start = source.tell()
+    source_bytes = _stream_length(source)
+    heif_supported()
+    try:
+        with Image.open(source) as image:
+            source_format = (image.format or "").lower()
+            source_size, source_mode = image.size, image.mode
+            # Qualquer EXIF (orientação, localização, aparelho) obriga a recodificar
+            has_exif = bool(image.getexif())
+            icc_profile = image.info.get("icc_profile")
+            image.draft("RGB", (PHOTO_MAX_EDGE, PHOTO_MAX_EDGE))
+            image = ImageOps.exif_transpose(image)
+            image = _to_rgb(image)
+            image.thumbnail((PHOTO_MAX_EDGE, PHOTO_MAX_EDGE), Image.LANCZOS)
+
+            ext, content_type = OUTPUT_FORMATS[PHOTO_FORMAT]
+            buffer = io.BytesIO()
+            options = {"quality": PHOTO_QUALITY, "icc_profile": icc_profile}
+            if PHOTO_FORMAT == "jpeg":
+                options.update(optimize=True, progressive=True)
+            else:
+                options.update(method=4)
+            image.save(buffer, PHOTO_FORMAT.upper(), **options)
+            content, reencoded = buffer.getvalue(), True
+
+            if (not has_exif and image.size == source_size and source_format in KEPT_FORMATS
+                    and source_mode in KEPT_MODES and len(content) >= source_bytes):
+                # Recodificar não reduziu nada: vale o arquivo como veio
+                source.seek(start)
+                content, reencoded = source.read(), False
+                ext, content_type = KEPT_FORMATS[source_format]
+
+            photo = NormalizedPhoto(
+                content=content,
+                ext=ext,
+                content_type=content_type,
+                width=image.width,
+                height=image.height,
+                source_format=source_format,
+                source_bytes=source_bytes,
+                elapsed_ms=0.0,
+                renditions=_renditions_from(image),
+                reencoded=reencoded,
+            )
+    except Exception as e:
+        print(f"Erro ao normalizar foto: {e}")
+        return None
+
+    photo.elapsed_ms = (time.perf_counter() - started) * 1000
+    compression_stats.record(company_id, photo.source_bytes, len(photo.content), photo.elapsed_ms)
+    return photo
+
+
+def _renditions_from(image) -> dict:
+    """{nome: bytes JPEG} reduzindo uma cópia de `image` (já orientada e em RGB)."""
+    from PIL import Image
+
+    image = image.copy()
+    renditions = {}
+    for name, size in RENDITIONS.items():
+        image.thumbnail((size, size), Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=PHOTO_RENDITION_QUALITY, optimize=True, progressive=True)
+        renditions[name] = buffer.getvalue()
+    return renditions
+
+
+def _stream_length(fileobj) -> int:
+    """Tamanho de um stream posicionável, sem lê-lo (mantém a posição atual)."""
+    position = fileobj.tell()
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(position)
+    return size - position
+
+
+def _to_rgb(image):
+    """Converte para RGB; transparência vira fundo branco (JPEG não tem canal alfa)."""
+    from PIL import Image
+
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    if image.mode != "RGB":
+        return image.convert("RGB")
+    return image
+
+
+# === ESTATÍSTICAS POR EMPRESA ===
+class CompressionStats:
+    """Bytes recebidos x gravados e tempo de normalização, por empresa (thread-safe)."""
+
+    def __init__(self):
+        self._by_company: dict = {}
+        self._lock = threading.Lock()
+
+    def record(self, company_id, source_bytes: int, output_bytes: int, elapsed_ms: float) -> None:
+        with self._lock:
+            entry = self._by_company.setdefault(company_id, [0, 0, 0, 0.0])
+            entry[0] += 1
+            entry[1] += source_bytes
+            entry[2] += output_bytes
+            entry[3] += elapsed_ms
+
+    def stats(self) -> list:
+        """Uma linha por empresa: fotos, bytes, razão de compressão e tempo médio."""
+        with self._lock:
+            rows = []
+            for company_id, (photos, source_bytes, output_bytes, elapsed_ms) in sorted(
+                self._by_company.items(), key=lambda item: str(item[0])
+            ):
+                rows.append({
+                    "company_id": company_id,
+                    "photos": photos,
+                    "source_bytes": source_bytes,
+                    "output_bytes": output_bytes,
+                    "ratio": round(source_bytes / output_bytes, 2) if output_bytes else 0.0,
+                    "elapsed_ms": round(elapsed_ms, 1),
+                    "avg_ms": round(elapsed_ms / photos, 1),
+                })
+            return rows
+
+    def reset(self) -> None:
+        with self._lock:
+            self._by_company.clear()
+
+
+# Instância global
+compression_stats = CompressionStats()
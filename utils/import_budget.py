@@ -0,0 +1,103 @@
+"""
+Orçamento de tempo de import dos pontos de entrada (cold start).
+
+Cada módulo é importado em um processo Python limpo, algumas vezes, e a
+mediana é comparada com o orçamento. Também confere que as bibliotecas
+pesadas de EAGER_FORBIDDEN não são carregadas no import (só sob demanda).
+Sai com código 1 se algum módulo falhar. Os mesmos limites são verificados
+pelo pytest em tests/test_import_budget.py.
+
+Uso (na raiz do projeto):
+    python -m utils.import_budget
+    python -m utils.import_budget --budget 1.5 api_mobile
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# Orçamento padrão em segundos por módulo
+DEFAULT_BUDGETS = {
+    "app": 1.2,
+    "api_mobile": 0.6,
+}
+
+# Bibliotecas que não podem ser carregadas no import de cada ponto de entrada
+# (o app é um script Streamlit, que já traz streamlit, plotly e Pillow)
+EAGER_FORBIDDEN = {
+    "app": ("pandas", "supabase", "postgrest", "sqlalchemy", "reportlab"),
+    "api_mobile": ("streamlit", "pandas", "supabase", "postgrest", "sqlalchemy", "reportlab"),
+}
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_MEASURE = (
+    "import time; t = time.perf_counter(); import {module}; "
+    "print(time.perf_counter() - t)"
+)
+
+
+def measure_import(module: str, runs: int = 3) -> float:
+    """Retorna a mediana (segundos) do tempo de `import module` em processos novos."""
+    timings = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", _MEASURE.format(module=module)],
+            cwd=_PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(timings)
+
+
+_LOADED = (
+    "import sys, json; import {module}; "
+    "print(json.dumps(sorted(name for name in {names!r} if name in sys.modules)))"
+)
+
+
+def eagerly_loaded(module: str, names: tuple) -> list:
+    """Quais de `names` já estão em sys.modules logo após `import module` (processo novo)."""
+    import json
+
+    result = subprocess.run(
+        [sys.executable, "-c", _LOADED.format(module=module, names=tuple(names))],
+        cwd=_PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def check_budgets(budgets: dict, runs: int = 3) -> bool:
+    """Mede cada módulo e imprime o resultado. Retorna True se todos couberem no orçamento."""
+    ok = True
+    for module, budget in budgets.items():
+        elapsed = measure_import(module, runs)
+        loaded = eagerly_loaded(module, EAGER_FORBIDDEN.get(module, ()))
+        status = "OK" if elapsed <= budget and not loaded else "ACIMA"
+        print(f"{module:<20} {elapsed:6.3f}s  (orçamento {budget:.2f}s)  {status}")
+        if loaded:
+            print(f"{'':<20} carregados no import: {', '.join(loaded)}")
+        ok = ok and elapsed <= budget and not loaded
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Verifica o tempo de import dos pontos de entrada.")
+    parser.add_argument("modules", nargs="*", help="Módulos a medir (padrão: app e api_mobile)")
+    parser.add_argument("--budget", type=float, help="Orçamento em segundos para todos os módulos")
+    parser.add_argument("--runs", type=int, default=3, help="Execuções por módulo (mediana)")
+    args = parser.parse_args()
+
+    modules = args.modules or list(DEFAULT_BUDGETS)
+    budgets = {m: args.budget or DEFAULT_BUDGETS.get(m, 1.0) for m in modules}
+    return 0 if check_budgets(budgets, args.runs) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
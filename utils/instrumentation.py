@@ -0,0 +1,288 @@
+"""
+Instrumentação das chamadas de acesso a dados (SupabaseDatabase e Storage).
+
+Cada chamada decorada com `@instrument` registra latência, linhas retornadas,
+bytes de resposta (contados pelo transporte HTTP compartilhado) e a classe do
+erro, se houver, em um registro de histogramas em memória (`registry`).
+Chamadas acima de SLOW_CALL_THRESHOLD_MS vão para o log de chamadas lentas,
+em JSON, com a view que originou a chamada.
+
+    @instrumented("db")
+    class SupabaseDatabase: ...
+
+    @instrument("storage.save_uploaded_files")
+    def save_uploaded_files(...): ...
+
+Erros tratados dentro do método (except + print) são informados com `record_error(e)`.
+"""
+import contextvars
+import functools
+import inspect
+import json
+import sys
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import SLOW_CALL_THRESHOLD_MS, SLOW_CALL_LOG
+
+# Limites superiores dos buckets de latência (ms); o último bucket é +Inf
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Chamada em andamento no contexto atual (thread ou task asyncio)
+_current_call: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("current_call", default=None)
+
+# Observador opcional das chamadas do contexto atual, chamado com (nome, ms) ao fim
+# de cada uma (ex.: utils/render_profiler.py conta chamadas por rerun)
+call_observer: contextvars.ContextVar[Optional[Callable[[str, float], None]]] = contextvars.ContextVar(
+    "call_observer", default=None
+)
+
+
+class Histogram:
+    """Histograma com buckets fixos (latência em ms por padrão), mais totais de linhas/bytes/erros."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.errors: dict = {}
+
+    def observe(self, value: float, rows: int = 0, nbytes: int = 0, error: str = None) -> None:
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.rows += rows
+        self.bytes += nbytes
+        if error:
+            self.errors[error] = self.errors.get(error, 0) + 1
+
+    def quantile(self, q: float) -> float:
+        """Estimativa do quantil `q` (limite superior do bucket; o máximo no bucket +Inf)."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return float(self.buckets[i]) if i < len(self.buckets) else self.max
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "calls": self.count,
+            "total_ms": round(self.total, 1),
+            "avg_ms": round(self.total / self.count, 1) if self.count else 0.0,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "max_ms": round(self.max, 1),
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "errors": sum(self.errors.values()),
+            "error_classes": dict(self.errors),
+        }
+
+
+class MetricsRegistry:
+    """Histogramas por nome de chamada (thread-safe), mais as últimas chamadas lentas."""
+
+    def __init__(self, slow_log_size: int = 200):
+        self._histograms: dict = {}
+        self._lock = threading.Lock()
+        self.slow_calls: deque = deque(maxlen=slow_log_size)
+
+    def observe(self, name: str, elapsed_ms: float, rows: int = 0, nbytes: int = 0, error: str = None) -> None:
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(elapsed_ms, rows, nbytes, error)
+
+    def add_slow_call(self, entry: dict) -> None:
+        with self._lock:
+            self.slow_calls.append(entry)
+
+    def histograms(self) -> dict:
+        """Cópia rasa {nome: Histogram} para exportação (ex.: formato Prometheus)."""
+        with self._lock:
+            return dict(self._histograms)
+
+    def top_calls(self, n: int = 20, key: str = "total_ms") -> list:
+        """Resumo das `n` chamadas com maior `key` (padrão: tempo total)."""
+        with self._lock:
+            rows = [{"call": name, **h.summary()} for name, h in self._histograms.items()]
+        return sorted(rows, key=lambda r: r[key], reverse=True)[:n]
+
+    def recent_slow_calls(self) -> list:
+        """Chamadas lentas mais recentes primeiro."""
+        with self._lock:
+            return list(reversed(self.slow_calls))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self.slow_calls.clear()
+
+
+registry = MetricsRegistry()
+
+
+# === CONTEXTO DA CHAMADA ===
+def record_error(error: BaseException) -> None:
+    """Marca a classe do erro na chamada instrumentada em andamento (para erros tratados)."""
+    call = _current_call.get()
+    if call is not None:
+        call["error"] = type(error).__name__
+
+
+def add_response_bytes(nbytes: int) -> None:
+    """Soma bytes de resposta à chamada em andamento (chamado pelo transporte HTTP)."""
+    call = _current_call.get()
+    if call is not None:
+        call["bytes"] += nbytes
+
+
+def calling_view(frame=None) -> Optional[str]:
+    """Primeira função de um módulo views.* (ou app) na pilha: 'views.modulo.funcao'."""
+    frame = frame or sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("views.") or module in ("app", "__main__", "api_mobile"):
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+def _count_rows(result) -> int:
+    """Linhas retornadas: listas contam o tamanho, um registro conta 1, tuplas usam a primeira lista."""
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, tuple):
+        for item in result:
+            if isinstance(item, list):
+                return len(item)
+        return 0
+    if isinstance(result, dict):
+        return 1
+    return 0
+
+
+def _finish(name: str, call: dict, elapsed_ms: float, view: Optional[str]) -> None:
+    registry.observe(name, elapsed_ms, call["rows"], call["bytes"], call["error"])
+    if elapsed_ms < SLOW_CALL_THRESHOLD_MS:
+        return
+
+    entry = {
+        "ts": datetime.now().isoformat(timespec="seconds"),
+        "call": name,
+        "ms": round(elapsed_ms, 1),
+        "rows": call["rows"],
+        "bytes": call["bytes"],
+        "error": call["error"],
+        "view": view,
+    }
+    registry.add_slow_call(entry)
+    line = json.dumps(entry, ensure_ascii=False)
+    print(f"[chamada lenta] {line}")
+    if SLOW_CALL_LOG:
+        try:
+            with open(SLOW_CALL_LOG, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError as e:
+            print(f"Erro ao gravar log de chamadas lentas: {e}")
+
+
+def instrument(name: str):
+    """Decorator que mede uma função (síncrona ou async) e registra em `registry` como `name`."""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            async def _run(view, observer, args, kwargs):
+                call = {"rows": 0, "bytes": 0, "error": None}
+                token = _current_call.set(call)
+                started = time.perf_counter()
+                try:
+                    result = await func(*args, **kwargs)
+                    call["rows"] = _count_rows(result)
+                    return result
+                except Exception as e:
+                    call["error"] = type(e).__name__
+                    raise
+                finally:
+                    _current_call.reset(token)
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                    _finish(name, call, elapsed_ms, view)
+                    if observer is not None:
+                        observer(name, elapsed_ms)
+
+            @functools.wraps(func)
+            def async_wrapper(*args, **kwargs):
+                # View e observador são capturados ao criar a corrotina: ela roda depois, no loop dedicado
+                return _run(calling_view(sys._getframe(1)), call_observer.get(), args, kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            call = {"rows": 0, "bytes": 0, "error": None}
+            token = _current_call.set(call)
+            started = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+                call["rows"] = _count_rows(result)
+                return result
+            except Exception as e:
+                call["error"] = type(e).__name__
+                raise
+            finally:
+                _current_call.reset(token)
+                # A pilha só é percorrida quando a chamada for lenta
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                view = calling_view(sys._getframe(1)) if elapsed_ms >= SLOW_CALL_THRESHOLD_MS else None
+                _finish(name, call, elapsed_ms, view)
+                observer = call_observer.get()
+                if observer is not None:
+                    observer(name, elapsed_ms)
+        return wrapper
+    return decorator
+
+
+def instrumented(prefix: str):
+    """Decorator de classe: aplica `instrument(f"{prefix}.{método}")` a todos os métodos públicos."""
+    def decorator(cls):
+        for attr, value in list(vars(cls).items()):
+            if attr.startswith("_") or not inspect.isfunction(value):
+                continue
+            setattr(cls, attr, instrument(f"{prefix}.{attr}")(value))
+        return cls
+    return decorator
+
+
+# === CUSTO DE IMPORT DAS PÁGINAS ===
+# página → segundos do import do módulo da view (uma vez por processo, ver app.load_page)
+_page_import_times: dict = {}
+_page_import_lock = threading.Lock()
+
+
+def record_page_import(page: str, seconds: float) -> None:
+    with _page_import_lock:
+        _page_import_times[page] = seconds
+
+
+def page_import_report() -> list:
+    """Custo de import por página, do mais caro para o mais barato: [(página, segundos)]."""
+    with _page_import_lock:
+        return sorted(_page_import_times.items(), key=lambda item: item[1], reverse=True)
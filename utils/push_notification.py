@@ -12,10 +12,7 @@ CONFIGURAÇÃO NECESSÁRIA:
 
 import os
 import json
-import requests
 from typing import Optional, Dict, Any
-from google.oauth2 import service_account
-from google.auth.transport.requests import Request
 
 # Escopo necessário para FCM
 SCOPES = ['https://www.googleapis.com/auth/firebase.messaging']
@@ -63,6 +60,10 @@ def get_access_token(credentials_path: Optional[str] = None) -> Optional[str]:
         if _cached_credentials and _cached_credentials.valid:
             return _cached_credentials.token
 
+        # Importados sob demanda: google-auth só é carregado quando um push é enviado
+        from google.oauth2 import service_account
+        from google.auth.transport.requests import Request
+
         # Carregar credenciais do arquivo
         credentials = service_account.Credentials.from_service_account_file(
             credentials_path,
@@ -177,7 +178,9 @@ def send_push_notification(
     payload = {"message": message}
 
     try:
-        response = requests.post(url, headers=headers, json=payload)
+        # Pool compartilhado: pushes seguidos reaproveitam a conexão TLS com o FCM
+        from utils.http_transport import get_http_client
+        response = get_http_client().post(url, headers=headers, json=payload)
 
         if response.status_code == 200:
             print(f"Notificação enviada com sucesso para {token[:20]}...")
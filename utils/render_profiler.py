@@ -0,0 +1,192 @@
+"""
+Profiler opcional por rerun do Streamlit.
+
+Ligado com RENDER_PROFILE=true (todos os usuários) ou, para admins, com
+`?profile=1` na URL. Mede o tempo total do rerun, o de cada seção nomeada e
+conta as chamadas ao banco/storage (via utils/instrumentation.py). Admins veem
+o detalhamento em um expander no fim da página; com RENDER_PROFILE_DIR, cada
+rerun grava um arquivo .prof do cProfile (abre no snakeviz, flameprof, tuna).
+
+Desligado, `section()` devolve um context manager vazio e `checkpoint()`
+retorna na hora: nada é medido.
+
+    checkpoint("KPIs")           # fecha a seção anterior e abre "KPIs"
+    with section("gráficos"):    # mede só o bloco
+        ...
+"""
+import contextlib
+import contextvars
+import threading
+import time
+import sys
+import os
+from datetime import datetime
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import RENDER_PROFILE, RENDER_PROFILE_DIR
+from utils.instrumentation import call_observer
+
+# Reruns perfilados guardados na sessão para o histórico do painel
+HISTORY_SIZE = 10
+
+_active: contextvars.ContextVar[Optional["RenderProfile"]] = contextvars.ContextVar("render_profile", default=None)
+_NULL_SECTION = contextlib.nullcontext()
+
+
+class RenderProfile:
+    """Tempos e chamadas ao banco de um rerun."""
+
+    def __init__(self, page: str, with_cprofile: bool = False):
+        self.page = page
+        self.started_at = datetime.now()
+        self.started = time.perf_counter()
+        self.total_ms = 0.0
+        self.sections: list = []
+        self.db_calls = 0
+        self.db_ms = 0.0
+        self.calls_by_name: dict = {}
+        self.cprofile_path: Optional[str] = None
+        self._open: Optional[tuple] = None
+        self._lock = threading.Lock()
+        self._cprofile = None
+        if with_cprofile:
+            import cProfile
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def on_call(self, name: str, elapsed_ms: float) -> None:
+        # Chamadas async terminam na thread do event loop: contador protegido por lock
+        with self._lock:
+            self.db_calls += 1
+            self.db_ms += elapsed_ms
+            self.calls_by_name[name] = self.calls_by_name.get(name, 0) + 1
+
+    def _add_section(self, name: str, started: float, db_calls_before: int) -> None:
+        self.sections.append({
+            "section": name,
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+            "db_calls": self.db_calls - db_calls_before,
+        })
+
+    def checkpoint(self, name: str) -> None:
+        """Fecha a seção aberta por checkpoint (se houver) e abre `name`."""
+        if self._open is not None:
+            self._add_section(*self._open)
+        self._open = (name, time.perf_counter(), self.db_calls)
+
+    @contextlib.contextmanager
+    def section(self, name: str):
+        started, db_calls_before = time.perf_counter(), self.db_calls
+        try:
+            yield
+        finally:
+            self._add_section(name, started, db_calls_before)
+
+    def finish(self) -> None:
+        if self._open is not None:
+            self._add_section(*self._open)
+            self._open = None
+        self.total_ms = round((time.perf_counter() - self.started) * 1000, 1)
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._dump_cprofile()
+
+    def _dump_cprofile(self) -> None:
+        try:
+            os.makedirs(RENDER_PROFILE_DIR, exist_ok=True)
+            filename = f"{self.started_at:%Y%m%d_%H%M%S_%f}_{self.page}.prof"
+            self.cprofile_path = os.path.join(RENDER_PROFILE_DIR, filename)
+            self._cprofile.dump_stats(self.cprofile_path)
+        except OSError as e:
+            print(f"Erro ao gravar perfil do rerun: {e}")
+            self.cprofile_path = None
+
+
+# === API USADA PELO APP E PELAS VIEWS ===
+def profiling_requested(is_admin: bool) -> bool:
+    """True se este rerun deve ser perfilado (variável de ambiente ou ?profile=1 para admins)."""
+    if RENDER_PROFILE:
+        return True
+    if not is_admin:
+        return False
+    import streamlit as st
+    return st.query_params.get("profile") in ("1", "true")
+
+
+def start_rerun(page: str) -> tuple:
+    """Inicia o perfil do rerun. Retorna um token para `finish_rerun`."""
+    profile = RenderProfile(page, with_cprofile=bool(RENDER_PROFILE_DIR))
+    return profile, _active.set(profile), call_observer.set(profile.on_call)
+
+
+def finish_rerun(token: tuple) -> "RenderProfile":
+    """Encerra o perfil do rerun, grava no histórico da sessão e o retorna."""
+    profile, active_token, observer_token = token
+    profile.finish()
+    _active.reset(active_token)
+    call_observer.reset(observer_token)
+
+    import streamlit as st
+    history = st.session_state.setdefault("render_profiles", [])
+    history.append({
+        "ts": profile.started_at.strftime("%H:%M:%S"),
+        "page": profile.page,
+        "ms": profile.total_ms,
+        "db_calls": profile.db_calls,
+        "db_ms": round(profile.db_ms, 1),
+    })
+    del history[:-HISTORY_SIZE]
+    return profile
+
+
+def checkpoint(name: str) -> None:
+    """Marca o início de uma seção (termina no próximo checkpoint ou no fim do rerun)."""
+    profile = _active.get()
+    if profile is not None:
+        profile.checkpoint(name)
+
+
+def section(name: str):
+    """Context manager que mede um bloco como seção (vazio com o profiler desligado)."""
+    profile = _active.get()
+    if profile is None:
+        return _NULL_SECTION
+    return profile.section(name)
+
+
+def render_profile_panel(profile: "RenderProfile", duplicates: dict = None) -> None:
+    """Expander com o detalhamento do rerun (exibir só para admins).
+
+    duplicates: {método: leituras repetidas atendidas pelo identity map neste rerun}.
+    """
+    import streamlit as st
+    import pandas as pd
+
+    title = f"⏱️ Perfil do rerun — {profile.total_ms:.0f} ms, {profile.db_calls} chamada(s) ao banco"
+    with st.expander(title):
+        st.caption(
+            f"Página: {profile.page} · tempo em chamadas ao banco/storage: {profile.db_ms:.0f} ms"
+        )
+        if profile.sections:
+            df = pd.DataFrame(profile.sections)
+            df.columns = ["Seção", "ms", "Chamadas ao banco"]
+            st.dataframe(df, use_container_width=True, hide_index=True)
+        if profile.calls_by_name:
+            calls = sorted(profile.calls_by_name.items(), key=lambda item: item[1], reverse=True)
+            df_calls = pd.DataFrame(calls, columns=["Chamada", "Qtd"])
+            st.dataframe(df_calls, use_container_width=True, hide_index=True)
+        if duplicates:
+            st.caption(
+                "Leituras repetidas evitadas (identity map): "
+                + ", ".join(f"{name} ×{count}" for name, count in sorted(duplicates.items()))
+            )
+        if profile.cprofile_path:
+            st.caption(f"cProfile: `{profile.cprofile_path}`")
+
+        history = st.session_state.get("render_profiles", [])
+        if len(history) > 1:
+            st.markdown("**Reruns anteriores**")
+            df_hist = pd.DataFrame(list(reversed(history)))
+            df_hist.columns = ["Horário", "Página", "ms", "Chamadas", "ms no banco"]
+            st.dataframe(df_hist, use_container_width=True, hide_index=True)
@@ -46,9 +46,11 @@ def render_admin_page():
 
     # Tabs diferentes para super admin vs admin de empresa
     if user_is_super_admin:
-        tab1, tab2, tab3, tab4 = st.tabs(["Usuários", "Novo Usuário", "Alterar Senha", "Empresas"])
+        tab1, tab2, tab3, tab4, tab_diag = st.tabs(
+            ["Usuários", "Novo Usuário", "Alterar Senha", "Empresas", "Diagnóstico"]
+        )
     else:
-        tab1, tab2, tab3 = st.tabs(["Usuários", "Novo Usuário", "Alterar Senha"])
+        tab1, tab2, tab3, tab_diag = st.tabs(["Usuários", "Novo Usuário", "Alterar Senha", "Diagnóstico"])
 
     # Tab 1: Lista de Usuários
     with tab1:
@@ -435,6 +437,92 @@ def render_admin_page():
                         else:
                             st.error(msg)
 
+    # Tab Diagnóstico: tempo das chamadas ao banco/storage neste processo
+    with tab_diag:
+        render_diagnostics_panel()
+
+
+def render_diagnostics_panel():
+    """Top chamadas ao banco/storage por tempo total, chamadas lentas e pool HTTP."""
+    from utils.instrumentation import registry, page_import_report
+    from utils.http_transport import pool_stats
+    from database.identity_map import duplicate_totals
+    from database.resilience import resilience
+    from utils.image_renditions import compression_stats
+    from config import SLOW_CALL_THRESHOLD_MS
+
+    st.subheader("Chamadas ao Banco e Storage")
+    st.caption("Medidas neste processo desde o início (ou desde a última limpeza).")
+
+    top = registry.top_calls(25)
+    if top:
+        df = pd.DataFrame(top).drop(columns=["error_classes"])
+        df.columns = [
+            "Chamada", "Qtd", "Total (ms)", "Média (ms)", "p50 (ms)", "p95 (ms)",
+            "Máx (ms)", "Linhas", "Bytes", "Erros",
+        ]
+        st.dataframe(df, use_container_width=True, hide_index=True)
+
+        errors = {row["call"]: row["error_classes"] for row in top if row["error_classes"]}
+        if errors:
+            with st.expander("Erros por classe"):
+                st.json(errors)
+    else:
+        st.info("Nenhuma chamada registrada ainda.")
+
+    st.subheader(f"Chamadas Lentas (≥ {SLOW_CALL_THRESHOLD_MS:.0f} ms)")
+    slow = registry.recent_slow_calls()
+    if slow:
+        df_slow = pd.DataFrame(slow)[["ts", "call", "ms", "rows", "bytes", "error", "view"]]
+        df_slow.columns = ["Horário", "Chamada", "ms", "Linhas", "Bytes", "Erro", "View"]
+        st.dataframe(df_slow, use_container_width=True, hide_index=True)
+    else:
+        st.info("Nenhuma chamada lenta registrada.")
+
+    duplicates = duplicate_totals()
+    if duplicates:
+        with st.expander("Leituras repetidas evitadas (identity map por rerun)"):
+            df_dup = pd.DataFrame(duplicates, columns=["Chamada", "Repetições"])
+            st.dataframe(df_dup, use_container_width=True, hide_index=True)
+
+    endpoints = resilience.stats()
+    if endpoints:
+        st.subheader("Resiliência por Endpoint")
+        df_res = pd.DataFrame(endpoints)
+        df_res.columns = [
+            "Endpoint", "Circuito", "Chamadas", "Retries", "Hedges", "Hedges vencedores",
+            "Falhas", "Aberturas", "Recusadas (aberto)", "Último valor servido",
+        ]
+        st.dataframe(df_res, use_container_width=True, hide_index=True)
+
+    compression = compression_stats.stats()
+    if compression:
+        st.subheader("Compressão das Fotos por Empresa")
+        df_comp = pd.DataFrame(compression)
+        df_comp.columns = [
+            "Empresa", "Fotos", "Bytes recebidos", "Bytes gravados", "Razão",
+            "Tempo total (ms)", "Tempo médio (ms)",
+        ]
+        st.dataframe(df_comp, use_container_width=True, hide_index=True)
+
+    page_imports = page_import_report()
+    if page_imports:
+        with st.expander("Custo de import por página (primeira renderização)"):
+            df_imp = pd.DataFrame(
+                [(page, round(seconds * 1000, 1)) for page, seconds in page_imports],
+                columns=["Página", "Import (ms)"],
+            )
+            st.dataframe(df_imp, use_container_width=True, hide_index=True)
+
+    with st.expander("Pool HTTP"):
+        st.json(pool_stats())
+
+    if st.button("Limpar métricas", key="reset_diagnostics"):
+        registry.reset()
+        resilience.reset_stats()
+        compression_stats.reset()
+        st.rerun()
+
 
 if __name__ == "__main__":
     render_admin_page()
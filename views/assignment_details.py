@@ -247,11 +247,17 @@ def render_assignment_details_page():
                 url = photo.get("photo_url", "")
                 if url and not url.startswith("data:"):
                     with cols[i % 3]:
+                        # Miniatura na grade; o original só é baixado se o link for aberto
                         st.image(
-                            url,
+                            photo.get("thumb_url") or url,
                             caption=photo.get("original_name") or f"Foto {i+1}",
                             use_container_width=True,
                         )
+                        # Ampliada: versão média; o original fica só no link
+                        if photo.get("medium_url") and st.button("🔍 Ampliar", key=f"zoom_photo_{photo.get('id', i)}"):
+                            st.image(photo["medium_url"], use_container_width=True)
+                        if photo.get("thumb_url"):
+                            st.markdown(f"[Abrir original]({url})")
         else:
             st.markdown(
                 '<div style="background:#f8fafc;border:1px dashed #e2e8f0;border-radius:12px;'
@@ -1,9 +1,10 @@
 import streamlit as st
 import pandas as pd
-from database.supabase_only_connection import db
+from database.supabase_only_connection import db, period_bounds
 from auth.authentication import require_login, get_current_user
 from datetime import datetime
 from utils.export import export_to_excel, export_to_pdf
+from utils.render_profiler import checkpoint
 
 
 def _fmt_fibra(metros: float) -> str:
@@ -16,13 +17,31 @@ def _fmt_fibra(metros: float) -> str:
 PAGE_SIZE = 15
 
 
-def _pagination_controls(page_key: str, total: int, reset_key: str = None) -> int:
-    """Controles de paginação. Retorna página atual (0-indexed)."""
-    if total == 0:
+def _page_cursor(page_key: str, filter_sig: str = "") -> str | None:
+    """Retorna o cursor keyset da página atual, voltando à primeira quando os filtros mudam."""
+    if st.session_state.get(f"{page_key}_sig") != filter_sig:
+        st.session_state[f"{page_key}_sig"] = filter_sig
+        st.session_state[page_key] = 0
+        st.session_state[f"{page_key}_cursors"] = [None]
+
+    cursors = st.session_state.setdefault(f"{page_key}_cursors", [None])
+    page = min(st.session_state.get(page_key, 0), len(cursors) - 1)
+    st.session_state[page_key] = page
+    return cursors[page]
+
+
+def _pagination_controls(page_key: str, total: int, next_cursor: str = None) -> int:
+    """Controles de paginação keyset. Retorna página atual (0-indexed)."""
+    page = st.session_state.get(page_key, 0)
+    cursors = st.session_state.setdefault(f"{page_key}_cursors", [None])
+    del cursors[page + 1:]
+    if next_cursor:
+        cursors.append(next_cursor)
+
+    if total == 0 and page == 0:
         return 0
 
-    total_pages = max(1, -(-total // PAGE_SIZE))
-    page = min(st.session_state.get(page_key, 0), total_pages - 1)
+    total_pages = max(page + 1 + (1 if next_cursor else 0), -(-total // PAGE_SIZE))
 
     c1, c2, c3 = st.columns([1, 3, 1])
     with c1:
@@ -31,10 +50,10 @@ def _pagination_controls(page_key: str, total: int, reset_key: str = None) -> in
             st.rerun()
     with c2:
         start_n = page * PAGE_SIZE + 1
-        end_n = min((page + 1) * PAGE_SIZE, total)
+        end_n = min((page + 1) * PAGE_SIZE, max(total, start_n))
         st.caption(f"Mostrando {start_n}–{end_n} de {total} tarefas  |  Página {page + 1}/{total_pages}")
     with c3:
-        if st.button("Próximo →", key=f"{page_key}_next", disabled=page >= total_pages - 1, use_container_width=True):
+        if st.button("Próximo →", key=f"{page_key}_next", disabled=not next_cursor, use_container_width=True):
             st.session_state[page_key] = page + 1
             st.rerun()
     return page
@@ -51,6 +70,7 @@ def show_completed_tasks_manager():
     st.title("Tarefas Concluídas")
 
     # ── Filtros ────────────────────────────────────────────────────────────
+    checkpoint("concluídas: filtros")
     col1, col2 = st.columns(2)
     with col1:
         date_filter = st.date_input("Filtrar por data", value=None)
@@ -60,71 +80,76 @@ def show_completed_tasks_manager():
             "Filtrar por colaborador", ["Todos"] + collaborators
         )
 
-    # ── Busca ──────────────────────────────────────────────────────────────
-    tasks = db.get_task_assignments(user["company_id"], status="concluida")
-
-    if date_filter:
-        tasks = [
-            t for t in tasks
-            if t.get("completed_at")
-            and _parse_dt(t["completed_at"]).date() == date_filter
-        ]
-
-    if collaborator_filter != "Todos":
-        tasks = [
-            t for t in tasks
-            if (t.get("assigned_to_user") or {}).get("full_name") == collaborator_filter
-        ]
-
-    # ── KPIs ──────────────────────────────────────────────────────────────
-    total_ctos           = sum(t.get("quantidade_cto") or 0 for t in tasks)
-    total_cx_emenda      = sum(t.get("quantidade_cx_emenda") or 0 for t in tasks)
-    total_fibra          = sum(float(t.get("fibra_lancada") or 0) for t in tasks)
-    total_abert_cx       = sum(t.get("abertura_fechamento_cx_emenda") or 0 for t in tasks)
-    total_abert_cto      = sum(t.get("abertura_fechamento_cto") or 0 for t in tasks)
-    total_abert_rozeta   = sum(t.get("abertura_fechamento_rozeta") or 0 for t in tasks)
+    # ── KPIs (agregados no servidor, sem baixar as tarefas) ────────────────
+    checkpoint("concluídas: KPIs")
+    completed_from, completed_to = period_bounds((date_filter, date_filter)) if date_filter else (None, None)
+    assigned_to_name = collaborator_filter if collaborator_filter != "Todos" else None
+    totals = db.get_completed_task_totals(
+        user["company_id"],
+        completed_from=completed_from,
+        completed_to=completed_to,
+        assigned_to_name=assigned_to_name,
+    )
 
     if collaborator_filter != "Todos":
         st.subheader(f"Resumo — {collaborator_filter}")
 
     col1, col2, col3, col4 = st.columns(4)
-    col1.metric("Total de Tarefas", len(tasks))
-    col2.metric("Fibra Lançada", _fmt_fibra(total_fibra))
-    col3.metric("Qtd CTOs", int(total_ctos))
-    col4.metric("Qtd Cx Emenda", int(total_cx_emenda))
+    col1.metric("Total de Tarefas", totals["total"])
+    col2.metric("Fibra Lançada", _fmt_fibra(totals["fibra_lancada"]))
+    col3.metric("Qtd CTOs", int(totals["quantidade_cto"]))
+    col4.metric("Qtd Cx Emenda", int(totals["quantidade_cx_emenda"]))
 
     col5, col6, col7 = st.columns(3)
-    col5.metric("Abert./Fech. Cx Emenda", int(total_abert_cx))
-    col6.metric("Abert./Fech. CTO", int(total_abert_cto))
-    col7.metric("Abert./Fech. Rozeta", int(total_abert_rozeta))
+    col5.metric("Abert./Fech. Cx Emenda", int(totals["abertura_fechamento_cx_emenda"]))
+    col6.metric("Abert./Fech. CTO", int(totals["abertura_fechamento_cto"]))
+    col7.metric("Abert./Fech. Rozeta", int(totals["abertura_fechamento_rozeta"]))
 
     st.divider()
 
-    if not tasks:
+    if not totals["total"]:
         st.info("Nenhuma tarefa concluída encontrada.")
         return
 
-    # ── Exportação ─────────────────────────────────────────────────────────
+    # ── Exportação (lista completa baixada só quando pedida) ───────────────
+    checkpoint("concluídas: exportação")
     prefix = collaborator_filter.replace(" ", "_") if collaborator_filter != "Todos" else "tarefas_concluidas"
     title  = f"Tarefas Concluídas — {collaborator_filter}" if collaborator_filter != "Todos" else "Tarefas Concluídas"
-    _render_export_buttons(tasks, title, prefix)
+    if st.checkbox(f"Preparar exportação ({totals['total']} tarefas)", key="ct_export"):
+        tasks = db.get_task_assignments(
+            user["company_id"],
+            status="concluida",
+            completed_from=completed_from,
+            completed_to=completed_to,
+            assigned_to_name=assigned_to_name,
+            profile="export",
+        )
+        _render_export_buttons(tasks, title, prefix)
 
     st.divider()
 
-    # ── Visualização por colaborador: tabela detalhada ─────────────────────
+    # ── Página atual (paginação keyset no servidor) ────────────────────────
+    checkpoint("concluídas: lista paginada")
+    page_tasks, _, next_cursor = db.get_task_assignments_keyset(
+        user["company_id"],
+        cursor=_page_cursor("ct_page", f"{date_filter}|{collaborator_filter}"),
+        page_size=PAGE_SIZE,
+        status="concluida",
+        assigned_to_name=assigned_to_name,
+        completed_from=completed_from,
+        completed_to=completed_to,
+        count=None,
+        profile="export",
+    )
+
+    # Visualização por colaborador: tabela detalhada da página
     if collaborator_filter != "Todos":
-        _show_user_table(tasks, collaborator_filter)
+        _show_user_table(page_tasks, collaborator_filter, totals["total"])
+        _pagination_controls("ct_page", totals["total"], next_cursor)
         return
 
-    # ── Visualização geral: expanders ──────────────────────────────────────
-    # reset de página quando filtros mudam
-    filter_sig = f"{date_filter}|{collaborator_filter}"
-    if st.session_state.get("_ct_filter_sig") != filter_sig:
-        st.session_state["_ct_filter_sig"] = filter_sig
-        st.session_state["ct_page"] = 0
-
-    page = _pagination_controls("ct_page", len(tasks))
-    page_tasks = tasks[page * PAGE_SIZE:(page + 1) * PAGE_SIZE]
+    # Visualização geral: expanders
+    _pagination_controls("ct_page", totals["total"], next_cursor)
 
     for task in page_tasks:
         assignee = (task.get("assigned_to_user") or {}).get("full_name", "N/A")
@@ -184,8 +209,8 @@ def _render_export_buttons(tasks: list, title: str, filename_prefix: str) -> Non
             )
 
 
-def _show_user_table(tasks: list, collaborator_name: str):
-    """Tabela completa com todas as tarefas de um colaborador específico."""
+def _show_user_table(tasks: list, collaborator_name: str, total: int):
+    """Tabela com as tarefas de um colaborador específico (página atual; `total` de todas as páginas)."""
 
     # Monta DataFrame
     rows = []
@@ -208,7 +233,7 @@ def _show_user_table(tasks: list, collaborator_name: str):
 
     df = pd.DataFrame(rows)
 
-    st.subheader(f"Tarefas de {collaborator_name} ({len(tasks)})")
+    st.subheader(f"Tarefas de {collaborator_name} ({total})")
 
     # Tabela interativa — oculta colunas auxiliares (ID, Fibra (m))
     display_cols = [c for c in df.columns if c not in ("ID", "Fibra (m)")]
@@ -240,7 +265,11 @@ def _show_user_table(tasks: list, collaborator_name: str):
                     for idx, photo in enumerate(photos):
                         url = photo.get("photo_url", "")
                         if url and not url.startswith("data:"):
-                            st.image(url, caption=f"Foto {idx+1}", use_container_width=True)
+                            st.image(photo.get("thumb_url") or url, caption=f"Foto {idx+1}", use_container_width=True)
+                            if photo.get("medium_url") and st.button("🔍 Ampliar", key=f"ct_zoom_detail_{task['id']}_{idx}"):
+                                st.image(photo["medium_url"], use_container_width=True)
+                            if photo.get("thumb_url"):
+                                st.markdown(f"[Abrir original]({url})")
                 else:
                     st.caption("Sem fotos")
 
@@ -302,7 +331,11 @@ def _render_task_expander(task: dict):
             for idx, photo in enumerate(photos):
                 url = photo.get("photo_url", "")
                 if url and not url.startswith("data:"):
-                    st.image(url, caption=f"Foto {idx+1}", use_container_width=True)
+                    st.image(photo.get("thumb_url") or url, caption=f"Foto {idx+1}", use_container_width=True)
+                    if photo.get("medium_url") and st.button("🔍 Ampliar", key=f"ct_zoom_{task['id']}_{idx}"):
+                        st.image(photo["medium_url"], use_container_width=True)
+                    if photo.get("thumb_url"):
+                        st.markdown(f"[Abrir original]({url})")
         else:
             st.caption("Sem fotos")
 
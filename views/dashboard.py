@@ -231,12 +231,7 @@ def get_assigned_to_me(user_id: int, company_id: int) -> list:
 
 def get_assigned_by_me(user_id: int, company_id: int) -> list:
     """Retorna tarefas que o admin atribuiu via Supabase."""
-    try:
-        assignments = db.get_task_assignments(company_id)
-        return [a for a in assignments if a.get('assigned_by') == user_id]
-    except Exception as e:
-        print(f"Erro ao buscar tarefas atribuídas: {e}")
-        return []
+    return db.get_task_assignments(company_id, assigned_by=user_id)
 
 
 def render_assignment_card(assignment: dict, show_assignee: bool = False):
@@ -14,7 +14,29 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import re
 
 from auth.authentication import require_login, get_current_user, is_admin
-from database.supabase_only_connection import db
+from database.supabase_only_connection import db, DASHBOARD_METRICS, period_bounds
+from database.async_connection import adb, gather
+from utils.render_profiler import checkpoint
+
+
+# Rótulo do filtro de período → período aceito por db.get_dashboard_aggregates
+PERIODOS_DASHBOARD = {
+    "Todos": None,
+    "Hoje": "hoje",
+    "Esta Semana": "semana",
+    "Este Mês": "mes",
+}
+
+# Rótulo do período rápido da tab materiais → período de period_bounds
+PERIODOS_MATERIAIS = {
+    "Hoje": "hoje",
+    "Ontem": "ontem",
+    "Esta Semana": "semana",
+    "Semana Passada": "semana_passada",
+    "Este Mês": "mes",
+    "Mês Passado": "mes_passado",
+    "Todos": None,
+}
 
 
 def fmt_fibra(metros: float) -> str:
@@ -63,17 +85,29 @@ def parse_date(date_str) -> datetime:
 
 def get_assigned_to_me(user_id: int, company_id: int) -> list:
     """Retorna tarefas atribuídas ao usuário via Supabase."""
-    return db.get_task_assignments(company_id, user_id)
+    return db.get_task_assignments(company_id, user_id, profile='list')
 
 
 def get_assigned_by_me(user_id: int, company_id: int) -> list:
     """Retorna tarefas que o admin atribuiu via Supabase."""
-    try:
-        assignments = db.get_task_assignments(company_id)
-        return [a for a in assignments if a.get('assigned_by') == user_id]
-    except Exception as e:
-        print(f"Erro ao buscar tarefas atribuídas: {e}")
-        return []
+    return db.get_task_assignments(company_id, assigned_by=user_id, profile='list')
+
+
+def get_active_assignments(company_id: int, **filters) -> list:
+    """Retorna tarefas da empresa, ignorando as de empresas (empresa_nome) inativas.
+
+    `filters` são repassados para db.get_task_assignments (filtrados no servidor).
+    """
+    # Tarefas e empresas buscadas em paralelo
+    assignments, companies = gather(
+        adb.get_task_assignments(company_id, **filters),
+        adb.get_all_companies(),
+    )
+    empresas_ativas = {c['name'] for c in companies if c.get('active')}
+    return [
+        a for a in assignments
+        if not a.get('empresa_nome') or a.get('empresa_nome') in empresas_ativas
+    ]
 
 
 def render_assignment_card(assignment: dict, show_assignee: bool = False, card_index: int = 0, is_manager: bool = False):
@@ -129,6 +163,7 @@ def render_dashboard_page():
     user = get_current_user()
 
     # Técnicos/colaboradores veem suas próprias tarefas atribuídas
+    checkpoint("dashboard: minhas tarefas")
     if not is_admin():
         st.header("📝 Tarefas Atribuídas a Mim")
 
@@ -163,84 +198,69 @@ def render_dashboard_page():
         return
 
     # ─── Dashboard Interativo (apenas admin/gerente) ──────────────────────────
+    checkpoint("dashboard: agregados/usuários")
     st.header("📊 Dashboard Interativo")
 
-    # Carrega dados brutos
-    all_assignments_raw = db.get_task_assignments(user["company_id"])
-    all_users = db.get_all_users(user["company_id"])
+    # Filtros atuais (lidos antes dos widgets para buscar os agregados de uma vez)
+    empresa_filter = st.session_state.get("dash_filter_empresa", "Todas")
+    periodo = st.session_state.get("dash_filter_periodo", "Todos")
+    empresa_param = empresa_filter if empresa_filter != "Todas" else None
 
-    # Remove tarefas de empresas inativas da base desde o início
-    empresas_ativas_result = db.client.table('companies').select('name').eq('active', True).execute()
-    empresas_ativas = {e['name'] for e in (empresas_ativas_result.data or [])}
-    all_assignments_raw = [
-        a for a in all_assignments_raw
-        if not a.get('empresa_nome') or a.get('empresa_nome') in empresas_ativas
-    ]
+    # Contagens e somas agregadas no servidor (uma única chamada), em paralelo com os usuários
+    aggregates, all_users = gather(
+        adb.get_dashboard_aggregates(user["company_id"], PERIODOS_DASHBOARD.get(periodo), empresa_param),
+        adb.get_all_users(user["company_id"]),
+    )
+    if empresa_param and empresa_param not in aggregates['empresas']:
+        # Empresa selecionada foi desativada/removida: volta para "Todas"
+        st.session_state["dash_filter_empresa"] = "Todas"
+        empresa_param = None
+        aggregates = db.get_dashboard_aggregates(
+            user["company_id"], PERIODOS_DASHBOARD.get(periodo)
+        )
+
+    # Tarefas completas só são baixadas quando uma tabela de detalhe precisa delas
+    _rows_cache: dict = {}
+
+    def load_filtered_assignments() -> list:
+        if "rows" not in _rows_cache:
+            created_from, created_to = period_bounds(PERIODOS_DASHBOARD.get(periodo))
+            _rows_cache["rows"] = get_active_assignments(
+                user["company_id"],
+                profile='list',
+                empresa_nome=empresa_param,
+                created_from=created_from,
+                created_to=created_to,
+            )
+        return _rows_cache["rows"]
 
     # ── Filtros globais ────────────────────────────────────────────────────
+    checkpoint("dashboard: filtros")
     col_f1, col_f2 = st.columns(2)
     with col_f1:
-        empresas_set = sorted({
-            a.get('empresa_nome') for a in all_assignments_raw if a.get('empresa_nome')
-        })
-        empresa_filter = st.selectbox(
-            "Empresa", ["Todas"] + list(empresas_set), key="dash_filter_empresa"
+        st.selectbox(
+            "Empresa", ["Todas"] + aggregates['empresas'], key="dash_filter_empresa"
         )
     with col_f2:
-        periodo = st.selectbox(
-            "Período", ["Todos", "Hoje", "Esta Semana", "Este Mês"], key="dash_filter_periodo"
+        st.selectbox(
+            "Período", list(PERIODOS_DASHBOARD.keys()), key="dash_filter_periodo"
         )
 
-    # Aplica filtros
-    all_assignments = list(all_assignments_raw)
-    if empresa_filter != "Todas":
-        all_assignments = [a for a in all_assignments if a.get('empresa_nome') == empresa_filter]
-
-    hoje = datetime.now().date()
-    if periodo == "Hoje":
-        all_assignments = [
-            a for a in all_assignments
-            if parse_date(a.get('created_at')).date() == hoje
-        ]
-    elif periodo == "Esta Semana":
-        inicio_semana = hoje - timedelta(days=hoje.weekday())
-        all_assignments = [
-            a for a in all_assignments
-            if parse_date(a.get('created_at')).date() >= inicio_semana
-        ]
-    elif periodo == "Este Mês":
-        all_assignments = [
-            a for a in all_assignments
-            if parse_date(a.get('created_at')).month == hoje.month
-            and parse_date(a.get('created_at')).year == hoje.year
-        ]
-
     # ── KPI Métricas ───────────────────────────────────────────────────────
-    total = len(all_assignments)
-    concluidas = len([a for a in all_assignments if a.get('status') == 'concluida'])
-    em_andamento = len([a for a in all_assignments if a.get('status') == 'em_andamento'])
-    pendentes = len([a for a in all_assignments if a.get('status') == 'pendente'])
-
-    # Calcular todas as métricas ISP dos campos estruturados E do campo materials (texto)
-    total_ctos = 0
-    total_cx_emenda = 0
-    total_fibra = 0
-    total_abert_cx_emenda = 0
-    total_abert_cto = 0
-    total_abert_rozeta = 0
-
-    for a in all_assignments:
-        total_ctos += a.get('quantidade_cto') or 0
-        total_cx_emenda += a.get('quantidade_cx_emenda') or 0
-        total_fibra += float(a.get('fibra_lancada') or 0)
-        total_abert_cx_emenda += a.get('abertura_fechamento_cx_emenda') or 0
-        total_abert_cto += a.get('abertura_fechamento_cto') or 0
-        total_abert_rozeta += a.get('abertura_fechamento_rozeta') or 0
-
-        if a.get('materials'):
-            materials_data = extract_materials_from_text(a['materials'])
-            total_ctos += materials_data['ctos']
-            total_fibra += materials_data['cabo_metros']
+    checkpoint("dashboard: KPIs")
+    totals = aggregates['totals']
+    total = totals['total']
+    concluidas = totals['concluida']
+    em_andamento = totals['em_andamento']
+    pendentes = totals['pendente']
+
+    # Métricas ISP já somam os campos estruturados E o campo materials (texto)
+    total_ctos = totals['quantidade_cto']
+    total_cx_emenda = totals['quantidade_cx_emenda']
+    total_fibra = totals['fibra_lancada']
+    total_abert_cx_emenda = totals['abertura_fechamento_cx_emenda']
+    total_abert_cto = totals['abertura_fechamento_cto']
+    total_abert_rozeta = totals['abertura_fechamento_rozeta']
 
     kpi1, kpi2, kpi3, kpi4 = st.columns(4)
     with kpi1:
@@ -274,6 +294,7 @@ def render_dashboard_page():
     )
 
     # ── TAB GERAL ──────────────────────────────────────────────────────────
+    checkpoint("dashboard: aba Geral")
     with tab_geral:
         col_g1, col_g2 = st.columns(2)
 
@@ -296,15 +317,11 @@ def render_dashboard_page():
             # Barras empilhadas por equipe (interativo)
             team_data = {}
             for u in all_users:
-                if u['role'] == 'admin':
+                if u['role'] == 'admin' or u['team'] in team_data:
                     continue
-                team = u['team']
-                if team not in team_data:
-                    team_data[team] = {'concluida': 0, 'em_andamento': 0, 'pendente': 0}
-                u_tasks = [a for a in all_assignments if a.get('assigned_to') == u['id']]
-                team_data[team]['concluida'] += len([a for a in u_tasks if a.get('status') == 'concluida'])
-                team_data[team]['em_andamento'] += len([a for a in u_tasks if a.get('status') == 'em_andamento'])
-                team_data[team]['pendente'] += len([a for a in u_tasks if a.get('status') == 'pendente'])
+                team_data[u['team']] = aggregates['by_team'].get(
+                    u['team'], {'concluida': 0, 'em_andamento': 0, 'pendente': 0}
+                )
 
             if team_data:
                 teams = list(team_data.keys())
@@ -334,7 +351,7 @@ def render_dashboard_page():
             }
             status_val = status_map.get(label_clicado)
             if status_val:
-                tarefas_filtradas = [a for a in all_assignments if a.get('status') == status_val]
+                tarefas_filtradas = [a for a in load_filtered_assignments() if a.get('status') == status_val]
                 st.subheader(f"Tarefas — {label_clicado} ({len(tarefas_filtradas)})")
                 if tarefas_filtradas:
                     st.dataframe(
@@ -348,7 +365,7 @@ def render_dashboard_page():
             equipe_clicada = ponto.get("x")
             if equipe_clicada:
                 ids_equipe = {u['id'] for u in all_users if u['team'] == equipe_clicada and u['role'] != 'admin'}
-                tarefas_equipe = [a for a in all_assignments if a.get('assigned_to') in ids_equipe]
+                tarefas_equipe = [a for a in load_filtered_assignments() if a.get('assigned_to') in ids_equipe]
                 st.subheader(f"Tarefas — Equipe {str(equipe_clicada).capitalize()} ({len(tarefas_equipe)})")
                 if tarefas_equipe:
                     st.dataframe(
@@ -357,15 +374,9 @@ def render_dashboard_page():
                     )
 
     # ── TAB POR EMPRESA ────────────────────────────────────────────────────
+    checkpoint("dashboard: aba Por Empresa")
     with tab_empresa:
-        empresa_data: dict = {}
-        for a in all_assignments:
-            emp = a.get('empresa_nome') or 'Não definida'
-            if emp not in empresa_data:
-                empresa_data[emp] = {'concluida': 0, 'em_andamento': 0, 'pendente': 0}
-            status_val = a.get('status', 'pendente')
-            if status_val in empresa_data[emp]:
-                empresa_data[emp][status_val] += 1
+        empresa_data: dict = aggregates['by_empresa']
 
         if empresa_data:
             empresas = list(empresa_data.keys())
@@ -386,7 +397,7 @@ def render_dashboard_page():
                 )
 
             with col_e2:
-                totais_emp = {e: sum(empresa_data[e].values()) for e in empresas}
+                totais_emp = {e: empresa_data[e]['total'] for e in empresas}
                 fig_emp_pie = go.Figure(data=[go.Pie(
                     labels=list(totais_emp.keys()),
                     values=list(totais_emp.values()),
@@ -401,7 +412,7 @@ def render_dashboard_page():
                 empresa_clicada = ponto.get("x")
                 if empresa_clicada:
                     tarefas_empresa = [
-                        a for a in all_assignments
+                        a for a in load_filtered_assignments()
                         if (a.get('empresa_nome') or 'Não definida') == empresa_clicada
                     ]
                     with st.expander(f"Tarefas de {empresa_clicada} ({len(tarefas_empresa)})", expanded=True):
@@ -414,28 +425,16 @@ def render_dashboard_page():
                             )
             # Métricas ISP por empresa
             emp_metrics: dict = {}
-            for a in all_assignments:
-                emp = a.get('empresa_nome') or 'Não definida'
-                if emp not in emp_metrics:
-                    emp_metrics[emp] = {
-                        'Tarefas': 0,
-                        'Qtd CTO': 0, 'Qtd Cx Emenda': 0, 'Fibra (m)': 0.0,
-                        'Abert. Cx Emenda': 0, 'Abert. CTO': 0, 'Abert. Rozeta': 0,
-                    }
-
-                emp_metrics[emp]['Qtd CTO'] += a.get('quantidade_cto') or 0
-                emp_metrics[emp]['Qtd Cx Emenda'] += a.get('quantidade_cx_emenda') or 0
-                emp_metrics[emp]['Fibra (m)'] += float(a.get('fibra_lancada') or 0)
-                emp_metrics[emp]['Abert. Cx Emenda'] += a.get('abertura_fechamento_cx_emenda') or 0
-                emp_metrics[emp]['Abert. CTO'] += a.get('abertura_fechamento_cto') or 0
-                emp_metrics[emp]['Abert. Rozeta'] += a.get('abertura_fechamento_rozeta') or 0
-
-                if a.get('materials'):
-                    materials_data = extract_materials_from_text(a['materials'])
-                    emp_metrics[emp]['Qtd CTO'] += materials_data['ctos']
-                    emp_metrics[emp]['Fibra (m)'] += materials_data['cabo_metros']
-
-                emp_metrics[emp]['Tarefas'] += 1
+            for emp, m in empresa_data.items():
+                emp_metrics[emp] = {
+                    'Tarefas': m['total'],
+                    'Qtd CTO': m['quantidade_cto'],
+                    'Qtd Cx Emenda': m['quantidade_cx_emenda'],
+                    'Fibra (m)': m['fibra_lancada'],
+                    'Abert. Cx Emenda': m['abertura_fechamento_cx_emenda'],
+                    'Abert. CTO': m['abertura_fechamento_cto'],
+                    'Abert. Rozeta': m['abertura_fechamento_rozeta'],
+                }
 
             st.subheader("Métricas ISP por Empresa")
             df_emp = pd.DataFrame([{'Empresa': k, **v} for k, v in emp_metrics.items()])
@@ -445,48 +444,29 @@ def render_dashboard_page():
             st.info("Nenhuma tarefa encontrada para o filtro selecionado.")
 
     # ── TAB DESEMPENHO ─────────────────────────────────────────────────────
+    checkpoint("dashboard: aba Desempenho")
     with tab_desempenho:
         user_details = []
         for u in all_users:
             if u['role'] == 'admin':
                 continue
-            u_tasks = [a for a in all_assignments if a.get('assigned_to') == u['id']]
-            completed_count = len([a for a in u_tasks if a.get('status') == 'concluida'])
-
-            # Calcular todas as métricas ISP por usuário
-            user_ctos = 0
-            user_cx_emenda = 0
-            user_fibra = 0
-            user_abert_cx_emenda = 0
-            user_abert_cto = 0
-            user_abert_rozeta = 0
-
-            for a in u_tasks:
-                user_ctos += a.get('quantidade_cto') or 0
-                user_cx_emenda += a.get('quantidade_cx_emenda') or 0
-                user_fibra += float(a.get('fibra_lancada') or 0)
-                user_abert_cx_emenda += a.get('abertura_fechamento_cx_emenda') or 0
-                user_abert_cto += a.get('abertura_fechamento_cto') or 0
-                user_abert_rozeta += a.get('abertura_fechamento_rozeta') or 0
-
-                if a.get('materials'):
-                    materials_data = extract_materials_from_text(a['materials'])
-                    user_ctos += materials_data['ctos']
-                    user_fibra += materials_data['cabo_metros']
+            m = aggregates['by_user'].get(u['id'])
+            if m is None:
+                m = {metric: 0 for metric in DASHBOARD_METRICS}
 
             user_details.append({
                 'Nome': u['full_name'],
                 'Equipe': u['team'].capitalize(),
-                'Total': len(u_tasks),
-                'Concluídas': completed_count,
-                'Em Andamento': len([a for a in u_tasks if a.get('status') == 'em_andamento']),
-                'Pendentes': len([a for a in u_tasks if a.get('status') == 'pendente']),
-                'Qtd CTO': int(user_ctos),
-                'Qtd Cx Emenda': int(user_cx_emenda),
-                'Fibra (m)': round(user_fibra, 2),
-                'Abert. Cx Emenda': int(user_abert_cx_emenda),
-                'Abert. CTO': int(user_abert_cto),
-                'Abert. Rozeta': int(user_abert_rozeta),
+                'Total': m['total'],
+                'Concluídas': m['concluida'],
+                'Em Andamento': m['em_andamento'],
+                'Pendentes': m['pendente'],
+                'Qtd CTO': int(m['quantidade_cto']),
+                'Qtd Cx Emenda': int(m['quantidade_cx_emenda']),
+                'Fibra (m)': round(m['fibra_lancada'], 2),
+                'Abert. Cx Emenda': int(m['abertura_fechamento_cx_emenda']),
+                'Abert. CTO': int(m['abertura_fechamento_cto']),
+                'Abert. Rozeta': int(m['abertura_fechamento_rozeta']),
             })
 
         if user_details:
@@ -511,6 +491,7 @@ def render_dashboard_page():
             st.info("Nenhum colaborador encontrado.")
     
     # ── TAB MATERIAIS ──────────────────────────────────────────────────────
+    checkpoint("dashboard: aba Materiais")
     with tab_materiais:
         st.subheader("🔧 Detalhamento de Materiais por Tarefa")
         
@@ -524,35 +505,16 @@ def render_dashboard_page():
                 key="mat_tipo_filtro"
             )
         
-        # Filtrar tarefas por data
-        tarefas_filtradas = list(all_assignments_raw)
-        
+        # Período da tab materiais (filtrado no servidor por created_at)
+        periodo_materiais = None
         if tipo_filtro == "Período Rápido":
             with col_m2:
                 periodo_mat = st.selectbox(
                     "Período",
-                    ["Hoje", "Ontem", "Esta Semana", "Semana Passada", "Este Mês", "Mês Passado", "Todos"],
+                    list(PERIODOS_MATERIAIS.keys()),
                     key="mat_periodo"
                 )
-            
-            hoje = datetime.now().date()
-            if periodo_mat == "Hoje":
-                tarefas_filtradas = [a for a in tarefas_filtradas if parse_date(a.get('created_at')).date() == hoje]
-            elif periodo_mat == "Ontem":
-                ontem = hoje - timedelta(days=1)
-                tarefas_filtradas = [a for a in tarefas_filtradas if parse_date(a.get('created_at')).date() == ontem]
-            elif periodo_mat == "Esta Semana":
-                inicio_semana = hoje - timedelta(days=hoje.weekday())
-                tarefas_filtradas = [a for a in tarefas_filtradas if parse_date(a.get('created_at')).date() >= inicio_semana]
-            elif periodo_mat == "Semana Passada":
-                inicio_semana_passada = hoje - timedelta(days=hoje.weekday() + 7)
-                fim_semana_passada = inicio_semana_passada + timedelta(days=6)
-                tarefas_filtradas = [a for a in tarefas_filtradas if inicio_semana_passada <= parse_date(a.get('created_at')).date() <= fim_semana_passada]
-            elif periodo_mat == "Este Mês":
-                tarefas_filtradas = [a for a in tarefas_filtradas if parse_date(a.get('created_at')).month == hoje.month and parse_date(a.get('created_at')).year == hoje.year]
-            elif periodo_mat == "Mês Passado":
-                mes_passado = (hoje.replace(day=1) - timedelta(days=1))
-                tarefas_filtradas = [a for a in tarefas_filtradas if parse_date(a.get('created_at')).month == mes_passado.month and parse_date(a.get('created_at')).year == mes_passado.year]
+            periodo_materiais = PERIODOS_MATERIAIS[periodo_mat]
         
         elif tipo_filtro == "Data Específica":
             with col_m2:
@@ -561,7 +523,7 @@ def render_dashboard_page():
                     value=datetime.now().date(),
                     key="mat_data_especifica"
                 )
-            tarefas_filtradas = [a for a in tarefas_filtradas if parse_date(a.get('created_at')).date() == data_especifica]
+            periodo_materiais = (data_especifica, data_especifica)
         
         elif tipo_filtro == "Intervalo de Datas":
             with col_m2:
@@ -576,7 +538,12 @@ def render_dashboard_page():
                     value=datetime.now().date(),
                     key="mat_data_fim"
                 )
-            tarefas_filtradas = [a for a in tarefas_filtradas if data_inicio <= parse_date(a.get('created_at')).date() <= data_fim]
+            periodo_materiais = (data_inicio, data_fim)
+
+        created_from, created_to = period_bounds(periodo_materiais)
+        tarefas_filtradas = get_active_assignments(
+            user["company_id"], profile='metrics', created_from=created_from, created_to=created_to
+        )
         
         # Preparar dados de materiais por tarefa (usando tarefas_filtradas)
         materiais_tarefas = []
@@ -602,7 +569,7 @@ def render_dashboard_page():
                     'ID': a['id'],
                     'Data': parse_date(a.get('created_at')).strftime('%d/%m/%Y'),
                     'Tarefa': a['title'],
-                    'Empresa': a.get('empresa_nome', 'N/A'),
+                    'Empresa': a.get('empresa_nome') or 'N/A',
                     'Técnico': assignee.get('full_name', 'N/A') if isinstance(assignee, dict) else 'N/A',
                     'Status': a['status'],
                     'Qtd CTO': int(task_ctos),
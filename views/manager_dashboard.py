@@ -15,6 +15,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from auth.authentication import require_login, get_current_user, is_admin
 from database.supabase_only_connection import db
+from database.async_connection import adb, gather
 
 
 def extract_materials_metrics(materials_text):
@@ -39,10 +40,15 @@ def extract_materials_metrics(materials_text):
     return {'ctos': ctos, 'ceos': ceos, 'cabo_metros': cabo_metros}
 
 
-def get_team_performance(company_id, team_filter=None):
-    """Retorna métricas de desempenho por equipe."""
-    users = db.get_all_users(company_id)
-    assignments = db.get_task_assignments(company_id)
+def get_team_performance(company_id, team_filter=None, users=None, assignments=None):
+    """Retorna métricas de desempenho por equipe.
+
+    `users`/`assignments` já buscados podem ser passados para evitar novas consultas.
+    """
+    if users is None:
+        users = db.get_all_users(company_id)
+    if assignments is None:
+        assignments = db.get_task_assignments(company_id, profile='metrics')
     
     team_stats = {}
     
@@ -123,9 +129,13 @@ def render_manager_dashboard():
     
     team_filter = None if team_filter == "Todas" else team_filter
     
-    # Obter dados
-    team_stats = get_team_performance(user['company_id'], team_filter)
-    all_assignments = db.get_task_assignments(user['company_id'])
+    # Obter dados (as três consultas rodam em paralelo)
+    users, assignments, recent_tasks = gather(
+        adb.get_all_users(user['company_id']),
+        adb.get_task_assignments(user['company_id'], profile='metrics'),
+        adb.get_task_assignments(user['company_id'], limit=10, profile='list'),
+    )
+    team_stats = get_team_performance(user['company_id'], team_filter, users, assignments)
     
     # === MÉTRICAS GERAIS ===
     st.header("📈 Visão Geral")
@@ -250,8 +260,6 @@ def render_manager_dashboard():
     # === TAREFAS RECENTES ===
     st.header("📋 Tarefas Recentes")
     
-    recent_tasks = sorted(all_assignments, key=lambda x: x.get('created_at', ''), reverse=True)[:10]
-    
     for task in recent_tasks:
         status_icon = {"pendente": "🟡", "em_andamento": "🔵", "concluida": "🟢"}.get(task['status'], "⚪")
         
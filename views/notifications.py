@@ -20,8 +20,13 @@ def get_unread_count(user_id: int) -> int:
 
 
 def get_notifications(user_id: int, limit: int = 50) -> list:
-    """Retorna lista de notificações do usuário via Supabase."""
-    return db.get_notifications(user_id)
+    """Retorna as `limit` notificações mais recentes do usuário via Supabase."""
+    return db.get_notifications(user_id, limit=limit)
+
+
+def get_notifications_page(user_id: int, cursor: str = None) -> tuple[list, str | None]:
+    """Retorna (notificações, próximo cursor) de uma página do feed via Supabase."""
+    return db.get_notifications_page(user_id, cursor=cursor)
 
 
 def mark_as_read(notification_id: int, user_id: int = None) -> bool:
@@ -29,18 +34,9 @@ def mark_as_read(notification_id: int, user_id: int = None) -> bool:
     return db.mark_notification_as_read(notification_id, user_id)
 
 
-def mark_all_as_read(user_id: int) -> int:
-    """Marca todas as notificações do usuário como lidas via Supabase."""
-    try:
-        notifications = db.get_notifications(user_id, unread_only=True)
-        count = 0
-        for notif in notifications:
-            if db.mark_notification_as_read(notif['id'], user_id):
-                count += 1
-        return count
-    except Exception as e:
-        print(f"Erro ao marcar notificações: {e}")
-        return 0
+def mark_all_as_read(user_id: int, before: datetime = None) -> int:
+    """Marca todas as notificações do usuário como lidas via Supabase (um único UPDATE)."""
+    return db.mark_all_notifications_read(user_id, before)
 
 
 def format_time_ago(dt) -> str:
@@ -107,8 +103,14 @@ def render_notifications_page():
 
     st.markdown("---")
 
-    # Listar notificações
-    notifications = get_notifications(user["id"])
+    # Listar notificações (paginação keyset: pilha de cursores na sessão)
+    cursors = st.session_state.setdefault("notif_cursors", [None])
+    notifications, next_cursor = get_notifications_page(user["id"], cursors[-1])
+
+    if not notifications and len(cursors) > 1:
+        # Página deixou de existir (ex.: notificações removidas pela retenção)
+        st.session_state["notif_cursors"] = [None]
+        st.rerun()
 
     if not notifications:
         st.info("Nenhuma notificação encontrada.")
@@ -148,3 +150,14 @@ def render_notifications_page():
                         st.rerun()
 
             st.markdown("---")
+
+    # Navegação entre páginas
+    col_prev, col_next = st.columns(2)
+    with col_prev:
+        if len(cursors) > 1 and st.button("← Mais recentes", use_container_width=True):
+            cursors.pop()
+            st.rerun()
+    with col_next:
+        if next_cursor and st.button("Mais antigas →", use_container_width=True):
+            cursors.append(next_cursor)
+            st.rerun()
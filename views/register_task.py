@@ -88,12 +88,12 @@ def render_register_task_page():
         st.subheader("Fotos")
         st.caption(
             f"Upload de até {MAX_FILES_PER_TASK} fotos (máx. {format_file_size(MAX_FILE_SIZE_BYTES)} cada). "
-            "Formatos aceitos: JPG, JPEG, PNG"
+            "Formatos aceitos: JPG, PNG, WebP, HEIC"
         )
 
         uploaded_files = st.file_uploader(
             "Selecione as fotos *",
-            type=["jpg", "jpeg", "png"],
+            type=["jpg", "jpeg", "png", "webp", "heic", "heif"],
             accept_multiple_files=True,
             help=f"Máximo de {MAX_FILES_PER_TASK} arquivos",
         )
@@ -168,9 +168,14 @@ def render_register_task_page():
                     session.commit()
 
                     # Salvar fotos no Supabase Storage
+                    progress = st.progress(0.0, text="Enviando fotos...")
                     success, msg, _ = save_uploaded_files(
-                        uploaded_files, task.id, user["company_id"]
+                        uploaded_files, task.id, user["company_id"],
+                        on_progress=lambda done, total, name: progress.progress(
+                            done / total, text=f"{done}/{total} enviada(s): {name}"
+                        ),
                     )
+                    progress.empty()
 
                     if success:
                         st.success("Tarefa registrada com sucesso!")
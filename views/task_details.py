@@ -18,6 +18,7 @@ from utils.file_handler import (
     delete_single_photo,
     save_uploaded_files,
     format_file_size,
+    get_photo_urls,
 )
 from config import TIPOS_FIBRA, MAX_FILES_PER_TASK
 
@@ -305,18 +306,30 @@ def render_task_details_page():
         if photos:
             st.write(f"**{len(photos)} foto(s)**")
 
-            # Grid de fotos
+            # Grid de fotos (miniaturas; o original só é carregado sob demanda)
             cols = st.columns(min(len(photos), 3))
             for idx, photo in enumerate(photos):
                 with cols[idx % 3]:
-                    if photo.get("public_url"):
+                    if photo.get("thumb_url"):
                         st.image(
-                            photo["public_url"],
+                            photo["thumb_url"],
                             caption=photo["original_name"],
                             use_container_width=True
                         )
                         st.caption(f"Tamanho: {format_file_size(photo['file_size'])}")
 
+                        if st.button("🔍 Ampliar", key=f"original_photo_{photo['id']}"):
+                            # Ampliada: versão média (fotos antigas sem renditions usam o original)
+                            medium_path = photo["medium_path"] or photo["file_path"]
+                            urls = get_photo_urls([medium_path, photo["file_path"]])
+                            medium_url, original_url = urls.get(medium_path), urls.get(photo["file_path"])
+                            if medium_url:
+                                st.image(medium_url, use_container_width=True)
+                            if original_url:
+                                st.markdown(f"[Abrir foto original]({original_url})")
+                            else:
+                                st.error("Não foi possível gerar o link da foto original.")
+
                         # Botão de excluir foto (se tiver permissão)
                         if can_edit:
                             if st.button(f"🗑️ Excluir", key=f"delete_photo_{photo['id']}"):
@@ -344,7 +357,7 @@ def render_task_details_page():
 
                 uploaded_files = st.file_uploader(
                     "Selecione as fotos",
-                    type=["jpg", "jpeg", "png"],
+                    type=["jpg", "jpeg", "png", "webp", "heic", "heif"],
                     accept_multiple_files=True,
                     key="new_photos_upload"
                 )
@@ -354,9 +367,14 @@ def render_task_details_page():
                         st.warning(f"Máximo de {remaining_slots} foto(s) permitidas.")
                     else:
                         if st.button("Enviar Fotos", type="primary"):
+                            progress = st.progress(0.0, text="Enviando fotos...")
                             success, msg, _ = save_uploaded_files(
-                                uploaded_files, task_id, user["company_id"]
+                                uploaded_files, task_id, user["company_id"],
+                                on_progress=lambda done, total, name: progress.progress(
+                                    done / total, text=f"{done}/{total} enviada(s): {name}"
+                                ),
                             )
+                            progress.empty()
                             if success:
                                 st.success(msg)
                                 st.rerun()
@@ -18,17 +18,35 @@ from utils.push_notification import notify_task_assigned
 PAGE_SIZE_MGMT = 15
 
 
-def _pagination_controls(page_key: str, total: int, filter_sig: str = "") -> int:
-    """Controles de paginação para task_management. Retorna página atual (0-indexed)."""
+def _page_cursor(page_key: str, filter_sig: str = "") -> str | None:
+    """Retorna o cursor keyset da página atual, voltando à primeira quando os filtros mudam."""
     if st.session_state.get(f"{page_key}_sig") != filter_sig:
         st.session_state[f"{page_key}_sig"] = filter_sig
         st.session_state[page_key] = 0
+        st.session_state[f"{page_key}_cursors"] = [None]
 
-    if total == 0:
+    cursors = st.session_state.setdefault(f"{page_key}_cursors", [None])
+    page = min(st.session_state.get(page_key, 0), len(cursors) - 1)
+    st.session_state[page_key] = page
+    return cursors[page]
+
+
+def _pagination_controls(page_key: str, total: int, next_cursor: str = None) -> int:
+    """Controles de paginação keyset para task_management. Retorna página atual (0-indexed).
+
+    `total` vem de count='estimated' (estimativa do planner em tabelas grandes),
+    por isso é exibido como aproximado.
+    """
+    page = st.session_state.get(page_key, 0)
+    cursors = st.session_state.setdefault(f"{page_key}_cursors", [None])
+    del cursors[page + 1:]
+    if next_cursor:
+        cursors.append(next_cursor)
+
+    if total == 0 and page == 0:
         return 0
 
-    total_pages = max(1, -(-total // PAGE_SIZE_MGMT))
-    page = min(st.session_state.get(page_key, 0), total_pages - 1)
+    total_pages = max(page + 1 + (1 if next_cursor else 0), -(-total // PAGE_SIZE_MGMT))
 
     c1, c2, c3 = st.columns([1, 3, 1])
     with c1:
@@ -37,10 +55,10 @@ def _pagination_controls(page_key: str, total: int, filter_sig: str = "") -> int
             st.rerun()
     with c2:
         s = page * PAGE_SIZE_MGMT + 1
-        e = min((page + 1) * PAGE_SIZE_MGMT, total)
-        st.caption(f"Mostrando {s}–{e} de {total}  |  Página {page + 1}/{total_pages}")
+        e = min((page + 1) * PAGE_SIZE_MGMT, max(total, s))
+        st.caption(f"Mostrando {s}–{e} de ≈{total}  |  Página {page + 1}/≈{total_pages}")
     with c3:
-        if st.button("Próximo →", key=f"{page_key}_next", disabled=page >= total_pages - 1, use_container_width=True):
+        if st.button("Próximo →", key=f"{page_key}_next", disabled=not next_cursor, use_container_width=True):
             st.session_state[page_key] = page + 1
             st.rerun()
     return page
@@ -106,8 +124,7 @@ def render_task_management_page():
         st.subheader("Nova Tarefa")
         
         # Busca empresas ativas (fora do form para evitar chamadas desnecessárias)
-        empresas_result = db.client.table('companies').select('name').eq('active', True).order('name').execute()
-        empresa_options = [e['name'] for e in empresas_result.data] if empresas_result.data else []
+        empresa_options = [c['name'] for c in db.get_all_companies() if c.get('active')]
 
         with st.form("create_task_form", clear_on_submit=True):
             # Empresa
@@ -242,16 +259,17 @@ def render_task_management_page():
     with tab2:
         st.subheader("Tarefas Aguardando Atribuição")
         
-        unassigned_data, unassigned_total = db.get_task_assignments_paginated(
+        unassigned_data, unassigned_total, unassigned_next = db.get_task_assignments_keyset(
             company_id=user['company_id'],
-            page=st.session_state.get("tab2_page", 0),
+            cursor=_page_cursor("tab2_page", "unassigned"),
             page_size=PAGE_SIZE_MGMT,
             unassigned_only=True,
+            profile='card',
         )
-        _pagination_controls("tab2_page", unassigned_total, "unassigned")
+        _pagination_controls("tab2_page", unassigned_total, unassigned_next)
 
         if unassigned_data:
-            st.caption(f"Total: {unassigned_total} tarefa(s)")
+            st.caption(f"Total: ≈{unassigned_total} tarefa(s)")
 
             overdue_count = sum(1 for t in unassigned_data if _is_overdue(t))
             if overdue_count:
@@ -385,21 +403,21 @@ def render_task_management_page():
         name_param = filter_user if filter_user != "Todos" else None
         filter_sig_tab3 = f"{filter_user}|{filter_status}"
 
-        tab3_page = st.session_state.get("tab3_page", 0)
-        tasks_to_show, total_tab3 = db.get_task_assignments_paginated(
+        tasks_to_show, total_tab3, next_tab3 = db.get_task_assignments_keyset(
             company_id=user['company_id'],
-            page=tab3_page,
+            cursor=_page_cursor("tab3_page", filter_sig_tab3),
             page_size=PAGE_SIZE_MGMT,
             assigned_only=True,
             status=status_param,
             assigned_to_name=name_param,
+            profile='card',
         )
-        _pagination_controls("tab3_page", total_tab3, filter_sig_tab3)
+        _pagination_controls("tab3_page", total_tab3, next_tab3)
 
         if tasks_to_show:
             overdue_count = sum(1 for t in tasks_to_show if _is_overdue(t))
             col_cap, col_warn = st.columns([1, 2])
-            col_cap.caption(f"Total: {total_tab3} tarefa(s)")
+            col_cap.caption(f"Total: ≈{total_tab3} tarefa(s)")
             if overdue_count:
                 col_warn.warning(f"⚠️ {overdue_count} tarefa(s) com prazo vencido nesta página")
 